@@ -0,0 +1,81 @@
+import time
+
+from functools import lru_cache
+
+from card import VALUES, mask_size
+from moves import get_legal_mask_moves
+
+# Costs of a move, the AI uses the move with the lowest cost
+BREAK_COST = 8
+VALUE_COST = 1
+CARD_BONUS = 3
+PASS_COST = 14
+TWO_VALUE = len(VALUES) - 1
+
+
+# AI players have negative telegram IDs that are unique to the group and seat
+def ai_player_tele_id(group_tele_id, player_id):
+    return -(abs(group_tele_id) * 10 + player_id + 1)
+
+
+def is_ai_player(player_tele_id):
+    return player_tele_id < 0
+
+
+# Returns the number of cards of each value in the hand
+@lru_cache(maxsize=4096)
+def analyse_hand(hand):
+    return tuple(mask_size(hand >> (value * 4) & 0xF) for value in range(len(VALUES)))
+
+
+@lru_cache(maxsize=4096)
+def get_ai_moves(hand, prev_mask):
+    return tuple(get_legal_mask_moves(hand, prev_mask))
+
+
+# Returns the cost of using move from hand, lower is better
+def get_move_cost(hand, move, value_counts):
+    size = mask_size(move)
+    cost = (move.bit_length() - 1 >> 2) * VALUE_COST - size * CARD_BONUS
+
+    # Avoids breaking up pairs and three of a kinds, five cards moves are worth it
+    if size < 5:
+        for value, count in enumerate(value_counts):
+            used = mask_size(move >> (value * 4) & 0xF)
+            if 0 < used < count:
+                cost += BREAK_COST
+
+    # Keeps 2s for later unless the hand is almost empty
+    if move >> (TWO_VALUE * 4) and mask_size(hand) > 4:
+        cost += BREAK_COST
+
+    return cost
+
+
+# Chooses the AI's move within time_budget seconds, returns 0 to pass
+def choose_ai_move(hand, prev_mask, is_in_control, time_budget):
+    start_time = time.perf_counter()
+    moves = get_ai_moves(hand, 0 if is_in_control else prev_mask)
+    if not moves:
+        return 0
+
+    value_counts = analyse_hand(hand)
+    best_move = moves[0]
+    best_cost = None
+
+    for move in moves:
+        # Uses all the cards left
+        if move == hand:
+            return move
+
+        cost = get_move_cost(hand, move, value_counts)
+        if best_cost is None or cost < best_cost:
+            best_move, best_cost = move, cost
+
+        if time.perf_counter() - start_time > time_budget:
+            break
+
+    if not is_in_control and best_cost > PASS_COST and mask_size(hand) > 4:
+        return 0
+
+    return best_move
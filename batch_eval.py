@@ -0,0 +1,79 @@
+import numpy as np
+
+from card_type import DRAGON, SAME_SUIT_DRAGON
+from rank_table import HEADER, SLOT, RANK_SHIFT, RANK_BITS, SIZE_SHIFT, TYPE_MASK, load_rank_table
+
+# Sorted masks and rank keys of the rank table, for vectorised lookups
+_table_masks = None
+_table_keys = None
+
+
+def load_table_arrays():
+    global _table_masks, _table_keys
+
+    slots = np.frombuffer(load_rank_table(), dtype=[("mask", "<u8"), ("key", "<u4")], offset=HEADER.size)
+    assert slots.itemsize == SLOT.size
+    slots = slots[slots["mask"] != 0]
+    slots = slots[np.argsort(slots["mask"])]
+    _table_masks, _table_keys = slots["mask"].copy(), slots["key"].astype(np.int64)
+
+    return _table_masks, _table_keys
+
+
+# Converts an (N, k) array of card ints to N masks
+def mask_array(cards):
+    cards = np.asarray(cards, dtype=np.uint64)
+    if cards.shape[1] == 0:
+        return np.zeros(cards.shape[0], dtype=np.uint64)
+
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), cards), axis=1)
+
+
+# Returns the card types and rank keys of an (N, k) array of card ints, the same as get_mask_type and get_rank_key
+def evaluate(cards):
+    cards = np.asarray(cards, dtype=np.int64)
+    num_hands, size = cards.shape
+    keys = np.full(num_hands, size << SIZE_SHIFT, dtype=np.int64)
+
+    # Hands with a repeated card are invalid
+    sorted_cards = np.sort(cards, axis=1)
+    distinct = np.all(sorted_cards[:, 1:] != sorted_cards[:, :-1], axis=1)
+
+    if size in (1, 2, 3, 5):
+        table_masks, table_keys = (_table_masks, _table_keys) if _table_masks is not None else load_table_arrays()
+        masks = mask_array(cards)
+        indices = np.minimum(np.searchsorted(table_masks, masks), len(table_masks) - 1)
+        found = (table_masks[indices] == masks) & distinct
+        keys[found] = table_keys[indices[found]]
+    elif size == 13:
+        # All dragons have the same rank
+        values = np.sort(cards >> 2, axis=1)
+        is_dragon = np.all(values == np.arange(13), axis=1) & distinct
+        same_suit = np.all((cards & 3) == (cards[:, :1] & 3), axis=1)
+        dragon_types = np.where(same_suit, SAME_SUIT_DRAGON, DRAGON)
+        keys[is_dragon] |= 1 << RANK_SHIFT | dragon_types[is_dragon]
+
+    types = keys & TYPE_MASK
+    types[types == 0] = -1
+
+    if size == 0:
+        keys[:] = 0
+
+    return types, keys
+
+
+# Returns if each hand of curr_cards is bigger than the same row of prev_cards, the same as is_mask_bigger
+def are_bigger(prev_cards, curr_cards):
+    _, prev_keys = evaluate(prev_cards)
+    _, curr_keys = evaluate(curr_cards)
+
+    return is_keys_bigger(prev_keys, curr_keys)
+
+
+# Vectorised is_key_bigger
+def is_keys_bigger(prev_keys, curr_keys):
+    prev_ranks, curr_ranks = prev_keys >> RANK_SHIFT, curr_keys >> RANK_SHIFT
+    same_size = curr_ranks >> RANK_BITS == prev_ranks >> RANK_BITS
+    prev_valid = prev_ranks & ((1 << RANK_BITS) - 1) != 0
+
+    return (prev_keys == 0) | (same_size & prev_valid & (curr_ranks > prev_ranks))
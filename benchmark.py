@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import sys
+import timeit
+
+from card import ints_to_mask, mask_to_stack, deal_hands, get_cards_type, are_cards_bigger
+from money import get_money_lost, has_good_cards
+from stack_mask import StackMask
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+SEED = 2017
+
+# Fixed hands of each type as card ints, with a smaller hand of the same type to compare against
+HANDS = {
+    "single": ([21], [20]),
+    "pair": ([21, 23], [17, 19]),
+    "three_of_a_kind": ([20, 21, 23], [16, 17, 18]),
+    "straight": ([20, 25, 30, 35, 36], [16, 21, 26, 31, 32]),
+    "flush": ([3, 11, 19, 31, 43], [2, 10, 18, 30, 42]),
+    "full_house": ([20, 21, 23, 40, 41], [16, 17, 18, 44, 45]),
+    "four_of_a_kind": ([20, 21, 22, 23, 0], [16, 17, 18, 19, 4]),
+    "straight_flush": ([19, 23, 27, 31, 35], [18, 22, 26, 30, 34]),
+    "dragon": ([value * 4 + value % 4 for value in range(13)], [value * 4 + (value + 1) % 4 for value in range(13)]),
+    "same_suit_dragon": ([value * 4 + 3 for value in range(13)], [value * 4 for value in range(13)])
+}
+
+
+# Returns the best time per call in microseconds
+def time_call(func, number, repeat):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def run_benchmarks(number=1000, repeat=5):
+    results = {}
+
+    for name, (card_ints, smaller_card_ints) in sorted(HANDS.items()):
+        cards = mask_to_stack(ints_to_mask(card_ints))
+        smaller_cards = mask_to_stack(ints_to_mask(smaller_card_ints))
+
+        results["get_cards_type.%s" % name] = time_call(lambda: get_cards_type(cards), number, repeat)
+        results["are_cards_bigger.%s" % name] = \
+            time_call(lambda: are_cards_bigger(smaller_cards, cards), number, repeat)
+
+    # Seeded 13 cards hands for the end of game money
+    random.seed(SEED)
+    hands = [mask_to_stack(ints_to_mask(random.sample(range(52), 13))) for i in range(10)]
+    hands.append(mask_to_stack(ints_to_mask(HANDS["straight_flush"][0] + [40, 41, 42, 43])))
+
+    results["has_good_cards"] = time_call(lambda: [has_good_cards(cards) for cards in hands], number // 10, repeat)
+    results["get_money_lost"] = \
+        time_call(lambda: [get_money_lost(cards, 5, 20) for cards in hands], number // 10, repeat)
+
+    random.seed(SEED)
+    results["setup_game.deal_hands"] = time_call(deal_hands, number // 10, repeat)
+
+    # Saving and loading a full hand in a cards column
+    cards, column_type = hands[0], StackMask()
+    data, mask = pickle.dumps(cards), column_type.process_bind_param(cards, None)
+
+    results["cards_column.pickle.save"] = time_call(lambda: pickle.dumps(cards), number, repeat)
+    results["cards_column.pickle.load"] = time_call(lambda: pickle.loads(data), number, repeat)
+    results["cards_column.mask.save"] = time_call(lambda: column_type.process_bind_param(cards, None), number, repeat)
+    results["cards_column.mask.load"] = time_call(lambda: column_type.process_result_value(mask, None), number, repeat)
+
+    return results
+
+
+# Returns the bytes used by a full hand in a cards column
+def column_sizes():
+    random.seed(SEED)
+    cards = mask_to_stack(ints_to_mask(random.sample(range(52), 13)))
+
+    return {"cards_column.pickle": len(pickle.dumps(cards)), "cards_column.mask": 8}
+
+
+# Returns the names of the benchmarks that are slower than the baseline by more than threshold
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for name, time_taken in sorted(results.items()):
+        if name in baseline and time_taken > baseline[name] * (1 + threshold):
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the card and money hot paths")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parser.add_argument("-b", "--baseline", default=BASELINE_PATH, help="Baseline JSON file to compare against")
+    parser.add_argument("-t", "--threshold", type=float, default=0.25,
+                        help="Allowed slowdown over the baseline, e.g. 0.25 for 25%% (default: %(default)s)")
+    parser.add_argument("-n", "--number", type=int, default=1000, help="Calls per timing (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.number)
+    sizes = column_sizes()
+    output = {"python": platform.python_version(), "machine": platform.machine(), "results": results, "sizes": sizes}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    for name, time_taken in sorted(results.items()):
+        if name in baseline:
+            print("%-40s %10.2fus %10.2fus %+7.1f%%" %
+                  (name, time_taken, baseline[name], (time_taken / baseline[name] - 1) * 100))
+        else:
+            print("%-40s %10.2fus" % (name, time_taken))
+
+    for name, size in sorted(sizes.items()):
+        print("%-40s %10d bytes" % (name, size))
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print("Slower than the baseline by more than {:.0%}: {}".format(args.threshold, ", ".join(regressions)))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
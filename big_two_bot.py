@@ -3,19 +3,18 @@
 
 import arrow
 import dotenv
-import gettext
 import langdetect
 import logging
 import os
-import pydealer
 import random
 import re
 import smtplib
+import socket
+import time
 
-from sqlalchemy import create_engine, sql
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.orm import sessionmaker
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Chat, ChatMember, LabeledPrice
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Chat, ChatMember, LabeledPrice, Update
 from telegram.error import TelegramError, Unauthorized
 from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, ConversationHandler, Filters, MessageHandler,\
     PreCheckoutQueryHandler
@@ -24,11 +23,33 @@ from telegram.ext.dispatcher import run_async
 import base
 from language import Language
 from group_setting import GroupSetting
-from card import suit_unicode, get_cards_type, are_cards_bigger
-from money import get_money_lost
+from group_setting_cache import GroupSettingCache
+from card import ABBREV_INTS, suit_unicode, stack_to_mask, mask_to_stack, mask_size, deal_hands
+from rank_table import load_rank_table
+from turn import THREE_OF_DIAMONDS, INVALID_CARDS, SMALLER_CARDS, check_cards, next_players_after_use, \
+    next_player_after_pass
+from settlement import settle_stats
+from handler_queries import get_player_stat, get_player_money, recharge_player_money, get_recharge_time, \
+    set_recharge_time, get_recharge_times, get_group_stat, get_group_setting, get_language
 from game import Game
+from game_state import GameState, PlayerState, GameStore
 from player import Player
-from game_stat import GroupStat, PlayerStat
+from game_stat import PlayerStat
+from global_counter import GAMES, PLAYERS, GROUPS
+from counter_store import CounterStore
+from migration import migrate
+from ai import choose_ai_move, ai_player_tele_id, is_ai_player
+from turn_message import get_turn_message, get_game_message
+from cache import LRUCache
+from translation import DEFAULT_LANGUAGE, load_catalogs, get_catalog
+from unit_of_work import unit_of_work, count_checkouts, format_checkout_counts
+import pool_stats
+from pool_stats import format_pool_stats
+from database import is_sqlite, make_engine
+from group_executor import GroupExecutor, run_in_group
+from lease_manager import LeaseManager
+from router import Router
+from shard_lease import get_shard
 
 # Enable logging
 logging.basicConfig(format="[%(asctime)s] [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %I:%M:%S %p',
@@ -42,31 +63,90 @@ port = int(os.environ.get('PORT', '5000'))
 
 telegram_token = os.environ.get("TELEGRAM_TOKEN_BETA", os.environ.get("TELEGRAM_TOKEN"))
 payment_token = os.environ.get("PAYMENT_TOKEN_TEST", os.environ.get("PAYMENT_TOKEN"))
-dev_tele_id = int(os.environ.get("DEV_TELE_ID"))
+dev_tele_id = int(os.environ.get("DEV_TELE_ID", "0"))
 dev_email = os.environ.get("DEV_EMAIL", "sample@email.com")
 dev_email_pw = os.environ.get("DEV_EMAIL_PW")
 is_email_feedback = os.environ.get("IS_EMAIL_FEEDBACK")
 smtp_host = os.environ.get("SMTP_HOST")
+ai_move_budget = float(os.environ.get("AI_MOVE_BUDGET_MS", "5")) / 1000
+game_flush_interval = float(os.environ.get("GAME_FLUSH_INTERVAL", "1"))
+language_cache_size = int(os.environ.get("LANGUAGE_CACHE_SIZE", "10000"))
+dispatcher_workers = int(os.environ.get("DISPATCHER_WORKERS", "16"))
+group_workers = int(os.environ.get("GROUP_WORKERS", "8"))
+group_setting_cache_size = int(os.environ.get("GROUP_SETTING_CACHE_SIZE", "10000"))
+counter_flush_interval = float(os.environ.get("COUNTER_FLUSH_INTERVAL", "10"))
+is_cold_start = os.environ.get("COLD_START")
+
+# Workers own shards of the groups and are sent their updates by router.py when NUM_SHARDS is set
+num_shards = int(os.environ.get("NUM_SHARDS", "0"))
+worker_id = os.environ.get("WORKER_ID", "%s-%d" % (socket.gethostname(), os.getpid()))
+worker_url = os.environ.get("WORKER_URL")
+lease_ttl = float(os.environ.get("LEASE_TTL", "30"))
+recharge_poll_interval = float(os.environ.get("RECHARGE_POLL_INTERVAL", "10"))
+# Another worker can change a language or setting that is cached, so the cached ones expire after CACHE_TTL seconds
+cache_ttl = float(os.environ.get("CACHE_TTL", "10")) if num_shards else None
+
+database_url = os.environ.get("DATABASE_URL")
+
+# The dispatcher and group workers, the job queue, the background flushes and the main thread can each use a connection.
+# SQLite databases have one connection, so the handlers wait longer for it
+db_pool_size = int(os.environ.get("DB_POOL_SIZE", dispatcher_workers + group_workers + 4))
+db_max_overflow = int(os.environ.get("DB_MAX_OVERFLOW", "0"))
+db_pool_timeout = float(os.environ.get("DB_POOL_TIMEOUT", "30" if is_sqlite(database_url) else "1"))
+pool_stats.slow_checkout_time = float(os.environ.get("SLOW_CHECKOUT_MS", "100")) / 1000
+
+engine = make_engine(database_url, db_pool_size, db_max_overflow, db_pool_timeout)
+
+# Running games are kept between restarts unless the bot is cold started
+if is_cold_start:
+    Player.__table__.drop(engine, checkfirst=True)
+    Game.__table__.drop(engine, checkfirst=True)
 
-engine = create_engine(os.environ.get("DATABASE_URL"), pool_size=20, max_overflow=0, pool_timeout=1)
-Player.__table__.drop(engine) if engine.dialect.has_table(engine, "players") else 0
-Game.__table__.drop(engine) if engine.dialect.has_table(engine, "games") else 0
 base.Base.metadata.create_all(engine, checkfirst=True)
+migrate(engine)
 session_factory = sessionmaker(bind=engine)
+count_checkouts(engine)
 # Session = scoped_session(session_factory)
 # Session = sessionmaker(bind=engine)
 # session = Session()
+game_store = GameStore(session_factory)
+counter_store = CounterStore(session_factory)
+lease_manager = LeaseManager(session_factory, worker_id, worker_url, num_shards, lease_ttl) if num_shards else None
+group_executor = GroupExecutor(group_workers, lease_manager.owns if lease_manager else None)
+update_router = Router(session_factory, num_shards, telegram_token) if num_shards else None
+load_rank_table()
+load_catalogs()
+language_cache = LRUCache(language_cache_size, cache_ttl)
+group_setting_cache = GroupSettingCache(group_setting_cache_size, cache_ttl)
 
 init_money = 1000
 card_money = 5
 recharge_delay = 10
+ai_move_delay = 1
 queued_jobs = {}
-recharge_times = {}
+recharge_jobs = {}
+
+
+# The group of a command in a group chat
+def message_group(bot, update, *args, **kwargs):
+    return update.message.chat.id
+
+
+# The group of an inline button, which is the player's game if the player is in one
+def callback_group(bot, update, *args, **kwargs):
+    player = game_store.get_player(update.callback_query.message.chat.id)
+
+    return player.group_tele_id if player else update.callback_query.message.chat.id
+
+
+# The group of a game's job, the context starts with the group's telegram ID
+def job_group(bot, job, *args, **kwargs):
+    return int(str(job.context).split(",")[0])
 
 
 def main():
     # Create the EventHandler and pass it your bot's token.
-    updater = Updater(telegram_token)
+    updater = Updater(telegram_token, workers=dispatcher_workers)
 
     # Get the dispatcher to register handlers
     dp = updater.dispatcher
@@ -80,6 +160,7 @@ def main():
     dp.add_handler(CommandHandler("setjointimer", set_join_timer, pass_args=True))
     dp.add_handler(CommandHandler("setpasstimer", set_pass_timer, pass_args=True))
     dp.add_handler(CommandHandler("setgamemode", set_game_mode, pass_args=True))
+    dp.add_handler(CommandHandler("setaiplayers", set_ai_players, pass_args=True))
 
     dp.add_handler(CommandHandler("startgame", start_game, pass_job_queue=True))
     dp.add_handler(CommandHandler("join", join, pass_job_queue=True))
@@ -94,12 +175,28 @@ def main():
 
     dp.add_handler(feedback_cov_handler())
     dp.add_handler(CommandHandler("send", send, pass_args=True))
+    dp.add_handler(CommandHandler("dbstats", db_stats))
 
     # log all errors
     dp.add_error_handler(error)
 
     # Start the Bot
-    if app_url:
+    if lease_manager:
+        group_executor.on_reject = forward_rejected
+    group_executor.start()
+    if not lease_manager:
+        restore_games(updater.job_queue)
+        restore_recharges(updater.job_queue)
+    game_store.start(game_flush_interval)
+    counter_store.start(counter_flush_interval)
+    if lease_manager:
+        # The router sets the webhook and forwards the updates of the worker's shards
+        updater.start_webhook(listen="0.0.0.0",
+                              port=port,
+                              url_path=telegram_token)
+        lease_manager.start(lambda shards: acquire_shards(updater.job_queue, shards), release_shards)
+        updater.job_queue.run_repeating(poll_recharges, recharge_poll_interval)
+    elif app_url:
         updater.start_webhook(listen="0.0.0.0",
                               port=port,
                               url_path=telegram_token)
@@ -111,13 +208,24 @@ def main():
     # SIGTERM or SIGABRT. This should be used most of the time, since
     # start_polling() is non-blocking and will stop the bot gracefully.
     updater.idle()
+    group_executor.stop()
+    game_store.stop()
+    counter_store.stop()
+    if lease_manager:
+        lease_manager.stop()
+    logger.info("Connections checked out by each handler:\n%s" % format_checkout_counts())
+    logger.info("Group setting cache: %d hits, %d misses" % (group_setting_cache.hits, group_setting_cache.misses))
+    logger.info("Connection pool:\n%s" % format_pool_stats(engine.pool))
+    logger.info(group_executor.format_depths())
+    logger.info("Game write conflicts: %d" % game_store.num_conflicts)
 
 
 # Sends start message
 @run_async
-def start(bot, update):
+@unit_of_work(session_factory)
+def start(bot, update, s):
     tele_id = update.message.chat.id
-    install_lang(tele_id)
+    _ = get_translator(s, tele_id)
 
     if update.message.chat.type not in (Chat.GROUP, Chat.SUPERGROUP):
         message = _("Welcome to Big Two Moderator. Add me into a group and type /startgame to start a game.\n\nYou "
@@ -125,31 +233,27 @@ def start(bot, update):
                     "/setlang for changing the bot's language in a group if you are a group admin.")
 
         bot.send_message(tele_id, message)
-        make_player_stat(tele_id, update.message.from_user.first_name)
+        make_player_stat(s, tele_id, update.message.from_user.first_name)
 
 
 # Creates player's stats
-def make_player_stat(player_tele_id, player_name):
-    session = scoped_session(session_factory)
-    s = session()
-
-    if not s.query(PlayerStat).filter(PlayerStat.tele_id == player_tele_id).first():
+def make_player_stat(s, player_tele_id, player_name):
+    if not get_player_stat(s, player_tele_id):
         try:
-            player_stat = PlayerStat(tele_id=player_tele_id, player_name=player_name, num_games=0, num_games_won=0,
-                                     num_cards=0, win_rate=0, money=init_money, money_earned=0)
-            s.add(player_stat)
-            s.commit()
+            with s.begin_nested():
+                player_stat = PlayerStat(tele_id=player_tele_id, player_name=player_name, num_games=0,
+                                         num_games_won=0, num_cards=0, win_rate=0, money=init_money, money_earned=0)
+                s.add(player_stat)
         except:
-            s.rollback()
-
-    session.remove()
+            pass
 
 
 # Sends help message
 @run_async
-def help_msg(bot, update):
+@unit_of_work(session_factory)
+def help_msg(bot, update, s):
     player_tele_id = update.message.from_user.id
-    install_lang(player_tele_id)
+    _ = get_translator(s, player_tele_id)
     keyboard = [[InlineKeyboardButton("Rate me", "https://t.me/storebot?start=biggytwobot")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -166,13 +270,15 @@ def help_msg(bot, update):
 
 # Sends command message
 @run_async
-def command(bot, update):
+@unit_of_work(session_factory)
+def command(bot, update, s):
     player_tele_id = update.message.from_user.id
-    install_lang(player_tele_id)
+    _ = get_translator(s, player_tele_id)
 
     message = _("/setlang - Set your or the group's bot language\n"
                 "/setjointimer <timer> - Set the timer for joining the game (e.g. /setjointimer 30)\n"
                 "/setpasstimer <timer> - Set the timer for automatic pass (e.g. /setpasstimer 30)\n"
+                "/setaiplayers <on|off> - Set if AI players fill the empty seats (e.g. /setaiplayers on)\n"
                 "/startgame - Start a new game\n"
                 "/join - Join a game\n"
                 "/forcestop - Force to stop a game\n"
@@ -188,9 +294,10 @@ def command(bot, update):
 
 # Sends donate message
 @run_async
-def donate(bot, update):
+@unit_of_work(session_factory)
+def donate(bot, update, s):
     player_tele_id = update.message.from_user.id
-    install_lang(player_tele_id)
+    _ = get_translator(s, player_tele_id)
     message = _("Want to help keep me online? Please donate to %s through PayPal.\n\nDonations "
                 "help me to stay on my server and keep running.") % dev_email
     try:
@@ -201,14 +308,15 @@ def donate(bot, update):
 
 # Sends set language message
 @run_async
-def set_lang(bot, update):
+@unit_of_work(session_factory)
+def set_lang(bot, update, s):
     if update.message.chat.type == Chat.PRIVATE:
         tele_id = update.message.from_user.id
-        install_lang(tele_id)
+        _ = get_translator(s, tele_id)
         message = _("Pick your default language from below\n\n")
     elif update.message.chat.type in (Chat.GROUP, Chat.SUPERGROUP):
         tele_id = update.message.chat.id
-        install_lang(tele_id)
+        _ = get_translator(s, tele_id)
         message = _("Pick the group's default language from below\n\n")
 
         member = bot.get_chat_member(update.message.chat.id, update.message.from_user.id)
@@ -240,30 +348,41 @@ def set_lang(bot, update):
 
 # Sets join timer
 @run_async
-def set_join_timer(bot, update, args):
+@unit_of_work(session_factory)
+def set_join_timer(bot, update, s, args):
     if args:
-        set_group_setting(bot, update, "join", args[0])
+        set_group_setting(bot, update, s, "join", args[0])
 
 
 # Sets pass timer
 @run_async
-def set_pass_timer(bot, update, args):
+@unit_of_work(session_factory)
+def set_pass_timer(bot, update, s, args):
     if args:
-        set_group_setting(bot, update, "pass", args[0])
+        set_group_setting(bot, update, s, "pass", args[0])
 
 
 # Sets game mode
 @run_async
-def set_game_mode(bot, update, args):
+@unit_of_work(session_factory)
+def set_game_mode(bot, update, s, args):
+    if args:
+        set_group_setting(bot, update, s, game_mode=args[0])
+
+
+# Sets if AI players fill the empty seats
+@run_async
+@unit_of_work(session_factory)
+def set_ai_players(bot, update, s, args):
     if args:
-        set_group_setting(bot, update, game_mode=args[0])
+        set_group_setting(bot, update, s, ai_players=args[0])
 
 
 # Changes the group settings
-def set_group_setting(bot, update, timer_type=None, timer=None, game_mode=None):
+def set_group_setting(bot, update, s, timer_type=None, timer=None, game_mode=None, ai_players=None):
     group_tele_id = update.message.chat.id
     player_tele_id = update.message.from_user.id
-    install_lang(player_tele_id)
+    _ = get_translator(s, player_tele_id)
 
     if update.message.chat.type not in (Chat.GROUP, Chat.SUPERGROUP):
         message = _("You can only use this command in a group")
@@ -275,22 +394,39 @@ def set_group_setting(bot, update, timer_type=None, timer=None, game_mode=None):
         bot.send_message(player_tele_id, _("You are not a group admin"))
         return
 
-    session = scoped_session(session_factory)
-    s = session()
-    if s.query(Game).filter(Game.group_tele_id == group_tele_id).first():
+    if game_store.get_game(group_tele_id):
         bot.send_message(player_tele_id, _("You can only change the group's settings when a game is not running"))
         return
 
     if re.match("/set(join|pass)timer", update.message.text):
-        session.remove()
-        set_game_timer(bot, group_tele_id, timer_type, timer)
+        set_game_timer(bot, s, group_tele_id, timer_type, timer)
+    elif ai_players is not None:
+        ai_players = ai_players.lower()
+        if ai_players not in ("on", "off"):
+            bot.send_message(group_tele_id, _("AI players can either be set to 'on' or 'off'"))
+            return
+
+        group_settings = get_group_setting(s, group_tele_id)
+        try:
+            with s.begin_nested():
+                if group_settings:
+                    group_settings.ai_players = ai_players == "on"
+                else:
+                    group_settings = new_group_setting(group_tele_id)
+                    group_settings.ai_players = ai_players == "on"
+                    s.add(group_settings)
+        except:
+            return
+
+        group_setting_cache.invalidate(group_tele_id, s)
+        bot.send_message(group_tele_id, _("AI players have been set to '%s'") % ai_players)
     else:
         game_mode = game_mode.lower()
         if game_mode not in ("normal", "money"):
             bot.send_message(group_tele_id, _("Game mode can either be set to 'normal' or 'money'"))
             return
 
-        group_settings = s.query(GroupSetting).filter(GroupSetting.tele_id == group_tele_id).first()
+        group_settings = get_group_setting(s, group_tele_id)
         if group_settings:
             if game_mode == "normal":
                 group_settings.money_mode = False
@@ -298,24 +434,20 @@ def set_group_setting(bot, update, timer_type=None, timer=None, game_mode=None):
                 group_settings.money_mode = True
         else:
             try:
-                if game_mode == "normal":
-                    group_settings = GroupSetting(tele_id=group_tele_id, money_mode=False)
-                else:
-                    group_settings = GroupSetting(tele_id=group_tele_id, money_mode=True)
-                s.add(group_settings)
-                s.commit()
+                with s.begin_nested():
+                    group_settings = new_group_setting(group_tele_id)
+                    group_settings.money_mode = game_mode == "money"
+                    s.add(group_settings)
             except:
-                s.rollback()
-                session.remove()
                 return
 
-        session.remove()
+        group_setting_cache.invalidate(group_tele_id, s)
         bot.send_message(group_tele_id, _("Game mode has been set to '%s'") % game_mode)
 
 
 # Sets game timer
-def set_game_timer(bot, group_tele_id, timer_type, timer):
-    install_lang(group_tele_id)
+def set_game_timer(bot, s, group_tele_id, timer_type, timer):
+    _ = get_translator(s, group_tele_id)
 
     if not re.match("\d+", timer) or (timer_type == "join" and int(timer) not in range(10, 301)) or \
             (timer_type == "pass" and int(timer) not in range(20, 121)):
@@ -327,9 +459,7 @@ def set_game_timer(bot, group_tele_id, timer_type, timer):
         return
 
     timer = int(timer)
-    session = scoped_session(session_factory)
-    s = session()
-    group_settings = s.query(GroupSetting).filter(GroupSetting.tele_id == group_tele_id).first()
+    group_settings = get_group_setting(s, group_tele_id)
 
     if group_settings:
         if timer_type == "join":
@@ -338,19 +468,17 @@ def set_game_timer(bot, group_tele_id, timer_type, timer):
             group_settings.pass_timer = timer
     else:
         try:
-            if timer_type == "join":
-                group_settings = GroupSetting(tele_id=group_tele_id, join_timer=timer)
-            else:
-                group_settings = GroupSetting(tele_id=group_tele_id, pass_timer=timer)
-            s.add(group_settings)
-            s.commit()
+            with s.begin_nested():
+                group_settings = new_group_setting(group_tele_id)
+                if timer_type == "join":
+                    group_settings.join_timer = timer
+                else:
+                    group_settings.pass_timer = timer
+                s.add(group_settings)
         except:
-            s.rollback()
-            session.remove()
             return
 
-    s.commit()
-    session.remove()
+    group_setting_cache.invalidate(group_tele_id, s)
 
     if timer_type == "join":
         bot.send_message(group_tele_id, _("Join timer has been set to %ds") % timer)
@@ -359,65 +487,52 @@ def set_game_timer(bot, group_tele_id, timer_type, timer):
 
 
 # Starts a new game
-def start_game(bot, update, job_queue):
+@run_in_group(group_executor, message_group)
+@unit_of_work(session_factory)
+def start_game(bot, update, s, job_queue):
     group_tele_id = update.message.chat.id
     player_name = update.message.from_user.first_name
-    install_lang(update.message.from_user.id)
+    _ = get_translator(s, update.message.from_user.id)
 
     if update.message.chat.type not in (Chat.GROUP, Chat.SUPERGROUP):
         bot.send_message(group_tele_id, _("You can only use this command in a group"))
         return
 
-    if not can_msg_player(bot, update):
+    if not can_msg_player(bot, update, s):
         return
 
-    session = scoped_session(session_factory)
-    s = session()
-    if s.query(Game).filter(Game.group_tele_id == group_tele_id).first():
-        session.remove()
+    if not game_store.add_game(GameState(group_tele_id)):
         bot.send_message(update.message.from_user.id, _("A game has already been started"))
         return
 
-    try:
-        game = Game(group_tele_id=group_tele_id, game_round=1, curr_player=-1, biggest_player=-1, count_pass=0,
-                    curr_cards=pydealer.Stack(), prev_cards=pydealer.Stack())
-        s.add(game)
-        s.commit()
-        session.remove()
-    except:
-        s.rollback()
-        session.remove()
-        return
-
-    install_lang(group_tele_id)
+    _ = get_translator(s, group_tele_id)
     text = _("[%s] has started Big Two. Type /join to join the game\n\n") % player_name
 
     bot.send_message(chat_id=group_tele_id,
                      text=text,
                      disable_notification=True)
 
-    make_group_setting(group_tele_id)
+    make_group_setting(s, group_tele_id)
     join(bot, update, job_queue)
 
 
 # Creates group settings
-def make_group_setting(group_tele_id):
-    session = scoped_session(session_factory)
-    s = session()
-
-    if not s.query(GroupSetting).filter(GroupSetting.tele_id == group_tele_id).first():
+def make_group_setting(s, group_tele_id):
+    if not group_setting_cache.get(s, group_tele_id):
         try:
-            group_settings = GroupSetting(tele_id=group_tele_id, join_timer=60, pass_timer=45, money_mode=False)
-            s.add(group_settings)
-            s.commit()
+            with s.begin_nested():
+                s.add(new_group_setting(group_tele_id))
         except:
-            s.rollback()
+            pass
+
 
-    session.remove()
+# Returns the default group settings, which a setting command changes one of
+def new_group_setting(group_tele_id):
+    return GroupSetting(tele_id=group_tele_id, join_timer=60, pass_timer=45, money_mode=False, ai_players=False)
 
 
 # Checks if bot is authorised to send user messages
-def can_msg_player(bot, update):
+def can_msg_player(bot, update, s):
     is_success = True
     player_tele_id = update.message.from_user.id
 
@@ -429,7 +544,7 @@ def can_msg_player(bot, update):
         is_success = False
         player_name = update.message.from_user.first_name
         group_tele_id = update.message.chat.id
-        install_lang(group_tele_id)
+        _ = get_translator(s, group_tele_id)
 
         text = _("[%s] Please PM [@biggytwobot] and say [/start]. Otherwise, you won't be able "
                  "to join and play Big Two") % player_name
@@ -443,200 +558,196 @@ def can_msg_player(bot, update):
 
 
 # Joins a new game
-def join(bot, update, job_queue):
+@run_in_group(group_executor, message_group)
+@unit_of_work(session_factory)
+def join(bot, update, s, job_queue):
     player_name = update.message.from_user.first_name
     player_tele_id = update.message.from_user.id
     group_name = update.message.chat.title
     group_tele_id = update.message.chat.id
 
-    make_player_stat(player_tele_id, player_name)
-    install_lang(player_tele_id)
+    make_player_stat(s, player_tele_id, player_name)
+    _ = get_translator(s, player_tele_id)
 
     if update.message.chat.type not in (Chat.GROUP, Chat.SUPERGROUP):
         bot.send_message(player_tele_id, _("You can only use this command in a group"))
         return
 
-    if not can_msg_player(bot, update):
+    if not can_msg_player(bot, update, s):
         return
 
     # Checks if there exists a game
-    session = scoped_session(session_factory)
-    s = session()
-    if not s.query(Game).filter(Game.group_tele_id == group_tele_id).first():
+    game = game_store.get_game(group_tele_id)
+    if not game:
         text = _("A game has not been started yet. Type /startgame in a group to start a game.")
         bot.send_message(player_tele_id, text)
         return
 
     # Checks if player is in game
-    if s.query(Player).filter(Player.player_tele_id == player_tele_id).first():
+    if game_store.get_player(player_tele_id):
         bot.send_message(player_tele_id, _("You have already joined a game"))
         return
 
-    num_players = s.query(Player).filter(Player.group_tele_id == group_tele_id).count()
-
     # Checks for valid number of players
-    if num_players < 4:
-        join_timer, pass_timer, money_mode = s.\
-            query(GroupSetting.join_timer, GroupSetting.pass_timer, GroupSetting.money_mode).\
-            filter(GroupSetting.tele_id == group_tele_id).first()
-
-        if money_mode:
-            player_money = s.query(PlayerStat.money).filter(PlayerStat.tele_id == player_tele_id).first()[0]
-            if player_money == 0:
-                recharge_time = recharge_times[player_tele_id].shift(seconds=recharge_delay)
-                text = _("You don't have any money left to join the game.\n\n")
-                text += _("You can consider to buy me a /coffee to recharge your money immediately.\n\n")
-                text += _("Or wait for your money to be recharged %s.") % recharge_time.humanize()
-
-                bot.send_message(player_tele_id, text)
-                return
+    if len(game.players) < 4:
+        settings = group_setting_cache.get(s, group_tele_id)
+        join_timer, pass_timer, money_mode = settings.join_timer, settings.pass_timer, settings.money_mode
+        player_money = get_player_money(s, player_tele_id) if money_mode else None
+
+        if money_mode and player_money == 0:
+            recharge_time = get_recharge_time(s, player_tele_id)
+            if recharge_time is None:
+                # The player ran out of money before the recharge times were kept
+                recharge_time = time.time() + recharge_delay
+                set_recharge_time(s, [player_tele_id], recharge_time)
+                schedule_recharge(job_queue, player_tele_id, recharge_time)
+
+            text = _("You don't have any money left to join the game.\n\n")
+            text += _("You can consider to buy me a /coffee to recharge your money immediately.\n\n")
+            text += _("Or wait for your money to be recharged %s.") % arrow.get(recharge_time).humanize()
+
+            bot.send_message(player_tele_id, text)
+            return
 
-        try:
-            player = Player(group_tele_id=group_tele_id, player_tele_id=player_tele_id, player_name=player_name,
-                            player_id=num_players, cards=pydealer.Stack(), num_cards=13)
-            s.add(player)
-            s.commit()
-            session.remove()
-            num_players += 1
-        except:
-            s.rollback()
-            session.remove()
+        player = PlayerState(group_tele_id, player_tele_id, player_name)
+        if not game_store.add_player(game, player):
             return
+        num_players = player.player_id + 1
 
-        install_lang(group_tele_id)
+        _ = get_translator(s, group_tele_id)
         text = (_("[%s] has joined.\nThere are now %d/4 Players\n") % (player_name, num_players))
 
         if group_tele_id in queued_jobs:
             queued_jobs[group_tele_id].schedule_removal()
 
         if num_players != 4:
-            job = job_queue.run_once(stop_empty_game, join_timer, context=group_tele_id)
-            queued_jobs[group_tele_id] = job
+            arm_timer(job_queue, game, stop_empty_game, join_timer, group_tele_id)
             text += _("%ss left to join") % join_timer
 
         bot.send_message(chat_id=group_tele_id, text=text, disable_notification=True)
 
-        install_lang(player_tele_id)
+        _ = get_translator(s, player_tele_id)
         bot.send_message(player_tele_id, _("You have joined the game in the group [%s]") % group_name)
 
         if num_players == 4:
-            install_lang(group_tele_id)
-            text = _("Enough players, game start. I will PM your deck of cards when it is your turn. ")
-            text += _("Each player has %ss to pick your cards") % pass_timer
-            bot.send_message(chat_id=group_tele_id, text=text, disable_notification=True)
+            begin_game(bot, s, group_tele_id, pass_timer, job_queue)
+
+
+# Starts a game with 4 players
+def begin_game(bot, s, group_tele_id, pass_timer, job_queue):
+    _ = get_translator(s, group_tele_id)
+    text = _("Enough players, game start. I will PM your deck of cards when it is your turn. ")
+    text += _("Each player has %ss to pick your cards") % pass_timer
+    bot.send_message(chat_id=group_tele_id, text=text, disable_notification=True)
 
-            setup_game(group_tele_id)
-            game_message(bot, group_tele_id)
-            player_message(bot, group_tele_id, job_queue)
+    game_store.get_game(group_tele_id).pass_timer = pass_timer
+    setup_game(group_tele_id)
+    game_message(bot, s, group_tele_id)
+    player_message(bot, s, group_tele_id, job_queue)
 
 
 # Stops a game without enough players
-def stop_empty_game(bot, job):
+@run_in_group(group_executor, job_group)
+@unit_of_work(session_factory)
+def stop_empty_game(bot, job, s):
     group_tele_id = job.context
-    install_lang(group_tele_id)
+    if add_ai_players(bot, s, group_tele_id, job.job_queue):
+        return
+
+    _ = get_translator(s, group_tele_id)
     bot.send_message(group_tele_id, _("Game has been stopped by me since there is no enough players."))
 
     delete_game_data(group_tele_id)
 
 
+# Fills the empty seats with AI players if the group allows it, returns if the game has started
+def add_ai_players(bot, s, group_tele_id, job_queue):
+    settings = group_setting_cache.get(s, group_tele_id)
+
+    game = game_store.get_game(group_tele_id)
+    if not settings.ai_players or not game or not game.players:
+        return False
+
+    num_players = len(game.players)
+    for player_id in range(num_players, 4):
+        player = PlayerState(group_tele_id, ai_player_tele_id(group_tele_id, player_id),
+                             "AI %d" % (player_id - num_players + 1))
+        if not game_store.add_player(game, player):
+            return False
+
+    _ = get_translator(s, group_tele_id)
+    bot.send_message(group_tele_id, _("%d AI players have joined the game") % (4 - num_players),
+                     disable_notification=True)
+    begin_game(bot, s, group_tele_id, settings.pass_timer, job_queue)
+
+    return True
+
+
 # Deletes game data with the given group telegram ID
 def delete_game_data(group_tele_id):
     if group_tele_id in queued_jobs:
         queued_jobs[group_tele_id].schedule_removal()
 
-    session = scoped_session(session_factory)
-    s = session()
-    game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
-    s.delete(game)
-    s.commit()
-    session.remove()
+    game_store.delete_game(group_tele_id)
 
 
 # Sets up a game
 def setup_game(group_tele_id):
-    session = scoped_session(session_factory)
-    s = session()
-    player_tele_ids = s.query(Player.player_tele_id).filter(Player.group_tele_id == group_tele_id).all()
-    random.shuffle(player_tele_ids)
+    game = game_store.get_game(group_tele_id)
+    players = list(game.players)
+    random.shuffle(players)
 
-    # Creates a deck of cards in random order
-    deck = pydealer.Deck(ranks=pydealer.BIG2_RANKS)
-    deck.shuffle()
+    # Deals a deck of cards in random order
+    hands = deal_hands(len(players))
 
     # Sets up players
     curr_player = -1
 
-    for i, player_tele_id in enumerate(player_tele_ids):
-        player_cards = pydealer.Stack(cards=deck.deal(13))
-        player_cards.sort(ranks=pydealer.BIG2_RANKS)
-
-        # Player with ♦3 starts first
-        if player_cards.find("3D"):
-            curr_player = i
+    with game_store.change(game):
+        for i, (player, player_cards) in enumerate(zip(players, hands)):
+            player.player_id = i
+            player.cards = stack_to_mask(player_cards)
 
-        player = s.query(Player).filter(Player.player_tele_id == player_tele_id).first()
-        player.player_id = i
-        player.cards = player_cards
-        s.commit()
+            # Player with ♦3 starts first
+            if player.cards & THREE_OF_DIAMONDS:
+                curr_player = i
 
-    game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
-    game.curr_player = game.biggest_player = curr_player
-    s.commit()
-    session.remove()
+        game.players = players
+        game.curr_player = game.biggest_player = curr_player
 
 
 # Sends message to game group
-def game_message(bot, group_tele_id):
-    install_lang(group_tele_id)
-    text = ""
-    session = scoped_session(session_factory)
-    s = session()
-
-    game_round, curr_player, biggest_player, curr_player_name = s. \
-        query(Game.game_round, Game.curr_player, Game.biggest_player, Player.player_name). \
-        filter(Game.group_tele_id == group_tele_id, Player.player_id == Game.curr_player).first()
-
-    if game_round > 1 and curr_player != (biggest_player + 1) % 4:
-        prev_player_id = (curr_player - 1) % 4
-        prev_player_name = s.query(Player.player_name). \
-            filter(Player.group_tele_id == group_tele_id, Player.player_id == prev_player_id).first()
-
-        text += "--------------------------------------\n"
-        text += _("%s decided to PASS\n") % prev_player_name
-
-    session.remove()
-    text += "--------------------------------------\n"
-    text += _("%s's Turn\n") % curr_player_name
-    text += "--------------------------------------\n"
-
-    text += get_game_message(group_tele_id, game_round, curr_player, biggest_player)
+def game_message(bot, s, group_tele_id):
+    game = game_store.load(s, group_tele_id)
+    if not game:
+        return
 
-    bot.send_message(group_tele_id, text, disable_notification=True)
+    _ = get_translator(s, group_tele_id)
+    bot.send_message(group_tele_id, get_turn_message(game, _), disable_notification=True)
 
 
 # Sends message to player
-def player_message(bot, group_tele_id, job_queue, is_sort_suit=False, is_edit=False, message_id=None):
+def player_message(bot, s, group_tele_id, job_queue, is_sort_suit=False, is_edit=False, message_id=None):
     text = ""
-    session = scoped_session(session_factory)
-    s = session()
-
-    game, player = s.query(Game, Player). \
-        filter(Game.group_tele_id == group_tele_id, Player.group_tele_id == group_tele_id,
-               Player.player_id == Game.curr_player).first()
-    game_round, curr_player, biggest_player, cards = \
-        game.game_round, game.curr_player, game.biggest_player, game.curr_cards
+    game = game_store.load(s, group_tele_id)
+    if not game:
+        return
+
+    player = game.get_curr_player()
     player_tele_id = player.player_tele_id
 
-    session.remove()
-    install_lang(player_tele_id)
-    text += get_game_message(group_tele_id, game_round, curr_player, biggest_player)
+    if is_ai_player(player_tele_id):
+        arm_timer(job_queue, game, ai_turn, ai_move_delay, group_tele_id)
+        return
+
+    _ = get_translator(s, player_tele_id)
+    text += get_game_message(game, _)
 
     # Checks if to display selected cards
-    if cards:
-        cards.sort(ranks=pydealer.BIG2_RANKS)
+    if game.curr_cards:
         text += _("Selected cards:\n")
 
-        for card in cards:
+        for card in mask_to_stack(game.curr_cards):
             text += suit_unicode(card.suit)
             text += " "
             text += str(card.value)
@@ -644,13 +755,11 @@ def player_message(bot, group_tele_id, job_queue, is_sort_suit=False, is_edit=Fa
 
         text += "--------------------------------------\n"
 
-    cards = player.cards
+    cards = mask_to_stack(player.cards)
     card_list = []
 
     if is_sort_suit:
         cards = sorted(cards.cards, key=lambda x: x.suit)
-    else:
-        cards.sort(ranks=pydealer.BIG2_RANKS)
 
     for card in cards:
         show_card = suit_unicode(card.suit)
@@ -681,64 +790,125 @@ def player_message(bot, group_tele_id, job_queue, is_sort_suit=False, is_edit=Fa
         bot_message = bot.send_message(chat_id=player_tele_id, text=text, reply_markup=reply_markup)
         message_id = bot_message.message_id
 
-    job_context = "%d,%d,%d" % (group_tele_id, player_tele_id, message_id)
-    pass_timer = s.query(GroupSetting.pass_timer).filter(GroupSetting.tele_id == group_tele_id).first()[0]
-    job = job_queue.run_once(pass_round, pass_timer, context=job_context)
-    queued_jobs[group_tele_id] = job
+    arm_timer(job_queue, game, pass_round, game.pass_timer, pass_context(game, message_id), message_id)
 
 
-# Returns a string a message that contains info of the game
-def get_game_message(group_tele_id, game_round, curr_player, biggest_player):
-    text = ""
-    session = scoped_session(session_factory)
-    s = session()
-
-    player_name = s.query(Player.player_name). \
-        filter(Player.group_tele_id == group_tele_id, Player.player_id == curr_player).first()
-    biggest_player_name = s.query(Player.player_name). \
-        filter(Player.group_tele_id == group_tele_id, Player.player_id == biggest_player).first()
-
-    # Stores the number of cards that each player has
-    playes_info = {}
-    players = s.query(Player).filter(Player.group_tele_id == group_tele_id).all()
-    for player in players:
-        player_id, player_name, num_cards = player.player_id, player.player_name, player.num_cards
-        player = "%d. %s" % (player_id, player_name)
-        playes_info[player] = num_cards
-
-    # Displays the number of cards that each player has
-    for player in sorted(playes_info.keys()):
-        text += _("%s has %d cards\n") % (player, playes_info[player])
-    text += "--------------------------------------\n"
-
-    # Checks if player is in control
-    if game_round > 1 and curr_player == biggest_player:
-        text += _("%s is in control now\n") % player_name
-        text += "--------------------------------------\n"
-    elif game_round > 1:
-        text += _("%s used:\n") % biggest_player_name
-        game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
-        cards = game.prev_cards
+# The context of a pass_round job, which passes the current player's turn of the current round
+def pass_context(game, message_id):
+    return "%d,%d,%d,%d" % (game.group_tele_id, game.get_curr_player().player_tele_id, message_id, game.game_round)
 
-        for card in cards:
-            text += suit_unicode(card.suit)
-            text += " "
-            text += str(card.value)
-            text += "\n"
 
-        text += "--------------------------------------\n"
+# Runs callback after delay seconds as the group's timer, the deadline is kept with the game for warm restarts
+def arm_timer(job_queue, game, callback, delay, context, message_id=None):
+    queued_jobs[game.group_tele_id] = job_queue.run_once(callback, delay, context=context)
+    with game_store.change(game):
+        game.deadline = time.time() + delay
+        game.message_id = message_id
+
+
+# Loads the running games after a restart, or the ones of the shards that the worker has acquired, and re-arms their
+# timers with the time left before their deadlines
+def restore_games(job_queue, shards=None):
+    s = session_factory()
+    try:
+        games = game_store.load_all(s, (lambda group_tele_id: get_shard(group_tele_id, num_shards) in shards)
+                                    if shards else None)
+    finally:
+        s.close()
+
+    now = time.time()
+    for game in games:
+        delay = max(game.deadline - now, 0) if game.deadline else 0
+        group_tele_id = game.group_tele_id
+
+        if game.curr_player < 0:
+            queued_jobs[group_tele_id] = job_queue.run_once(stop_empty_game, delay, context=group_tele_id)
+        elif is_ai_player(game.get_curr_player().player_tele_id):
+            queued_jobs[group_tele_id] = job_queue.run_once(ai_turn, delay, context=group_tele_id)
+        elif game.message_id is not None:
+            job_context = pass_context(game, game.message_id)
+            queued_jobs[group_tele_id] = job_queue.run_once(pass_round, delay, context=job_context)
+        else:
+            # The player's cards were not sent before the restart
+            queued_jobs[group_tele_id] = job_queue.run_once(resume_game, 0, context=group_tele_id)
 
-    session.remove()
+    logger.info("Restored %d running games" % len(games))
 
-    return text
+
+# Drops the cached languages and settings of the shards that the worker has acquired, which their last worker could have
+# changed, and restores their games
+def acquire_shards(job_queue, shards):
+    def is_in_shards(tele_id):
+        return get_shard(tele_id, num_shards) in shards
+
+    language_cache.invalidate_if(is_in_shards)
+    group_setting_cache.invalidate_if(is_in_shards)
+    restore_games(job_queue, shards)
+    restore_recharges(job_queue, is_in_shards)
+
+
+# Forgets the games of the shards that another worker takes over and cancels their timers
+def release_shards(shards):
+    group_tele_ids = game_store.unload(lambda group_tele_id: get_shard(group_tele_id, num_shards) in shards)
+    for group_tele_id in group_tele_ids:
+        job = queued_jobs.pop(group_tele_id, None)
+        if job:
+            job.schedule_removal()
+
+    # The recharges of the shards' players are left to their new worker
+    for player_tele_id in list(recharge_jobs):
+        if get_shard(player_tele_id, num_shards) in shards:
+            job = recharge_jobs.pop(player_tele_id, None)
+            if job:
+                job.schedule_removal()
+
+    logger.info("Unloaded %d running games" % len(group_tele_ids))
+
+
+# Schedules the recharges kept in the database that are not scheduled yet, of the players that include returns True
+# for if it is given
+def restore_recharges(job_queue, include=None):
+    s = session_factory()
+    try:
+        recharge_times = get_recharge_times(s)
+    finally:
+        s.close()
+
+    for player_tele_id, recharge_time in recharge_times:
+        if (include is None or include(player_tele_id)) and player_tele_id not in recharge_jobs:
+            schedule_recharge(job_queue, player_tele_id, recharge_time)
+
+
+# Picks up the recharges of the worker's players that other workers have kept in the database
+def poll_recharges(bot, job):
+    restore_recharges(job.job_queue)
+
+
+# Sends an update of a shard that the worker has given up to the shard's new worker, as the router has already
+# answered Telegram for it
+def forward_rejected(key, func, args, kwargs):
+    update = args[1] if len(args) > 1 else None
+    if not isinstance(update, Update):
+        return
+
+    if update_router.forward(update.to_dict(), update.to_json().encode("utf-8")) != 200:
+        logger.warning("Update %d of group %s was lost while its shard moved" % (update.update_id, key))
+
+
+# Sends the current player's cards of a restored game
+@run_in_group(group_executor, job_group)
+@unit_of_work(session_factory)
+def resume_game(bot, job, s):
+    player_message(bot, s, job.context, job.job_queue)
 
 
 # Forces to stop a game (admin only)
-@run_async
-def force_stop(bot, update):
+@run_in_group(group_executor, message_group)
+@unit_of_work(session_factory)
+def force_stop(bot, update, s):
     group_tele_id = update.message.chat.id
     player_tele_id = update.message.from_user.id
-    install_lang(player_tele_id)
+    _ = get_translator(s, player_tele_id)
 
     if update.message.chat.type not in (Chat.GROUP, Chat.SUPERGROUP):
         bot.send_message(player_tele_id, _("You can only use this command in a group"))
@@ -749,15 +919,11 @@ def force_stop(bot, update):
         bot.send_message(player_tele_id, _("You are not a group admin"))
         return
 
-    session = scoped_session(session_factory)
-    s = session()
-    if not s.query(Game).filter(Game.group_tele_id == group_tele_id).first():
+    if not game_store.get_game(group_tele_id):
         bot.send_message(player_tele_id, _("No game is running at the moment"))
-        session.remove()
         return
-    session.remove()
 
-    install_lang(group_tele_id)
+    _ = get_translator(s, group_tele_id)
     message = (_("Game has been stopped by [%s]") %
                update.message.from_user.first_name)
     bot.send_message(group_tele_id, message)
@@ -767,24 +933,22 @@ def force_stop(bot, update):
 
 # Shows the deck of cards of the player
 @run_async
-def show_deck(bot, update):
+@unit_of_work(session_factory)
+def show_deck(bot, update, s):
     player_tele_id = update.message.from_user.id
-    install_lang(player_tele_id)
-    session = scoped_session(session_factory)
-    s = session()
-    cards = s.query(Player.cards).filter(Player.player_tele_id == player_tele_id).first()[0]
-    session.remove()
+    _ = get_translator(s, player_tele_id)
+    player = game_store.get_player(player_tele_id)
 
-    if not cards:
+    if not player:
         bot.send_message(player_tele_id, _("You are not in a game"))
         return
 
-    if cards.size == 0:
+    if not player.cards:
         bot.send_message(player_tele_id, _("Game has not started yet"))
         return
 
     text = _("Your deck of cards:\n")
-    for card in cards:
+    for card in mask_to_stack(player.cards):
         text += suit_unicode(card.suit)
         text += " "
         text += str(card.value)
@@ -795,23 +959,18 @@ def show_deck(bot, update):
 
 # Shows stats
 @run_async
-def show_stat(bot, update):
+@unit_of_work(session_factory)
+def show_stat(bot, update, s):
     if update.message.chat.type in (Chat.PRIVATE, Chat.GROUP, Chat.SUPERGROUP):
-        session = scoped_session(session_factory)
-        s = session()
-        num_games = s.query(sql.func.sum(GroupStat.num_games)).first()[0]
-        num_games = num_games if num_games else 0
-        num_players = s.query(Language).filter(Language.tele_id > 0).count()
-        num_groups = s.query(Language).filter(Language.tele_id < 0).count()
-        session.remove()
+        counts = counter_store.get_counts(s)
 
         text = "*Global stats*\n"
-        text += "Total number of games played: %d\n" % num_games
-        text += "Total number of players: %d\n" % num_players
-        text += "Total number of groups: %d\n\n" % num_groups
+        text += "Total number of games played: %d\n" % counts[GAMES]
+        text += "Total number of players: %d\n" % counts[PLAYERS]
+        text += "Total number of groups: %d\n\n" % counts[GROUPS]
 
         if update.message.chat.type == Chat.PRIVATE:
-            show_player_stat(bot, update.message.chat.id, text)
+            show_player_stat(bot, s, update.message.chat.id, text)
         else:
             player_callback_data = "playerStat,%d" % update.message.from_user.id
             keyboard = [[InlineKeyboardButton(text="Group Stats", callback_data="groupStat"),
@@ -821,11 +980,8 @@ def show_stat(bot, update):
 
 
 # Sends the player's stats
-def show_player_stat(bot, tele_id, text=""):
-    session = scoped_session(session_factory)
-    s = session()
-    player_stat = s.query(PlayerStat).filter(PlayerStat.tele_id == tele_id).first()
-    session.remove()
+def show_player_stat(bot, s, tele_id, text=""):
+    player_stat = get_player_stat(s, tele_id)
 
     if player_stat:
         num_games, num_cards, win_rate, money, money_earned = \
@@ -848,11 +1004,8 @@ def show_player_stat(bot, tele_id, text=""):
 
 
 # Sends the group's stats
-def show_group_stat(bot, tele_id):
-    session = scoped_session(session_factory)
-    s = session()
-    group_stat = s.query(GroupStat).filter(GroupStat.tele_id == tele_id).first()
-    session.remove()
+def show_group_stat(bot, s, tele_id):
+    group_stat = get_group_stat(s, tele_id)
 
     if group_stat:
         num_games, best_win_rate_player, best_win_rate, most_money_earned_player, most_money_earned = \
@@ -870,141 +1023,119 @@ def show_group_stat(bot, tele_id):
 
 
 # Handles inline buttons
-def in_line_button(bot, update, job_queue):
+@run_in_group(group_executor, callback_group)
+@unit_of_work(session_factory)
+def in_line_button(bot, update, s, job_queue):
     query = update.callback_query
     player_tele_id = query.message.chat.id
     message_id = query.message.message_id
     data = query.data
 
     if re.match("set_lang", data):
-        change_lang(bot, player_tele_id, message_id, data)
+        change_lang(bot, s, player_tele_id, message_id, data)
         return
     elif data == "groupStat":
-        show_group_stat(bot, player_tele_id)
+        show_group_stat(bot, s, player_tele_id)
         return
     elif re.match("playerStat", data):
-        show_player_stat(bot, int(data.split(",")[1]))
+        show_player_stat(bot, s, int(data.split(",")[1]))
         return
 
-    session = scoped_session(session_factory)
-    s = session()
-    player = s.query(Player).filter(Player.player_tele_id == player_tele_id).first()
+    player = game_store.get_player(player_tele_id)
 
     # Checks if player in game
     if not player:
-        session.remove()
         return
 
     group_tele_id = player.group_tele_id
-    if not s.query(Game, Player). \
-            filter(Game.group_tele_id == group_tele_id, Player.player_tele_id == player_tele_id,
-                   Game.curr_player == Player.player_id).first():
-        session.remove()
+    game = game_store.get_game(group_tele_id)
+    if not game or game.curr_player != player.player_id:
         return
 
     queued_jobs[group_tele_id].schedule_removal()
 
     if data == "pass":
-        game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
-        game.count_pass = 0
-        s.commit()
-
-        job_context = "%d,%d,%d" % (group_tele_id, player_tele_id, message_id)
-        job_queue.run_once(pass_round, 0, context=job_context)
+        with game_store.change(game):
+            game.count_pass = 0
 
-    session.remove()
+        job_queue.run_once(pass_round, 0, context=pass_context(game, message_id))
 
     if re.match("([2-9JQKA]|10)[DCHS]", data):
-        add_use_card(bot, group_tele_id, message_id, data, job_queue)
+        add_use_card(bot, s, group_tele_id, message_id, data, job_queue)
     elif data == "useCards":
-        use_selected_cards(bot, player_tele_id, group_tele_id, message_id, job_queue)
+        use_selected_cards(bot, s, player_tele_id, group_tele_id, message_id, job_queue)
     elif data == "unselect":
-        return_cards_to_deck(group_tele_id)
-        player_message(bot, group_tele_id, job_queue, is_edit=True, message_id=message_id)
+        return_cards_to_deck(game)
+        player_message(bot, s, group_tele_id, job_queue, is_edit=True, message_id=message_id)
     elif data == "sortSuit":
-        player_message(bot, group_tele_id, job_queue, is_sort_suit=True, is_edit=True, message_id=message_id)
+        player_message(bot, s, group_tele_id, job_queue, is_sort_suit=True, is_edit=True, message_id=message_id)
     elif data == "sortNum":
-        player_message(bot, group_tele_id, job_queue, is_edit=True, message_id=message_id)
+        player_message(bot, s, group_tele_id, job_queue, is_edit=True, message_id=message_id)
 
 
 # Changes the default language of a player/group
-def change_lang(bot, tele_id, message_id, data):
+def change_lang(bot, s, tele_id, message_id, data):
     new_language = data.split(",")[1]
-    session = scoped_session(session_factory)
-    s = session()
-    language = s.query(Language).filter(Language.tele_id == tele_id).first()
+    language = get_language(s, tele_id)
 
     if language:
         language.language = new_language
     else:
         try:
-            language = Language(tele_id=tele_id, language=language)
-            s.add(language)
-            s.commit()
+            with s.begin_nested():
+                language = Language(tele_id=tele_id, language=new_language)
+                s.add(language)
         except:
-            s.rollback()
-            session.remove()
             return
 
-    s.commit()
-    session.remove()
-    install_lang(tele_id)
+        count_chat(s, tele_id)
+
+    # The new language is cached once it is committed
+    language_cache.invalidate(tele_id, s)
+    _ = get_catalog(new_language).gettext
     bot.editMessageText(text=_("Default language has been set"), chat_id=tele_id, message_id=message_id)
 
 
 # Adds a selected card
-def add_use_card(bot, group_tele_id, message_id, card_abbrev, job_queue):
-    session = scoped_session(session_factory)
-    s = session()
-    game, player = s.query(Game, Player). \
-        filter(Game.group_tele_id == group_tele_id, Player.group_tele_id == group_tele_id,
-               Player.player_id == Game.curr_player).first()
-
-    curr_cards = pydealer.Stack(cards=game.curr_cards)
-    player_cards = pydealer.Stack(cards=player.cards)
-    cards = player_cards.get(card_abbrev)
-
-    if cards:
-        curr_cards.add(cards[0])
-        game.curr_cards, player.cards = curr_cards, player_cards
-        s.commit()
-        session.remove()
-
-        player_message(bot, group_tele_id, job_queue, is_edit=True, message_id=message_id)
-    else:
-        session.remove()
+def add_use_card(bot, s, group_tele_id, message_id, card_abbrev, job_queue):
+    game = game_store.get_game(group_tele_id)
+    player = game.get_curr_player()
+    card = 1 << ABBREV_INTS[card_abbrev]
+
+    if player.cards & card:
+        with game_store.change(game):
+            game.curr_cards |= card
+            player.cards &= ~card
+
+        player_message(bot, s, group_tele_id, job_queue, is_edit=True, message_id=message_id)
 
 
 # Uses the selected cards
-def use_selected_cards(bot, player_tele_id, group_tele_id, message_id, job_queue):
-    install_lang(player_tele_id)
+def use_selected_cards(bot, s, player_tele_id, group_tele_id, message_id, job_queue):
+    _ = get_translator(s, group_tele_id if is_ai_player(player_tele_id) else player_tele_id)
     valid = True
     bigger = True
 
-    session = scoped_session(session_factory)
-    s = session()
-    game, player = s.query(Game, Player). \
-        filter(Game.group_tele_id == group_tele_id, Player.group_tele_id == group_tele_id,
-               Player.player_id == Game.curr_player).first()
-    game_round, curr_player, biggest_player, curr_cards, prev_cards = \
-        game.game_round, game.curr_player, game.biggest_player, game.curr_cards, game.prev_cards
+    game = game_store.get_game(group_tele_id)
+    player = game.get_curr_player()
+    curr_player, biggest_player, curr_cards, prev_cards = \
+        game.curr_player, game.biggest_player, game.curr_cards, game.prev_cards
     player_name, num_cards = player.player_name, player.num_cards
 
-    if curr_cards.size == 0:
+    if not curr_cards:
         return
 
+    check_result = check_cards(curr_player, biggest_player, prev_cards, curr_cards)
+
     # if get_cards_type(curr_cards) == -1 or (game_round == 1 and not curr_cards.find("3D")) or \
     #         (curr_player != biggest_player and prev_cards.size != 0 and prev_cards.size != curr_cards.size):
-    if get_cards_type(curr_cards) == -1 or \
-            (curr_player != biggest_player and prev_cards.size != 0 and prev_cards.size != curr_cards.size):
+    if check_result == INVALID_CARDS:
         valid = False
-
-    if valid and curr_player != biggest_player and not are_cards_bigger(prev_cards, curr_cards):
+    elif check_result == SMALLER_CARDS:
         bigger = False
 
     if not valid or not bigger:
-        session.remove()
-        return_cards_to_deck(group_tele_id)
+        return_cards_to_deck(game)
 
         if not valid:
             message = _("Invalid cards. Please try again\n")
@@ -1013,93 +1144,81 @@ def use_selected_cards(bot, player_tele_id, group_tele_id, message_id, job_queue
             message += _("Please try again\n")
     else:
         message = _("These cards have been used:\n")
-        for card in curr_cards:
+        for card in mask_to_stack(curr_cards):
             message += suit_unicode(card.suit)
             message += " "
             message += str(card.value)
             message += "\n"
-        bot.editMessageText(message, player_tele_id, message_id)
 
-        new_num_cards = num_cards - curr_cards.size
+        if not is_ai_player(player_tele_id):
+            bot.editMessageText(message, player_tele_id, message_id)
+
+        new_num_cards = num_cards - mask_size(curr_cards)
         if new_num_cards == 0:
-            finish_game(bot, group_tele_id, player_tele_id, curr_player, player_name, curr_cards, job_queue)
+            finish_game(bot, s, group_tele_id, player_tele_id, curr_player, player_name, curr_cards, job_queue)
             return
 
-        game.curr_cards = pydealer.Stack()
-        game.prev_cards = curr_cards
-        player.num_cards = new_num_cards
-        s.commit()
-        session.remove()
-        advance_game(bot, group_tele_id, curr_player, player_name, curr_cards)
+        with game_store.change(game):
+            game.curr_cards = 0
+            game.prev_cards = curr_cards
+            player.num_cards = new_num_cards
+        advance_game(bot, s, group_tele_id, curr_player, player_name, curr_cards)
 
     if valid and bigger:
-        player_message(bot, group_tele_id, job_queue)
+        player_message(bot, s, group_tele_id, job_queue)
     else:
-        player_message(bot, group_tele_id, job_queue, is_edit=True, message_id=message_id)
+        player_message(bot, s, group_tele_id, job_queue, is_edit=True, message_id=message_id)
         bot.send_message(player_tele_id, message)
 
 
 # Retruns curr_cards to the player's deck
-def return_cards_to_deck(group_tele_id):
-    session = scoped_session(session_factory)
-    s = session()
-    game, player = s.query(Game, Player). \
-        filter(Game.group_tele_id == group_tele_id, Player.group_tele_id == group_tele_id,
-               Player.player_id == Game.curr_player).first()
-
-    curr_cards = game.curr_cards
-    player_cards = pydealer.Stack(cards=player.cards)
-    player_cards.add(curr_cards)
-    game.curr_cards = pydealer.Stack()
-    player.cards = player_cards
-    s.commit()
-    session.remove()
+def return_cards_to_deck(game):
+    player = game.get_curr_player()
+    with game_store.change(game):
+        player.cards |= game.curr_cards
+        game.curr_cards = 0
 
 
 # Advances the game
-def advance_game(bot, group_tele_id, curr_player, player_name, curr_cards):
-    session = scoped_session(session_factory)
-    s = session()
-    game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
-    game.game_round += 1
-    game.curr_player = (curr_player + 1) % 4
-    game.biggest_player = curr_player
-    s.commit()
-
-    game_message(bot, group_tele_id)
-
-    if curr_cards.size == 1 and curr_cards.find("2S"):
-        game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
-        game.curr_player = curr_player
+def advance_game(bot, s, group_tele_id, curr_player, player_name, curr_cards):
+    game = game_store.get_game(group_tele_id)
+    with game_store.change(game):
+        game.game_round += 1
+        game.curr_player = (curr_player + 1) % 4
         game.biggest_player = curr_player
-        s.commit()
-        session.remove()
 
+    game_message(bot, s, group_tele_id)
+    next_player, biggest_player = next_players_after_use(curr_player, curr_cards)
+
+    if next_player == curr_player:
+        with game_store.change(game):
+            game.curr_player = next_player
+            game.biggest_player = biggest_player
+
+        _ = get_translator(s, group_tele_id)
         message = (_("I have passed all players since %s has used ♠ 2\n") % player_name)
         message += "--------------------------------------\n"
         message += _("%s's Turn\n") % player_name
 
         bot.send_message(group_tele_id, message, disable_notification=True)
-    else:
-        session.remove()
 
 
 # Game over
-def finish_game(bot, group_tele_id, player_tele_id, curr_player, player_name, curr_cards, job_queue):
-    bot.send_message(player_tele_id, _("You won!"))
+def finish_game(bot, s, group_tele_id, player_tele_id, curr_player, player_name, curr_cards, job_queue):
+    if not is_ai_player(player_tele_id):
+        _ = get_translator(s, player_tele_id)
+        bot.send_message(player_tele_id, _("You won!"))
 
-    session = scoped_session(session_factory)
-    s = session()
-    players = s.query(Player).filter(Player.group_tele_id == group_tele_id, Player.player_id != curr_player)
-    session.remove()
+    for player in game_store.get_game(group_tele_id).players:
+        if player.player_id == curr_player or is_ai_player(player.player_tele_id):
+            continue
 
-    for player in players:
-        install_lang(player.player_tele_id)
+        _ = get_translator(s, player.player_tele_id)
         bot.send_message(player.player_tele_id, _("You lost!"))
 
-    install_lang(group_tele_id)
+    _ = get_translator(s, group_tele_id)
     message = _("These cards have been used:\n")
-    for card in curr_cards.cards:
+    for card in mask_to_stack(curr_cards):
         message += suit_unicode(card.suit)
         message += " "
         message += str(card.value)
@@ -1109,120 +1228,117 @@ def finish_game(bot, group_tele_id, player_tele_id, curr_player, player_name, cu
 
     bot.send_message(group_tele_id, message, disable_notification=True)
 
-    update_stats(group_tele_id, curr_player, job_queue)
+    update_stats(s, group_tele_id, curr_player, job_queue)
     delete_game_data(group_tele_id)
 
 
 # Updates group and player stats
-def update_stats(group_tele_id, won_player, job_queue):
-    session = scoped_session(session_factory)
-    s = session()
-    money_mode = s.query(GroupSetting.money_mode).filter(GroupSetting.tele_id == group_tele_id).first()[0]
-    players = s.query(Player).filter(Player.group_tele_id == group_tele_id).all()
-    group_stat = s.query(GroupStat).filter(GroupStat.tele_id == group_tele_id).first()
-    num_cards_left = sum([player.cards.size for player in players])
-    money_earned = 0
-
-    if group_stat:
-        group_stat.num_games += 1
-    else:
-        try:
-            group_stat = GroupStat(tele_id=group_tele_id, num_games=1, best_win_rate=0, most_money_earned=0)
-            s.add(group_stat)
-        except:
-            s.rollback()
-            session.remove()
-            return
+def update_stats(s, group_tele_id, won_player, job_queue):
+    money_mode = group_setting_cache.get(s, group_tele_id).money_mode
+    players = game_store.get_game(group_tele_id).players
+    broke_tele_ids = settle_stats(s, group_tele_id, players, won_player, money_mode, card_money, init_money)
+    counter_store.add(s, GAMES)
 
-    for player in players:
-        player_stat = s.query(PlayerStat).filter(PlayerStat.tele_id == player.player_tele_id).first()
+    if broke_tele_ids:
+        # Kept in the database, so that another worker or a restarted one can run the recharges
+        recharge_time = time.time() + recharge_delay
+        set_recharge_time(s, broke_tele_ids, recharge_time)
 
-        if player_stat:
-            player_stat.num_games += 1
-            player_stat.num_cards += 13 - player.cards.size
-            player_stat.num_games_won += 1 if player.player_id == won_player else 0
-            player_stat.win_rate = player_stat.num_games_won / player_stat.num_games * 100
-        else:
-            try:
-                player_stat = PlayerStat(tele_id=player.player_tele_id, player_name=player.player_name, num_games=1,
-                                         num_cards=13 - player.cards.size, money=init_money, money_earned=0)
-                player_stat.num_games_won = 1 if player.player_id == won_player else 0
-                player_stat.win_rate = player_stat.num_games_won / player_stat.num_games * 100
-                s.add(player_stat)
-            except:
-                s.rollback()
-                session.remove()
-                return
+        for player_tele_id in broke_tele_ids:
+            schedule_recharge(job_queue, player_tele_id, recharge_time)
 
-        if money_mode and player.player_id != won_player:
-            money_lost = get_money_lost(player.cards, card_money, num_cards_left)
-            player_stat.money -= money_lost
-            player_stat.money = 0 if player_stat.money < 0 else player_stat.money
-            player_stat.money_earned -= money_lost
-            money_earned += money_lost
 
-            if player_stat.money == 0:
-                job = job_queue.run_once(recharge_money, recharge_delay, context=player.player_tele_id)
-                queued_jobs[player.player_tele_id] = job
-                recharge_times[player.player_tele_id] = arrow.now()
-
-        if player_stat.win_rate > group_stat.best_win_rate:
-            group_stat.best_win_rate = player_stat.win_rate
-            group_stat.best_win_rate_player = player.player_name
-
-        if player_stat.money_earned > group_stat.most_money_earned:
-            group_stat.most_money_earned = player_stat.money_earned
-            group_stat.most_money_earned_player = player.player_name
+# Recharges the player's money at recharge_time, on the worker that owns the player's shard if there are shards. The
+# other workers leave the recharge to that worker, which picks it up from the database
+def schedule_recharge(job_queue, player_tele_id, recharge_time):
+    if lease_manager and not lease_manager.owns(player_tele_id):
+        return
 
-    if money_mode:
-        player_stat = s.query(PlayerStat).\
-            filter(PlayerStat.tele_id == Player.player_tele_id, Player.group_tele_id == group_tele_id,
-                   Player.player_id == won_player).first()
-        player_stat.money += money_earned
-        player_stat.money_earned += money_earned
+    job = recharge_jobs.pop(player_tele_id, None)
+    if job:
+        job.schedule_removal()
 
-    s.commit()
-    session.remove()
+    recharge_jobs[player_tele_id] = job_queue.run_once(recharge_money, max(recharge_time - time.time(), 0),
+                                                       context=player_tele_id)
 
 
 # Passes player's turn
-def pass_round(bot, job):
-    group_tele_id, player_tele_id, message_id = map(int, job.context.split(","))
-    install_lang(player_tele_id)
+@run_in_group(group_executor, job_group)
+@unit_of_work(session_factory)
+def pass_round(bot, job, s):
+    group_tele_id, player_tele_id, message_id, game_round = map(int, job.context.split(","))
+
+    # The player has played or passed since the job was queued
+    game = game_store.get_game(group_tele_id)
+    if not game or game.game_round != game_round or game.get_curr_player().player_tele_id != player_tele_id:
+        return
+
+    _ = get_translator(s, player_tele_id)
 
     try:
         bot.editMessageText(text=_("You Passed"), chat_id=player_tele_id, message_id=message_id)
     except:
         return
 
-    session = scoped_session(session_factory)
-    s = session()
-    game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
+    pass_turn(bot, s, group_tele_id, job.job_queue)
+
+
+# Passes the current player's turn
+def pass_turn(bot, s, group_tele_id, job_queue):
+    game = game_store.get_game(group_tele_id)
+    if not game:
+        return
 
     if game.count_pass + 1 > 4:
-        session.remove()
-        stop_idle_game(bot, group_tele_id)
+        stop_idle_game(bot, s, group_tele_id)
         return
 
-    return_cards_to_deck(group_tele_id)
+    with game_store.change(game):
+        return_cards_to_deck(game)
+
+        game.game_round += 1
+        game.curr_player, is_in_control = next_player_after_pass(game.curr_player, game.biggest_player)
+        game.count_pass += 1
+
+        if is_in_control:
+            game.prev_cards = 0
 
-    game = s.query(Game).filter(Game.group_tele_id == group_tele_id).first()
-    game.game_round += 1
-    game.curr_player = (game.curr_player + 1) % 4
-    game.count_pass += 1
+    game_message(bot, s, group_tele_id)
+    player_message(bot, s, group_tele_id, job_queue)
 
-    if game.game_round > 1 and game.curr_player == game.biggest_player:
-        game.prev_cards = pydealer.Stack()
-    s.commit()
-    session.remove()
 
-    game_message(bot, group_tele_id)
-    player_message(bot, group_tele_id, job.job_queue)
+# Plays the turn of an AI player
+@run_in_group(group_executor, job_group)
+@unit_of_work(session_factory)
+def ai_turn(bot, job, s):
+    group_tele_id = job.context
+    game = game_store.get_game(group_tele_id)
+
+    # Checks if the game is still running and it is still the AI's turn
+    if not game or not is_ai_player(game.get_curr_player().player_tele_id):
+        return
+
+    player = game.get_curr_player()
+    player_tele_id = player.player_tele_id
+    hand = player.cards
+    move = choose_ai_move(hand, game.prev_cards, game.curr_player == game.biggest_player, ai_move_budget)
+
+    if not move:
+        # Same as a player pressing pass
+        with game_store.change(game):
+            game.count_pass = 0
+        pass_turn(bot, s, group_tele_id, job.job_queue)
+        return
+
+    with game_store.change(game):
+        game.curr_cards, player.cards = move, hand & ~move
+
+    use_selected_cards(bot, s, player_tele_id, group_tele_id, None, job.job_queue)
 
 
 # Stops an idle game
-def stop_idle_game(bot, group_tele_id):
-    install_lang(group_tele_id)
+def stop_idle_game(bot, s, group_tele_id):
+    _ = get_translator(s, group_tele_id)
     message = _("Game has been stopped by me since no one is playing")
     bot.send_message(group_tele_id, message)
 
@@ -1231,12 +1347,10 @@ def stop_idle_game(bot, group_tele_id):
 
 # Recharges via command
 @run_async
-def recharge(bot, update):
+@unit_of_work(session_factory)
+def recharge(bot, update, s):
     player_tele_id = update.message.from_user.id
-    session = scoped_session(session_factory)
-    s = session()
-    player_money = s.query(PlayerStat.money).filter(PlayerStat.tele_id == player_tele_id).first()[0]
-    session.remove()
+    player_money = get_player_money(s, player_tele_id)
 
     if player_money == 0:
         title = "Coffee"
@@ -1251,6 +1365,7 @@ def recharge(bot, update):
         bot.sendInvoice(update.message.chat.id, title, description, payload, provider_token, start_parameter, currency,
                         prices)
     else:
+        _ = get_translator(s, player_tele_id)
         bot.send_message(player_tele_id, _("You still have $%d left.") % player_money)
 
 
@@ -1265,50 +1380,60 @@ def precheckout_recharge(bot, update):
 
 
 # Successful recharge
-def successful_recharge(bot, update, job_queue):
+@unit_of_work(session_factory)
+def successful_recharge(bot, update, s, job_queue):
     player_tele_id = update.message.from_user.id
-    if player_tele_id in queued_jobs:
-        queued_jobs[player_tele_id].schedule_removal()
+    _ = get_translator(s, player_tele_id)
+    job = recharge_jobs.pop(player_tele_id, None)
+    if job:
+        job.schedule_removal()
 
     job_queue.run_once(recharge_money, 0, context=player_tele_id)
     bot.send_message(player_tele_id, _("Thanks for the coffee! Enjoy Big 2!"))
 
 
 # Recharges the player's money
-def recharge_money(bot, job):
+@unit_of_work(session_factory)
+def recharge_money(bot, job, s):
     player_tele_id = job.context
-    install_lang(player_tele_id)
+    if recharge_jobs.get(player_tele_id) is job:
+        del recharge_jobs[player_tele_id]
 
-    session = scoped_session(session_factory)
-    s = session()
-    player_stats = s.query(PlayerStat).filter(PlayerStat.tele_id == player_tele_id).first()
-    player_stats.money = 1000
-    s.commit()
-    session.remove()
+    # Another worker or an earlier job may have recharged the money already
+    if not recharge_player_money(s, player_tele_id, init_money):
+        return
 
+    _ = get_translator(s, player_tele_id)
     bot.send_message(player_tele_id, _("Your money has been recharged"))
 
 
-# Installs the language
-def install_lang(tele_id):
-    session = scoped_session(session_factory)
-    s = session()
-    language = s.query(Language).filter(Language.tele_id == tele_id).first()
+# Returns the function that translates messages to the chat's language
+def get_translator(s, tele_id):
+    language = language_cache.get(tele_id)
 
-    if language:
-        es = gettext.translation("big_two_text", localedir="locale", languages=[language.language])
-    else:
-        try:
-            language = Language(tele_id=tele_id, language="en")
-            s.add(language)
-            s.commit()
-        except:
-            s.rollback()
+    if language is None:
+        row = get_language(s, tele_id)
 
-        es = gettext.translation("big_two_text", localedir="locale", languages=["en"])
+        if row:
+            language = row.language
+        else:
+            language = DEFAULT_LANGUAGE
+            try:
+                with s.begin_nested():
+                    s.add(Language(tele_id=tele_id, language=language))
+            except:
+                pass
+            else:
+                count_chat(s, tele_id)
+
+        language_cache.set(tele_id, language)
+
+    return get_catalog(language).gettext
 
-    es.install()
-    session.remove()
+
+# Counts a new player or group in the global counters
+def count_chat(s, tele_id):
+    counter_store.add(s, PLAYERS if tele_id > 0 else GROUPS)
 
 
 # Creates a feedback conversation handler
@@ -1330,8 +1455,9 @@ def feedback_cov_handler():
 
 # Sends a feedback message
 @run_async
-def feedback(bot, update):
-    install_lang(update.message.from_user.id)
+@unit_of_work(session_factory)
+def feedback(bot, update, s):
+    _ = get_translator(s, update.message.from_user.id)
     update.message.reply_text(_("Please send me your feedback or type /cancel to cancel this operation. My developer "
                                 "can understand English and Chinese."))
 
@@ -1339,11 +1465,13 @@ def feedback(bot, update):
 
 
 # Saves a feedback
-def receive_feedback(bot, update):
+@unit_of_work(session_factory)
+def receive_feedback(bot, update, s):
     feedback_msg = update.message.text
     valid_lang = False
     langdetect.DetectorFactory.seed = 0
     langs = langdetect.detect_langs(feedback_msg)
+    _ = get_translator(s, update.message.from_user.id)
 
     for lang in langs:
         if lang.lang in ("en", "zh-tw", "zh-cn"):
@@ -1354,7 +1482,6 @@ def receive_feedback(bot, update):
         update.message.reply_text(_("The feedback you sent is not in English or Chinese. Please try again."))
         return 0
 
-    install_lang(update.message.from_user.id)
     update.message.reply_text(_("Thank you for your feedback, I will let my developer know."))
 
     if is_email_feedback:
@@ -1373,7 +1500,9 @@ def receive_feedback(bot, update):
 
 
 # Cancels feedback opteration
-def cancel(bot, update):
+@unit_of_work(session_factory)
+def cancel(bot, update, s):
+    _ = get_translator(s, update.message.from_user.id)
     update.message.reply_text(_("Operation cancelled."))
     return ConversationHandler.END
 
@@ -1391,6 +1520,19 @@ def send(bot, update, args):
             bot.send_message(dev_tele_id, "Failed to send message")
 
 
+# Sends the number of connections checked out by each handler to the developer
+def db_stats(bot, update):
+    if update.message.from_user.id == dev_tele_id:
+        text = format_checkout_counts() or "No handlers have run yet"
+        text += "\n\nGroup setting cache: %d hits, %d misses" % (group_setting_cache.hits, group_setting_cache.misses)
+        text += "\n\n" + format_pool_stats(engine.pool)
+        text += "\n\n" + group_executor.format_depths()
+        text += "\n\nGame write conflicts: %d" % game_store.num_conflicts
+        if lease_manager:
+            text += "\n\nShards of %s: %s" % (worker_id, sorted(lease_manager.shards))
+        bot.send_message(dev_tele_id, text)
+
+
 def error(bot, update, error):
     logger.warning('Update "%s" caused error "%s"' % (update, error))
 
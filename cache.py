@@ -0,0 +1,64 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+
+# A thread-safe cache that keeps the maxsize most recently used items and counts its hits and misses. Items expire after
+# ttl seconds if it is set
+class LRUCache(object):
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.items:
+                value, expires = self.items[key]
+                if expires is None or time.time() < expires:
+                    self.items.move_to_end(key)
+                    self.hits += 1
+
+                    return value
+
+                del self.items[key]
+
+            self.misses += 1
+
+        return default
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (value, time.time() + self.ttl if self.ttl is not None else None)
+            self.items.move_to_end(key)
+
+            if len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    # Drops the item now and again when the session commits, so that the value read by another update before the
+    # change is committed is not kept
+    def invalidate(self, key, s=None):
+        with self.lock:
+            self.items.pop(key, None)
+
+        if s is not None:
+            event.listen(s, "after_commit", lambda session: self.invalidate(key), once=True)
+
+    # Drops the items whose keys match the predicate
+    def invalidate_if(self, predicate):
+        with self.lock:
+            for key in [key for key in self.items if predicate(key)]:
+                del self.items[key]
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.hits = self.misses = 0
@@ -1,9 +1,33 @@
-from collections import Counter
+from pydealer import Card, Deck, Stack
 from pydealer.const import BIG2_RANKS
 
 from card_type import *
 
 
+# Each card is an int in 0-51 ordered by Big Two rank, ie value * 4 + suit, so the ints sort the same way as
+# BIG2_RANKS. A hand is a 52-bit mask with bit i set if card i is in the hand.
+VALUES = ["3", "4", "5", "6", "7", "8", "9", "10", "Jack", "Queen", "King", "Ace", "2"]
+SUITS = ["Diamonds", "Clubs", "Hearts", "Spades"]
+NUM_CARDS = 52
+FULL_MASK = (1 << NUM_CARDS) - 1
+
+CARD_INTS = {(value, suit): value_index * 4 + suit_index
+             for value_index, value in enumerate(VALUES) for suit_index, suit in enumerate(SUITS)}
+SUIT_MASKS = [sum(1 << (value_index * 4 + suit_index) for value_index in range(len(VALUES)))
+              for suit_index in range(len(SUITS))]
+# Cards are never changed after they are made, so stacks made from masks share them
+CARDS = [Card(VALUES[card_int >> 2], SUITS[card_int & 3]) for card_int in range(NUM_CARDS)]
+ABBREV_INTS = {card.abbrev: card_int for card_int, card in enumerate(CARDS)}
+FIVE_CARDS_TYPES = (STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH)
+
+# Value masks have the lowest bit of a value's four bits set if the value is in the hand, a lexicographic comparison
+# of two sets of distinct values from the biggest value down is then an integer comparison of their value masks
+VALUE_MASK = SUIT_MASKS[0]
+STRAIGHT_VALUES = frozenset([sum(1 << (value * 4) for value in values) for values in
+                             [range(start, start + 5) for start in range(len(VALUES) - 4)] +
+                             [(0, 1, 2, 11, 12), (0, 1, 2, 3, 12)]])
+
+
 def suit_unicode(suit):
     if suit == "Diamonds":
         return "♦"
@@ -23,217 +47,158 @@ def value_rank(value):
     return BIG2_RANKS["values"][value]
 
 
-def get_cards_type(cards):
-    cards.sort(ranks=BIG2_RANKS)
-    cards_type = -1
-    suits = set()
-    values = []
+# Shuffles a deck and deals 13 cards to each player, each sorted by BIG2_RANKS
+def deal_hands(num_players=4):
+    deck = Deck(ranks=BIG2_RANKS)
+    deck.shuffle()
+    hands = []
+
+    for i in range(num_players):
+        cards = Stack(cards=deck.deal(13))
+        cards.sort(ranks=BIG2_RANKS)
+        hands.append(cards)
+
+    return hands
+
+
+def card_to_int(card):
+    return CARD_INTS[(card.value, card.suit)]
+
+
+def int_to_card(card_int):
+    return Card(VALUES[card_int >> 2], SUITS[card_int & 3])
 
+
+# Converts a pydealer stack or list of cards to a mask
+def stack_to_mask(cards):
+    # Stacks are only iterable through __getitem__, which is slow
+    if isinstance(cards, Stack):
+        cards = cards.cards
+
+    mask = 0
     for card in cards:
-        suits.add(card.suit)
-        values.append(value_rank(card.value))
+        mask |= 1 << CARD_INTS[(card.value, card.suit)]
+
+    return mask
+
+
+# Converts a mask to a pydealer stack, sorted by BIG2_RANKS
+def mask_to_stack(mask):
+    cards = []
+    while mask:
+        low_bit = mask & -mask
+        cards.append(CARDS[low_bit.bit_length() - 1])
+        mask ^= low_bit
+
+    return Stack(cards=cards)
+
+
+# Returns the card ints of a mask in ascending order
+def mask_to_ints(mask):
+    card_ints = []
+    while mask:
+        low_bit = mask & -mask
+        card_ints.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+
+    return card_ints
+
 
-    if cards.size == 13:
+def ints_to_mask(card_ints):
+    mask = 0
+    for card_int in card_ints:
+        mask |= 1 << card_int
+
+    return mask
+
+
+def mask_size(mask):
+    return bin(mask).count("1")
+
+
+# Returns the value mask of a hand
+def mask_values(mask):
+    return (mask | mask >> 1 | mask >> 2 | mask >> 3) & VALUE_MASK
+
+
+def is_same_suit(mask):
+    return mask & SUIT_MASKS[(mask & -mask).bit_length() - 1 & 3] == mask
+
+
+def get_cards_type(cards):
+    return get_mask_type(stack_to_mask(cards))
+
+
+def get_mask_type(mask):
+    size = bin(mask).count("1")
+
+    if size == 1:
+        return SINGLE
+    elif size == 2 or size == 3:
+        # All cards have the same value
+        if (mask & -mask).bit_length() - 1 >> 2 == mask.bit_length() - 1 >> 2:
+            return PAIR if size == 2 else THREE_OF_A_KIND
+    elif size == 5:
+        values = mask_values(mask)
+
+        if is_same_suit(mask):
+            return STRAIGHT_FLUSH if values in STRAIGHT_VALUES else FLUSH
+        elif values in STRAIGHT_VALUES:
+            return STRAIGHT
+        elif bin(values).count("1") == 2:
+            return FOUR_OF_A_KIND if mask & mask >> 1 & mask >> 2 & mask >> 3 & VALUE_MASK else FULL_HOUSE
+    elif size == 13:
         # Checks for dragon
-        if sorted(values) == list(range(min(values), max(values) + 1)):
-            if len(suits) == 1:
-                cards_type = SAME_SUIT_DRAGON
-            else:
-                cards_type = DRAGON
-
-    elif cards.size == 5:
-        # Checks for same suit
-        if len(suits) == 1:
-            # Checks for A 2 3 4 5
-            if cards[0].value == "3" and cards[1].value == "4" and cards[2].value == "5" and \
-                    cards[3].value == "Ace" and cards[4].value == "2":
-                cards_type = STRAIGHT_FLUSH
-
-            # Checks for 2 3 4 5 6
-            elif cards[0].value == "3" and cards[1].value == "4" and cards[2].value == "5" and \
-                    cards[3].value == "6" and cards[4].value == "2":
-                cards_type = STRAIGHT_FLUSH
-
-            elif sorted(values) == list(range(min(values), max(values) + 1)):
-                cards_type = STRAIGHT_FLUSH
-            else:
-                cards_type = FLUSH
-        else:
-            num_counter = Counter(values)
-
-            if len(num_counter) == 2:
-                for num in num_counter.keys():
-                    if num_counter[num] == 4:
-                        cards_type = FOUR_OF_A_KIND
-                        break
-                    elif num_counter[num] == 3:
-                        cards_type = FULL_HOUSE
-                        break
-
-            # Checks for straight
-            else:
-                # Checks for A 2 3 4 5
-                if cards[0].value == "3" and cards[1].value == "4" and cards[2].value == "5" and \
-                        cards[3].value == "Ace" and cards[4].value == "2":
-                    cards_type = STRAIGHT
-
-                # Checks for 2 3 4 5 6
-                elif cards[0].value == "3" and cards[1].value == "4" and cards[2].value == "5" and \
-                        cards[3].value == "6" and cards[4].value == "2":
-                    cards_type = STRAIGHT
-
-                elif sorted(values) == list(range(min(values), max(values) + 1)):
-                        cards_type = STRAIGHT
-
-    elif cards.size == 3:
-        if cards[0].value == cards[1].value and cards[1].value == cards[2].value:
-            cards_type = THREE_OF_A_KIND
-
-    elif cards.size == 2:
-        if cards[0].value == cards[1].value:
-            cards_type = PAIR
-
-    elif cards.size == 1:
-        cards_type = SINGLE
-
-    return cards_type
+        if mask_values(mask) == VALUE_MASK:
+            return SAME_SUIT_DRAGON if is_same_suit(mask) else DRAGON
+
+    return -1
+
+
+# Returns a key to compare cards of the same type, a bigger key means bigger cards
+def get_mask_key(mask, cards_type=None):
+    if cards_type is None:
+        cards_type = get_mask_type(mask)
+
+    if cards_type == SINGLE or cards_type == PAIR:
+        # Bigger value, then bigger suit
+        return mask.bit_length() - 1
+    elif cards_type == THREE_OF_A_KIND:
+        return mask.bit_length() - 1 >> 2
+    elif cards_type == FULL_HOUSE or cards_type == FOUR_OF_A_KIND:
+        # The middle card always belongs to the three or four of a kind
+        mask &= mask - 1
+        mask &= mask - 1
+        return (mask & -mask).bit_length() - 1 >> 2
+    elif cards_type == STRAIGHT:
+        # Values from the biggest card down, then the suit of the biggest card
+        return mask_values(mask) << 2 | mask.bit_length() - 1 & 3
+    elif cards_type == FLUSH or cards_type == STRAIGHT_FLUSH:
+        # Suit first, then values from the biggest card down
+        return (mask.bit_length() - 1 & 3) << NUM_CARDS | mask_values(mask)
+
+    return 0
 
 
 # Returns if currCards is greater than prevCards
 # Also checks if currCards have the same num of cards with prevCards
 def are_cards_bigger(prev_cards, curr_cards):
-    prev_cards.sort(ranks=BIG2_RANKS)
-    curr_cards.sort(ranks=BIG2_RANKS)
-    is_bigger = False
-
-    if len(prev_cards) == 0:
-        is_bigger = True
-    elif len(prev_cards) == len(curr_cards):
-        prev_cards_type = get_cards_type(prev_cards)
-        curr_cards_type = get_cards_type(curr_cards)
-
-        # Checks for 5 cards
-        if prev_cards_type in range(4, 9) and curr_cards_type in range(4, 9):
-            if curr_cards_type > prev_cards_type:
-                is_bigger = True
-
-            # Checks for bigger straight flush
-            elif prev_cards_type == 8 and curr_cards_type == 8:
-                # Bigger suit, ie bigger straight flush
-                if suit_rank(curr_cards[0].suit) > suit_rank(prev_cards[0].suit):
-                    is_bigger = True
-
-                # Same suit, checks for bigger num
-                elif curr_cards[4].value > prev_cards[4].value:
-                    is_bigger = True
-
-            # Checks for bigger four of a kind
-            elif prev_cards_type == 7 and curr_cards_type == 7:
-                prev_num = -1
-                curr_num = -1
-                nums = []
-
-                for card in prev_cards:
-                    if card.value in nums:
-                        prev_num = value_rank(card.value)
-                        break
-
-                    nums.append(card.value)
-
-                del nums[:]
-                for card in curr_cards:
-                    if card.value in nums:
-                        curr_num = value_rank(card.value)
-                        break
-
-                    nums.append(card.value)
-
-                if curr_num > prev_num:
-                    is_bigger = True
-
-            # Checks for bigger full house
-            elif prev_cards_type == 6 and curr_cards_type == 6:
-                prev_nums = []
-                curr_nums = []
-                prev_num = 0
-                curr_num = 0
-
-                for card in prev_cards:
-                    prev_nums.append(value_rank(card.value))
-
-                for card in curr_cards:
-                    curr_nums.append(value_rank(card.value))
-
-                prev_nums = Counter(prev_nums)
-                curr_nums = Counter(curr_nums)
-
-                for num in prev_nums.keys():
-                    if prev_nums[num] == 3:
-                        prev_num = num
-                        break
-
-                for num in curr_nums.keys():
-                    if curr_nums[num] == 3:
-                        curr_num = num
-                        break
-
-                if curr_num > prev_num:
-                    is_bigger = True
-
-            # Checks for bigger flush
-            elif prev_cards_type == 5 and curr_cards_type == 5:
-                if suit_rank(curr_cards[0].suit) > suit_rank(prev_cards[0].suit):
-                    is_bigger = True
-                else:
-                    for i in range(4, -1, -1):
-                        if value_rank(curr_cards[i].value) > value_rank(prev_cards[i].value):
-                            is_bigger = True
-                            break
-
-            # Checks for bigger straight
-            elif prev_cards_type == 4 and curr_cards_type == 4:
-                all_same = True
-
-                for i in range(4, -1, -1):
-                    if value_rank(curr_cards[i].value) > value_rank(prev_cards[i].value):
-                        is_bigger = True
-                        break
-                    if curr_cards[i].value != prev_cards[i].value:
-                        all_same = False
-
-                if not is_bigger and all_same:
-                    if suit_rank(curr_cards[4].suit) > suit_rank(prev_cards[4].suit):
-                        is_bigger = True
-
-        # Checks for bigger three of a kind
-        elif prev_cards_type == 3 and curr_cards_type == 3:
-            if value_rank(curr_cards[0].value) > value_rank(prev_cards[0].value):
-                is_bigger = True
-
-        # Checks for bigger pair
-        elif prev_cards_type == 2 and curr_cards_type == 2:
-            if value_rank(curr_cards[0].value) > value_rank(prev_cards[0].value):
-                is_bigger = True
-            else:
-                if suit_rank(prev_cards[0].suit) > suit_rank(prev_cards[1].suit):
-                    prev_suit = suit_rank(prev_cards[0].suit)
-                else:
-                    prev_suit = suit_rank(prev_cards[1].suit)
-
-                if suit_rank(curr_cards[0].suit) > suit_rank(curr_cards[1].suit):
-                    curr_suit = suit_rank(curr_cards[0].suit)
-                else:
-                    curr_suit = suit_rank(curr_cards[1].suit)
-
-                if curr_suit > prev_suit:
-                    is_bigger = True
-
-        # Checks for bigger single
-        elif prev_cards_type == 1 and curr_cards_type == 1:
-            if value_rank(curr_cards[0].value) > value_rank(prev_cards[0].value):
-                is_bigger = True
-            elif value_rank(curr_cards[0].value) == value_rank(prev_cards[0].value):
-                if suit_rank(curr_cards[0].suit) > suit_rank(prev_cards[0].suit):
-                    is_bigger = True
-
-    return is_bigger
+    return is_mask_bigger(stack_to_mask(prev_cards), stack_to_mask(curr_cards))
+
+
+def is_mask_bigger(prev_mask, curr_mask):
+    if not prev_mask:
+        return True
+    elif mask_size(prev_mask) != mask_size(curr_mask):
+        return False
+
+    prev_cards_type = get_mask_type(prev_mask)
+    curr_cards_type = get_mask_type(curr_mask)
+
+    if prev_cards_type in FIVE_CARDS_TYPES and curr_cards_type in FIVE_CARDS_TYPES:
+        if curr_cards_type != prev_cards_type:
+            return curr_cards_type > prev_cards_type
+    elif curr_cards_type != prev_cards_type or curr_cards_type not in (SINGLE, PAIR, THREE_OF_A_KIND):
+        return False
+
+    return get_mask_key(curr_mask, curr_cards_type) > get_mask_key(prev_mask, prev_cards_type)
@@ -0,0 +1,106 @@
+import logging
+import threading
+
+from collections import Counter
+
+from sqlalchemy import event, bindparam
+
+from global_counter import GlobalCounter, GAMES, PLAYERS, GROUPS
+
+logger = logging.getLogger(__name__)
+
+
+# The global counters, which are counted in memory and added to the global_counters table in the background
+class CounterStore(object):
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # Adds n to the counter once the session commits, so that rolled back rows are not counted
+    def add(self, s, name, n=1):
+        if self not in s.info:
+            s.info[self] = Counter()
+            event.listen(s, "after_commit", self.on_commit)
+            event.listen(s, "after_transaction_end", self.on_transaction_end)
+
+        s.info[self][name] += n
+
+    def on_commit(self, session):
+        with self.lock:
+            self.pending.update(session.info[self])
+
+        session.info[self].clear()
+
+    # Drops the counts of a transaction that is rolled back
+    def on_transaction_end(self, session, transaction):
+        if transaction.parent is None:
+            session.info[self].clear()
+
+    # Returns the counters with the counts that are not written yet, with a primary key lookup
+    def get_counts(self, s):
+        counts = Counter({name: 0 for name in (GAMES, PLAYERS, GROUPS)})
+        counts.update({name: value for name, value in s.query(GlobalCounter.name, GlobalCounter.value).
+                      filter(GlobalCounter.name.in_([GAMES, PLAYERS, GROUPS]))})
+
+        with self.lock:
+            counts.update(self.pending)
+
+        return counts
+
+    # Adds the pending counts to the table in one transaction and returns the number of counters written
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending = self.pending, Counter()
+
+            if not pending:
+                return 0
+
+            table = GlobalCounter.__table__
+            s = self.session_factory()
+            try:
+                existing = set(name for name, in s.query(GlobalCounter.name).filter(GlobalCounter.name.in_(pending)))
+                updates = [{"b_name": name, "b_n": n} for name, n in pending.items() if name in existing]
+                inserts = [{"name": name, "value": n} for name, n in pending.items() if name not in existing]
+
+                if updates:
+                    s.execute(table.update().where(table.c.name == bindparam("b_name")).
+                              values(value=table.c.value + bindparam("b_n")), updates)
+                if inserts:
+                    s.execute(table.insert(), inserts)
+                s.commit()
+            except Exception as e:
+                s.rollback()
+                logger.exception(e)
+
+                # Adds the counts again in the next flush
+                with self.lock:
+                    self.pending.update(pending)
+
+                return 0
+            finally:
+                s.close()
+
+        return len(pending)
+
+    # Starts flushing every interval seconds in a background thread
+    def start(self, interval):
+        def run():
+            while not self.stop_event.wait(interval):
+                self.flush()
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=run, name="counter-store-flush", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+        self.flush()
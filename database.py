@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from pool_stats import InstrumentedQueuePool
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+# Returns the engine of the database url, Postgres in production or a SQLite file or memory database to run locally
+def make_engine(url, pool_size, max_overflow, pool_timeout):
+    if not is_sqlite(url):
+        return create_engine(url, poolclass=InstrumentedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                             pool_timeout=pool_timeout)
+
+    # SQLite allows one writer at a time, so the handlers take turns on one connection that is shared between threads.
+    # This also keeps a memory database alive for as long as the engine
+    engine = create_engine(url, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0,
+                           pool_timeout=pool_timeout, connect_args={"check_same_thread": False})
+
+    # Lets SQLAlchemy begin the transactions so that savepoints work with pysqlite
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import sys
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import base
+from card import deal_hands, stack_to_mask
+from counter_store import CounterStore
+from database import make_engine
+from game_stat import GroupStat, PlayerStat
+from game_state import GameState, PlayerState, GameStore, load_game
+from global_counter import GlobalCounter, PLAYERS
+from group_setting import GroupSetting
+from group_setting_cache import GroupSettingCache
+from handler_queries import HANDLER_QUERIES, recharge_player_money, set_recharge_time, get_recharge_times
+from language import Language
+from lease_manager import LeaseManager
+from migration import migrate, seed_counters
+from router import Router
+from settlement import settle_stats
+
+# Tables that a workload is expected to scan, such as loading every game at startup
+ALLOWED_SCANS = {
+    "load_all": {"games", "group_settings"},
+    "seed_counters": {"global_counters", "group_stats", "languages"},
+    "leases": {"shard_leases", "shard_workers"},
+    "router": {"shard_leases"}
+}
+
+
+# Adds num_groups running games with their players, settings and stats
+def seed(session_factory, num_groups):
+    s = session_factory()
+    store = GameStore(session_factory)
+
+    for group_tele_id in range(-1, -num_groups - 1, -1):
+        game = GameState(group_tele_id, curr_player=0, biggest_player=0)
+        store.add_game(game)
+        s.add(GroupSetting(tele_id=group_tele_id, join_timer=60, pass_timer=45, money_mode=True, ai_players=False))
+        s.add(GroupStat(tele_id=group_tele_id, num_games=1, best_win_rate=0, most_money_earned=0))
+        s.add(Language(tele_id=group_tele_id, language="en"))
+
+        for player_id, cards in enumerate(deal_hands()):
+            player_tele_id = -group_tele_id * 10 + player_id
+            store.add_player(game, PlayerState(group_tele_id, player_tele_id, str(player_tele_id),
+                                               cards=stack_to_mask(cards)))
+            s.add(PlayerStat(tele_id=player_tele_id, player_name=str(player_tele_id), num_games=1, num_games_won=0,
+                             num_cards=0, win_rate=0, money=1000, money_earned=0))
+            s.add(Language(tele_id=player_tele_id, language="en"))
+
+    s.commit()
+    s.close()
+    store.flush()
+
+
+def run_load_all(session_factory):
+    s = session_factory()
+    GameStore(session_factory).load_all(s)
+    s.close()
+
+
+def run_load_game(session_factory):
+    s = session_factory()
+    load_game(s, -1)
+    s.close()
+
+
+def run_flush(session_factory):
+    s = session_factory()
+    store = GameStore(session_factory)
+    game = store.load(s, -1)
+    s.close()
+
+    game.game_round += 1
+    store.save(game)
+    store.flush()
+
+
+def run_settle(session_factory):
+    s = session_factory()
+    game = load_game(s, -2)
+    settle_stats(s, game.group_tele_id, game.players, 0, True, 5, 1000)
+    s.commit()
+    s.close()
+
+
+def run_group_settings(session_factory):
+    s = session_factory()
+    GroupSettingCache(1).get(s, -1)
+    s.close()
+
+
+def run_counters(session_factory):
+    s = session_factory()
+    store = CounterStore(session_factory)
+    store.add(s, PLAYERS)
+    s.commit()
+    store.get_counts(s)
+    s.close()
+    store.flush()
+
+
+def run_seed_counters(session_factory):
+    s = session_factory()
+    s.query(GlobalCounter).delete()
+    seed_counters(s.connection())
+    s.rollback()
+    s.close()
+
+
+# The leases have a row for each shard, which are read in full
+def run_leases(session_factory):
+    manager = LeaseManager(session_factory, "audit", "http://localhost/", 16, 30)
+    manager.renew()
+    manager.release(manager.shards, is_stopping=True)
+
+
+def run_router(session_factory):
+    router = Router(session_factory, 16, "token")
+    router.get_route_id({"update_id": 1, "callback_query": {"from": {"id": 10}}})
+    router.get_addresses()
+
+
+# The queries that the handlers in big_two_bot.py make directly, with the telegram IDs of a player and a group
+def run_handler_queries(session_factory):
+    s = session_factory()
+    for query in HANDLER_QUERIES:
+        for tele_id in (10, -1):
+            query(s, tele_id)
+
+    set_recharge_time(s, [10, 11], 1)
+    get_recharge_times(s)
+    recharge_player_money(s, 10, 1000)
+    s.commit()
+    s.close()
+
+
+WORKLOADS = [
+    ("load_all", run_load_all),
+    ("load_game", run_load_game),
+    ("flush", run_flush),
+    ("settle", run_settle),
+    ("group_settings", run_group_settings),
+    ("counters", run_counters),
+    ("seed_counters", run_seed_counters),
+    ("leases", run_leases),
+    ("router", run_router),
+    ("handler_queries", run_handler_queries)
+]
+
+
+# Returns the statements that each workload runs, as (workload, statement, parameters)
+def capture_statements(engine, session_factory):
+    statements = []
+    workload_name = [None]
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((workload_name[0], statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        for name, workload in WORKLOADS:
+            workload_name[0] = name
+            workload(session_factory)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    return statements
+
+
+# Returns the query plan of a statement as lines of text
+def explain(conn, statement, parameters):
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+
+        return [row[-1] for row in rows]
+
+    return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()]
+
+
+# Returns the tables that a query plan reads in full
+def get_scanned_tables(dialect_name, plan):
+    tables = set()
+    for line in plan:
+        words = line.replace("->", "").split()
+        if dialect_name == "sqlite" and words[:1] == ["SCAN"] and len(words) > 1:
+            tables.add(words[1])
+        elif dialect_name != "sqlite" and words[:3] == ["Seq", "Scan", "on"]:
+            tables.add(words[3])
+
+    return tables
+
+
+# Explains each statement of the workloads and returns the statements that scan a table, as
+# (workload, statement, scanned tables, plan)
+def audit(engine, session_factory):
+    statements = capture_statements(engine, session_factory)
+    findings = []
+    seen = set()
+
+    with engine.connect() as conn:
+        # Postgres may scan small tables even when an index can be used
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+        for workload, statement, parameters in statements:
+            if (workload, statement) in seen:
+                continue
+            seen.add((workload, statement))
+
+            plan = explain(conn, statement, parameters)
+            scanned_tables = get_scanned_tables(conn.dialect.name, plan) - ALLOWED_SCANS.get(workload, set())
+            if scanned_tables:
+                findings.append((workload, statement, scanned_tables, plan))
+
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explains the queries of the bot on a seeded database and flags the "
+                                                 "ones that scan a table")
+    parser.add_argument("-u", "--url", default="sqlite://",
+                        help="Database url, which should be an empty database (default: %(default)s)")
+    parser.add_argument("-g", "--groups", type=int, default=200, help="Number of groups to seed (default: %(default)s)")
+    args = parser.parse_args()
+
+    engine = make_engine(args.url, 5, 0, 30)
+    base.Base.metadata.create_all(engine)
+    migrate(engine)
+    session_factory = sessionmaker(bind=engine)
+    seed(session_factory, args.groups)
+
+    findings = audit(engine, session_factory)
+    for workload, statement, scanned_tables, plan in findings:
+        print("%s scans %s:\n%s\n%s\n" % (workload, ", ".join(sorted(scanned_tables)), " ".join(statement.split()),
+                                          "\n".join("    " + line for line in plan)))
+
+    if findings:
+        print("Statements with scans: %d" % len(findings))
+        return 1
+
+    print("No unexpected scans")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+from collections import defaultdict
+
+import numpy as np
+
+from card import VALUES, SUITS, NUM_CARDS, ints_to_mask, mask_to_stack, get_mask_type, is_mask_bigger
+from card_reference import get_cards_type, are_cards_bigger
+from card_type import PAIR, STRAIGHT, FLUSH, STRAIGHT_FLUSH
+from moves import get_legal_mask_moves
+from rank_table import get_rank_key, get_key_type, is_key_bigger
+import batch_eval
+
+# Sizes of the random plays, valid sizes are picked more often
+PLAY_SIZES = [0, 1, 1, 2, 2, 3, 3, 4, 5, 5, 5, 5, 6, 13, 13]
+max_failures = 5
+CHANGED_TYPES = (PAIR, STRAIGHT, FLUSH, STRAIGHT_FLUSH)
+
+
+# Returns a random play of size cards, either any cards or cards that are close to a valid type
+def random_play(rng, size):
+    if size == 0:
+        return ()
+    if size > 13 or rng.random() < 0.3:
+        return tuple(rng.sample(range(NUM_CARDS), size))
+
+    if size == 13:
+        # A dragon, sometimes of the same suit and sometimes with a repeated value
+        values = list(range(13))
+        if rng.random() < 0.2:
+            values[rng.randrange(13)] = rng.randrange(13)
+
+        suit = rng.randrange(4) if rng.random() < 0.3 else None
+        card_ints = set(value * 4 + (rng.randrange(4) if suit is None else suit) for value in values)
+
+        # Fills up the cards taken by a repeated value
+        while len(card_ints) < size:
+            card_ints.add(rng.randrange(NUM_CARDS))
+
+        return tuple(card_ints)
+
+    if size < 5:
+        # Cards of the same value
+        value = rng.randrange(13)
+        return tuple(value * 4 + suit for suit in rng.sample(range(4), size))
+
+    values = []
+    play_type = rng.randrange(4)
+    if play_type == 0:
+        # Straights, including the ones that wrap around
+        start = rng.randrange(13)
+        values = [(start + i) % 13 for i in range(size)]
+    elif play_type == 1:
+        values = rng.sample(range(13), size)
+    else:
+        # Full houses and four of a kinds
+        value, other_value = rng.sample(range(13), 2)
+        num_same = 3 if play_type == 2 else 4
+        card_ints = [value * 4 + suit for suit in rng.sample(range(4), num_same)]
+        card_ints += [other_value * 4 + suit for suit in rng.sample(range(4), size - num_same)]
+
+        return tuple(card_ints)
+
+    # Same suit for flushes and straight flushes
+    if rng.random() < 0.5:
+        suit = rng.randrange(4)
+        return tuple(value * 4 + suit for value in values)
+
+    return tuple(value * 4 + rng.randrange(4) for value in values)
+
+
+# Returns a random case of the previous and current plays
+def random_case(rng):
+    size = rng.choice(PLAY_SIZES)
+    prev_size = size if rng.random() < 0.75 else rng.choice(PLAY_SIZES)
+
+    return random_play(rng, prev_size), random_play(rng, size)
+
+
+# The Stack functions from before the card masks that the engines are compared against, returns the type and if it is
+# bigger of each case. The plays of the types whose ordering was changed on purpose are compared by new_rule_key
+def reference_outcomes(cases):
+    outcomes = []
+    for prev_ints, curr_ints in cases:
+        prev_cards, curr_cards = mask_to_stack(ints_to_mask(prev_ints)), mask_to_stack(ints_to_mask(curr_ints))
+        prev_type, curr_type = get_cards_type(prev_cards), get_cards_type(curr_cards)
+        is_bigger = are_cards_bigger(prev_cards, curr_cards)
+        if prev_type == curr_type and len(prev_ints) == len(curr_ints) and curr_type in CHANGED_TYPES:
+            is_bigger = new_rule_key(curr_ints, curr_type) > new_rule_key(prev_ints, prev_type)
+
+        outcomes.append((curr_type, is_bigger))
+
+    return outcomes
+
+
+# Returns the key of the ordering that card.py uses for pairs, straights, flushes and straight flushes: pairs by the
+# value and then the suit of the biggest card, straights by their values from the biggest card down and then the suit
+# of the biggest card, and flushes and straight flushes by suit and then by their values from the biggest card down
+def new_rule_key(card_ints, cards_type):
+    values = sorted((card_int >> 2 for card_int in card_ints), reverse=True)
+    biggest_value, biggest_suit = max(card_ints) >> 2, max(card_ints) & 3
+
+    if cards_type == PAIR:
+        return biggest_value, biggest_suit
+    elif cards_type == STRAIGHT:
+        return values, biggest_suit
+
+    return biggest_suit, values
+
+
+def mask_outcomes(cases):
+    return [(get_mask_type(ints_to_mask(curr_ints)), is_mask_bigger(ints_to_mask(prev_ints), ints_to_mask(curr_ints)))
+            for prev_ints, curr_ints in cases]
+
+
+def rank_table_outcomes(cases):
+    outcomes = []
+    for prev_ints, curr_ints in cases:
+        curr_key = get_rank_key(ints_to_mask(curr_ints))
+        outcomes.append((get_key_type(curr_key), is_key_bigger(get_rank_key(ints_to_mask(prev_ints)), curr_key)))
+
+    return outcomes
+
+
+def batch_eval_outcomes(cases):
+    # The cases are evaluated together in groups of the same sizes
+    groups = defaultdict(list)
+    for i, (prev_ints, curr_ints) in enumerate(cases):
+        groups[(len(prev_ints), len(curr_ints))].append(i)
+
+    outcomes = [None] * len(cases)
+    for (prev_size, curr_size), indices in groups.items():
+        prev_cards = np.array([cases[i][0] for i in indices], dtype=np.int64).reshape(len(indices), prev_size)
+        curr_cards = np.array([cases[i][1] for i in indices], dtype=np.int64).reshape(len(indices), curr_size)
+        _, prev_keys = batch_eval.evaluate(prev_cards)
+        curr_types, curr_keys = batch_eval.evaluate(curr_cards)
+        biggers = batch_eval.is_keys_bigger(prev_keys, curr_keys)
+
+        for i, curr_type, bigger in zip(indices, curr_types, biggers):
+            outcomes[i] = (int(curr_type), bool(bigger))
+
+    return outcomes
+
+
+# Checks if the current play is one of the legal moves of a hand with only those cards
+def moves_outcomes(cases):
+    outcomes = []
+    for prev_ints, curr_ints in cases:
+        curr_mask = ints_to_mask(curr_ints)
+        outcomes.append(curr_mask != 0 and curr_mask in get_legal_mask_moves(curr_mask, ints_to_mask(prev_ints)))
+
+    return outcomes
+
+
+# Engines to compare, with a function to get the expected outcome from the reference outcome
+ENGINES = {
+    "mask": (mask_outcomes, lambda outcome: outcome),
+    "rank_table": (rank_table_outcomes, lambda outcome: outcome),
+    "batch_eval": (batch_eval_outcomes, lambda outcome: outcome),
+    "moves": (moves_outcomes, lambda outcome: outcome[0] != -1 and outcome[1])
+}
+
+
+# Returns the expected and actual outcomes if the engine disagrees with the reference on the case, otherwise None
+def check_case(engine, case):
+    outcomes, expect = ENGINES[engine]
+    expected, actual = expect(reference_outcomes([case])[0]), outcomes([case])[0]
+
+    return None if expected == actual else (expected, actual)
+
+
+# Returns smaller cases of a case, with fewer cards first and then smaller cards
+def smaller_cases(case):
+    for hand_index, card_ints in enumerate(case):
+        for i in range(len(card_ints)):
+            new_case = list(case)
+            new_case[hand_index] = card_ints[:i] + card_ints[i + 1:]
+            yield tuple(new_case)
+
+    # Moves all the cards down by a suit or a value, which keeps most types
+    for hand_index, card_ints in enumerate(case):
+        for step in (1, 4):
+            if card_ints and min(card_ints) >= step:
+                new_case = list(case)
+                new_case[hand_index] = tuple(card_int - step for card_int in card_ints)
+                yield tuple(new_case)
+
+    for hand_index, card_ints in enumerate(case):
+        for i, card_int in enumerate(card_ints):
+            for smaller_int in range(card_int):
+                if smaller_int not in card_ints:
+                    new_case = list(case)
+                    new_case[hand_index] = card_ints[:i] + (smaller_int,) + card_ints[i + 1:]
+                    yield tuple(new_case)
+
+
+# Shrinks a failing case until none of its smaller cases fail
+def shrink(case, is_failing):
+    is_shrunk = True
+    while is_shrunk:
+        is_shrunk = False
+        for new_case in smaller_cases(case):
+            if is_failing(new_case):
+                case, is_shrunk = new_case, True
+                break
+
+    return tuple(tuple(sorted(card_ints)) for card_ints in case)
+
+
+# Checks num_cases random cases against the engines and returns the shrunk failures
+def run_cases(args):
+    engines, seed, num_cases = args
+    rng = random.Random(seed)
+    cases = [random_case(rng) for i in range(num_cases)]
+    references = reference_outcomes(cases)
+    failures = []
+
+    for engine in engines:
+        outcomes, expect = ENGINES[engine]
+        num_failures = 0
+
+        for case, reference, actual in zip(cases, references, outcomes(cases)):
+            if expect(reference) != actual:
+                shrunk_case = shrink(case, lambda new_case: check_case(engine, new_case) is not None)
+                failures.append((engine, case, shrunk_case, check_case(engine, shrunk_case)))
+
+                num_failures += 1
+                if num_failures >= max_failures:
+                    break
+
+    return num_cases, failures
+
+
+def format_cards(card_ints):
+    if not card_ints:
+        return "(none)"
+
+    return " ".join(VALUES[card_int >> 2][:2 if card_int >> 2 == 7 else 1] + SUITS[card_int & 3][0]
+                    for card_int in sorted(card_ints))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the card engines with the card rules from before the card "
+                                                 "masks on random plays")
+    parser.add_argument("-n", "--cases", type=int, default=1000000, help="Number of cases (default: %(default)s)")
+    parser.add_argument("-e", "--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES),
+                        help="Engines to compare (default: all)")
+    parser.add_argument("-p", "--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="Number of worker processes (default: %(default)s)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed (default: %(default)s)")
+    parser.add_argument("-c", "--chunk", type=int, default=10000, help="Cases per task (default: %(default)s)")
+    args = parser.parse_args()
+
+    tasks = [(args.engines, args.seed * 1000003 + i, min(args.chunk, args.cases - start))
+             for i, start in enumerate(range(0, args.cases, args.chunk))]
+    num_cases = 0
+    failures = []
+
+    start_time = time.time()
+    pool = multiprocessing.Pool(args.processes)
+    try:
+        for task_cases, task_failures in pool.imap_unordered(run_cases, tasks):
+            num_cases += task_cases
+            failures += task_failures
+    finally:
+        pool.close()
+        pool.join()
+    seconds = time.time() - start_time
+
+    print("Cases: %d in %.2fs with %d processes" % (num_cases, seconds, args.processes))
+
+    # Shows each minimal counterexample once
+    shown = set()
+    for engine, case, shrunk_case, (expected, actual) in failures:
+        if (engine, shrunk_case) not in shown:
+            shown.add((engine, shrunk_case))
+            print("%s: %s then %s, expected %s but got %s (from %s then %s)" %
+                  (engine, format_cards(shrunk_case[0]), format_cards(shrunk_case[1]), expected, actual,
+                   format_cards(case[0]), format_cards(case[1])))
+
+    if failures:
+        print("Failures: %d" % len(failures))
+        return 1
+
+    print("All engines agree with the reference")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, PickleType, BigInteger
+from sqlalchemy import Column, Integer, BigInteger, Float
 from sqlalchemy.orm import relationship
 
 from base import Base
+from stack_mask import StackMask
 
 
 class Game(Base):
@@ -12,6 +13,9 @@ class Game(Base):
     curr_player = Column(Integer)
     biggest_player = Column(Integer)
     count_pass = Column(Integer)
-    curr_cards = Column(PickleType)
-    prev_cards = Column(PickleType)
+    curr_cards = Column(StackMask)
+    prev_cards = Column(StackMask)
+    deadline = Column(Float)
+    message_id = Column(BigInteger)
+    version = Column(Integer)
     players = relationship("Player", backref="Game", cascade="all, delete")
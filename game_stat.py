@@ -25,3 +25,5 @@ class PlayerStat(Base):
     win_rate = Column(Float)
     money = Column(Integer)
     money_earned = Column(Integer)
+    # When the money of a player who has none left is recharged, in seconds since the epoch
+    recharge_time = Column(Float, index=True)
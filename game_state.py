@@ -0,0 +1,330 @@
+import logging
+import threading
+
+from contextlib import contextmanager
+
+from sqlalchemy.orm import joinedload
+
+from card import stack_to_mask
+from game import Game
+from group_setting import GroupSetting
+from player import Player
+from stack_mask import StackMask
+from turn import NUM_PLAYERS
+
+logger = logging.getLogger(__name__)
+
+GAME_COLUMNS = [column.name for column in Game.__table__.columns]
+PLAYER_COLUMNS = [column.name for column in Player.__table__.columns]
+
+
+# A player of a running game, cards is a card mask
+class PlayerState(object):
+    __slots__ = ("group_tele_id", "player_tele_id", "player_name", "player_id", "cards", "num_cards")
+
+    def __init__(self, group_tele_id, player_tele_id, player_name, player_id=-1, cards=0, num_cards=13):
+        self.group_tele_id = group_tele_id
+        self.player_tele_id = player_tele_id
+        self.player_name = player_name
+        self.player_id = player_id
+        self.cards = cards
+        self.num_cards = num_cards
+
+    def to_row(self):
+        return {column: getattr(self, column) for column in PLAYER_COLUMNS}
+
+
+# A running game, curr_cards and prev_cards are card masks and players are ordered by player_id. The deadline is when
+# the group's timer runs out, in seconds since the epoch, and message_id is the message that the timer passes. The
+# version is the number of times that the game's row has been written
+class GameState(object):
+    __slots__ = ("group_tele_id", "game_round", "curr_player", "biggest_player", "count_pass", "curr_cards",
+                 "prev_cards", "deadline", "message_id", "version", "pass_timer", "players")
+
+    def __init__(self, group_tele_id, game_round=1, curr_player=-1, biggest_player=-1, count_pass=0, curr_cards=0,
+                 prev_cards=0, deadline=None, message_id=None, version=0):
+        self.group_tele_id = group_tele_id
+        self.game_round = game_round
+        self.curr_player = curr_player
+        self.biggest_player = biggest_player
+        self.count_pass = count_pass
+        self.curr_cards = curr_cards
+        self.prev_cards = prev_cards
+        self.deadline = deadline
+        self.message_id = message_id
+        self.version = version or 0
+        self.pass_timer = None
+        self.players = []
+
+    def get_curr_player(self):
+        return self.players[self.curr_player]
+
+    def to_row(self):
+        return {column: getattr(self, column) for column in GAME_COLUMNS}
+
+
+# Loads a game and its players from the database with one query, along with its pass timer
+def load_game(s, group_tele_id):
+    games = load_games(s, group_tele_id)
+
+    return games[0] if games else None
+
+
+# Loads all the games, or the group's game, and their players from the database with one query
+def load_games(s, group_tele_id=None):
+    query = s.query(Game, GroupSetting.pass_timer). \
+        outerjoin(GroupSetting, GroupSetting.tele_id == Game.group_tele_id). \
+        options(joinedload(Game.players))
+
+    if group_tele_id is not None:
+        query = query.filter(Game.group_tele_id == group_tele_id)
+
+    games = []
+    for game_row, pass_timer in query:
+        game = GameState(**row_values(game_row, GAME_COLUMNS))
+        game.pass_timer = pass_timer
+        game.players = [PlayerState(**row_values(player, PLAYER_COLUMNS))
+                        for player in sorted(game_row.players, key=lambda player: player.player_id)]
+        games.append(game)
+
+    return games
+
+
+# Returns the values of the columns of a loaded row, with the cards as card masks
+def row_values(row, columns):
+    values = {}
+    for column in columns:
+        value = getattr(row, column)
+        if isinstance(row.__table__.columns[column].type, StackMask) and value is not None:
+            value = stack_to_mask(value)
+        values[column] = value
+
+    return values
+
+
+# Returns if a game's row is not the version that was loaded or last written. The version is None if the game had no
+# row and the row's version is False if it has no row now, rows from before the migration have no version yet
+def is_conflict(version, db_version, is_running):
+    if db_version is False:
+        return version is not None and is_running
+
+    return (db_version or 0) != version
+
+
+# The running games, which are kept in memory and written to the games and players tables in the background. A game's
+# row is only written if its version is still the one that was loaded or last written, so that a game changed by
+# another process is not overwritten
+class GameStore(object):
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.games = {}
+        self.players = {}
+        self.dirty = set()
+        self.versions = {}
+        self.num_conflicts = 0
+        self.lock = threading.RLock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def get_game(self, group_tele_id):
+        return self.games.get(group_tele_id)
+
+    def get_player(self, player_tele_id):
+        return self.players.get(player_tele_id)
+
+    # Returns the game, loading it from the database with one query if it is not in memory
+    def load(self, s, group_tele_id):
+        game = self.games.get(group_tele_id)
+        if game or group_tele_id in self.dirty:
+            return game
+
+        game = load_game(s, group_tele_id)
+        if not game:
+            return None
+
+        with self.lock:
+            if group_tele_id in self.games or group_tele_id in self.dirty:
+                return self.games.get(group_tele_id)
+
+            self.add_loaded_game(game)
+
+        return game
+
+    # Loads all the games in the database, or the ones of the groups that include returns True for, that are not in
+    # memory yet with one query, returns the loaded games
+    def load_all(self, s, include=None):
+        games, loaded_games = load_games(s), []
+        with self.lock:
+            for game in games:
+                if include and not include(game.group_tele_id):
+                    continue
+
+                if game.group_tele_id not in self.games and game.group_tele_id not in self.dirty:
+                    self.add_loaded_game(game)
+                    loaded_games.append(game)
+
+        return loaded_games
+
+    def add_loaded_game(self, game):
+        self.games[game.group_tele_id] = game
+        self.versions[game.group_tele_id] = game.version
+        for player in game.players:
+            self.players[player.player_tele_id] = player
+
+    # Returns False if the group already has a game
+    def add_game(self, game):
+        with self.lock:
+            if game.group_tele_id in self.games:
+                return False
+
+            self.games[game.group_tele_id] = game
+            self.dirty.add(game.group_tele_id)
+
+        return True
+
+    # Adds a player to the next seat, returns False if the player is in a game or the game is full or stopped
+    def add_player(self, game, player):
+        with self.lock:
+            if player.player_tele_id in self.players or len(game.players) >= NUM_PLAYERS or \
+                    self.games.get(game.group_tele_id) is not game:
+                return False
+
+            player.player_id = len(game.players)
+            game.players.append(player)
+            self.players[player.player_tele_id] = player
+            self.dirty.add(game.group_tele_id)
+
+        return True
+
+    def delete_game(self, group_tele_id):
+        with self.lock:
+            game = self.games.pop(group_tele_id, None)
+            if game:
+                for player in game.players:
+                    self.players.pop(player.player_tele_id, None)
+
+            self.dirty.add(group_tele_id)
+
+    # Changes the game under the lock and marks it to be written in the next flush, so that a flush does not write a
+    # change that is only partly made
+    @contextmanager
+    def change(self, game):
+        with self.lock:
+            yield game
+            self.dirty.add(game.group_tele_id)
+
+    # Marks the game to be written in the next flush
+    def save(self, game):
+        # Taken with the lock so that a flush does not swap the dirty set in between
+        with self.lock:
+            self.dirty.add(game.group_tele_id)
+
+    # Writes the changed games in one transaction and returns the number of games written. Games whose rows have been
+    # changed by another process are not written and are dropped from memory, so that they are loaded again
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                group_tele_ids, self.dirty = list(self.dirty), set()
+                games = {group_tele_id: self.games[group_tele_id] for group_tele_id in group_tele_ids
+                         if group_tele_id in self.games}
+                versions = {group_tele_id: self.versions.get(group_tele_id) for group_tele_id in group_tele_ids}
+                game_rows = {group_tele_id: dict(game.to_row(), version=game.version + 1)
+                             for group_tele_id, game in games.items()}
+                player_rows = {group_tele_id: [player.to_row() for player in game.players]
+                               for group_tele_id, game in games.items()}
+
+            if not group_tele_ids:
+                return 0
+
+            s = self.session_factory()
+            try:
+                db_versions = dict(s.query(Game.group_tele_id, Game.version).
+                                   filter(Game.group_tele_id.in_(group_tele_ids)).with_for_update())
+                conflicts = [group_tele_id for group_tele_id in group_tele_ids
+                             if is_conflict(versions[group_tele_id], db_versions.get(group_tele_id, False),
+                                            group_tele_id in games)]
+                written_ids = [group_tele_id for group_tele_id in group_tele_ids if group_tele_id not in conflicts]
+
+                if written_ids:
+                    s.execute(Player.__table__.delete().where(Player.group_tele_id.in_(written_ids)))
+                    s.execute(Game.__table__.delete().where(Game.group_tele_id.in_(written_ids)))
+
+                new_game_rows = [game_rows[group_tele_id] for group_tele_id in written_ids if group_tele_id in games]
+                new_player_rows = [row for group_tele_id in written_ids for row in player_rows.get(group_tele_id, [])]
+                if new_game_rows:
+                    s.execute(Game.__table__.insert(), new_game_rows)
+                if new_player_rows:
+                    s.execute(Player.__table__.insert(), new_player_rows)
+                s.commit()
+            except Exception as e:
+                s.rollback()
+                logger.exception(e)
+
+                # Writes the games again in the next flush
+                with self.lock:
+                    self.dirty.update(group_tele_ids)
+
+                return 0
+            finally:
+                s.close()
+
+            with self.lock:
+                for group_tele_id in written_ids:
+                    if group_tele_id in games:
+                        version = game_rows[group_tele_id]["version"]
+                        games[group_tele_id].version = self.versions[group_tele_id] = version
+                    else:
+                        self.versions.pop(group_tele_id, None)
+
+                for group_tele_id in conflicts:
+                    self.drop_game(group_tele_id, games.get(group_tele_id))
+                self.num_conflicts += len(conflicts)
+
+            if conflicts:
+                logger.warning("Games changed by another process were not written: %s" % conflicts)
+
+        return len(written_ids)
+
+    # Writes the changed games and forgets the games of the groups that include returns True for, so that another
+    # process can take them over. Changes made after the write are dropped, as the other process may already have the
+    # games. Returns the group telegram IDs of the forgotten games
+    def unload(self, include):
+        self.flush()
+
+        with self.lock:
+            games = [game for group_tele_id, game in self.games.items() if include(group_tele_id)]
+            for game in games:
+                self.drop_game(game.group_tele_id, game)
+
+        return [game.group_tele_id for game in games]
+
+    # Forgets a game and the version of its row, unless it has been replaced in memory
+    def drop_game(self, group_tele_id, game):
+        self.versions.pop(group_tele_id, None)
+        if self.games.get(group_tele_id) is not game:
+            return
+
+        self.dirty.discard(group_tele_id)
+        if game:
+            del self.games[group_tele_id]
+            for player in game.players:
+                self.players.pop(player.player_tele_id, None)
+
+    # Starts flushing every interval seconds in a background thread
+    def start(self, interval):
+        def run():
+            while not self.stop_event.wait(interval):
+                self.flush()
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=run, name="game-store-flush", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+        self.flush()
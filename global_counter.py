@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Text, BigInteger
+
+from base import Base
+
+GAMES = "games"
+PLAYERS = "players"
+GROUPS = "groups"
+
+
+class GlobalCounter(Base):
+    __tablename__ = "global_counters"
+
+    name = Column(Text, primary_key=True)
+    value = Column(BigInteger)
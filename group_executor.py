@@ -0,0 +1,134 @@
+import logging
+import threading
+
+from collections import deque
+from functools import wraps
+from queue import Queue
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+# Runs the tasks of each group in order, and the tasks of different groups in parallel on a pool of workers. Tasks of
+# the groups that accept returns False for are not run, they are passed to on_reject with their arguments instead
+class GroupExecutor(object):
+    def __init__(self, num_workers, accept=None, on_reject=None):
+        self.num_workers = num_workers
+        self.accept = accept
+        self.on_reject = on_reject
+        self.queues = {}
+        self.ready_keys = Queue()
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.threads = []
+        self.max_depth = 0
+        self.num_tasks = 0
+        self.num_dropped = 0
+
+    # Queues a task of the group, which runs after the group's earlier tasks
+    def submit(self, key, func, *args, **kwargs):
+        if self.accept and not self.accept(key):
+            with self.lock:
+                self.num_dropped += 1
+            logger.info("Rejected %s of group %s" % (getattr(func, "__name__", func), key))
+
+            if self.on_reject:
+                self.on_reject(key, func, args, kwargs)
+
+            return
+
+        with self.lock:
+            tasks = self.queues.get(key)
+            is_idle = tasks is None
+            if is_idle:
+                tasks = self.queues[key] = deque()
+
+            tasks.append((func, args, kwargs))
+            self.max_depth = max(self.max_depth, len(tasks))
+
+        # Only one worker takes a group at a time
+        if is_idle:
+            self.ready_keys.put(key)
+
+    def run(self):
+        while True:
+            key = self.ready_keys.get()
+            if key is None:
+                return
+
+            with self.lock:
+                func, args, kwargs = self.queues[key][0]
+
+            _local.key = key
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.exception(e)
+            finally:
+                _local.key = None
+
+            # The task stays queued while it runs, so that the group's next task waits for it
+            with self.lock:
+                tasks = self.queues[key]
+                tasks.popleft()
+                self.num_tasks += 1
+
+                if tasks:
+                    self.ready_keys.put(key)
+                else:
+                    del self.queues[key]
+                    if not self.queues:
+                        self.idle.notify_all()
+
+    def start(self):
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self.run, name="group-worker-%d" % i, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    # Stops the workers after the queued tasks have run
+    def stop(self):
+        with self.idle:
+            while self.queues and self.threads:
+                self.idle.wait()
+
+        for thread in self.threads:
+            self.ready_keys.put(None)
+        for thread in self.threads:
+            thread.join()
+
+        self.threads = []
+
+    # Returns the number of queued tasks of each group, including the running ones
+    def get_depths(self):
+        with self.lock:
+            return {key: len(tasks) for key, tasks in self.queues.items()}
+
+    def format_depths(self):
+        depths = self.get_depths()
+        text = "Group queues: %d tasks in %d groups, %d tasks run, %d dropped, at most %d queued for a group" % \
+               (sum(depths.values()), len(depths), self.num_tasks, self.num_dropped, self.max_depth)
+
+        if depths:
+            key, depth = max(depths.items(), key=lambda item: item[1])
+            text += ", deepest now is %s with %d" % (key, depth)
+
+        return text
+
+
+# Runs a handler or job in the group executor, get_key returns the group of the handler's arguments. A handler that is
+# called by another task of the same group runs straight away
+def run_in_group(executor, get_key):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = get_key(*args, **kwargs)
+            if getattr(_local, "key", None) == key:
+                return func(*args, **kwargs)
+
+            executor.submit(key, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
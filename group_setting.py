@@ -10,3 +10,4 @@ class GroupSetting(Base):
     join_timer = Column(Integer)
     pass_timer = Column(Integer)
     money_mode = Column(Boolean)
+    ai_players = Column(Boolean, default=False)
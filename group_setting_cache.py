@@ -0,0 +1,42 @@
+from collections import namedtuple
+
+from cache import LRUCache
+from group_setting import GroupSetting
+
+SETTING_COLUMNS = ["join_timer", "pass_timer", "money_mode", "ai_players"]
+Settings = namedtuple("Settings", SETTING_COLUMNS)
+
+
+# A read-through cache of the group settings, groups without settings are not cached
+class GroupSettingCache(object):
+    def __init__(self, maxsize, ttl=None):
+        self.cache = LRUCache(maxsize, ttl)
+
+    @property
+    def hits(self):
+        return self.cache.hits
+
+    @property
+    def misses(self):
+        return self.cache.misses
+
+    # Returns the group's settings, or None if the group has no settings
+    def get(self, s, group_tele_id):
+        settings = self.cache.get(group_tele_id)
+        if settings is None:
+            row = s.query(*[getattr(GroupSetting, column) for column in SETTING_COLUMNS]). \
+                filter(GroupSetting.tele_id == group_tele_id).first()
+
+            if row:
+                settings = Settings(*row)
+                self.cache.set(group_tele_id, settings)
+
+        return settings
+
+    # Drops the group's settings now and again when the session commits, so that the settings read by another update
+    # before the change is committed are not kept
+    def invalidate(self, group_tele_id, s=None):
+        self.cache.invalidate(group_tele_id, s)
+
+    def invalidate_if(self, predicate):
+        self.cache.invalidate_if(predicate)
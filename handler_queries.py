@@ -0,0 +1,59 @@
+from sqlalchemy import or_
+
+from game_stat import GroupStat, PlayerStat
+from group_setting import GroupSetting
+from language import Language
+
+
+# The queries that the handlers in big_two_bot.py make directly, explain_audit.py explains each of them
+def get_player_stat(s, tele_id):
+    return s.query(PlayerStat).filter(PlayerStat.tele_id == tele_id).first()
+
+
+# Returns the player's money, or None if the player has no stats
+def get_player_money(s, tele_id):
+    row = s.query(PlayerStat.money).filter(PlayerStat.tele_id == tele_id).first()
+
+    return row[0] if row else None
+
+
+# Recharges the player's money if the player is waiting for a recharge or has no money left, returns if it was
+# recharged
+def recharge_player_money(s, tele_id, money):
+    return s.query(PlayerStat). \
+        filter(PlayerStat.tele_id == tele_id, or_(PlayerStat.recharge_time.isnot(None), PlayerStat.money <= 0)). \
+        update({PlayerStat.money: money, PlayerStat.recharge_time: None}, synchronize_session=False) > 0
+
+
+def get_recharge_time(s, tele_id):
+    row = s.query(PlayerStat.recharge_time).filter(PlayerStat.tele_id == tele_id).first()
+
+    return row[0] if row else None
+
+
+def set_recharge_time(s, tele_ids, recharge_time):
+    s.query(PlayerStat).filter(PlayerStat.tele_id.in_(tele_ids)). \
+        update({PlayerStat.recharge_time: recharge_time}, synchronize_session=False)
+
+
+# Returns the telegram ID and recharge time of each player who is waiting for a recharge, with a range on the index
+# rather than IS NOT NULL, which SQLite answers with a scan
+def get_recharge_times(s):
+    return s.query(PlayerStat.tele_id, PlayerStat.recharge_time).filter(PlayerStat.recharge_time > 0).all()
+
+
+def get_group_stat(s, tele_id):
+    return s.query(GroupStat).filter(GroupStat.tele_id == tele_id).first()
+
+
+def get_group_setting(s, tele_id):
+    return s.query(GroupSetting).filter(GroupSetting.tele_id == tele_id).first()
+
+
+def get_language(s, tele_id):
+    return s.query(Language).filter(Language.tele_id == tele_id).first()
+
+
+# The lookups that are run with a telegram ID
+HANDLER_QUERIES = [get_player_stat, get_player_money, get_recharge_time, get_group_stat, get_group_setting,
+                   get_language]
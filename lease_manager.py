@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from shard_lease import ShardLease, ShardWorker, get_shard
+
+logger = logging.getLogger(__name__)
+
+
+# Keeps the leases of a worker's shards in the database. Each worker takes expired leases up to its fair share of the
+# shards and gives up the ones above it, so that the shards of a dead worker move to the live ones
+class LeaseManager(object):
+    def __init__(self, session_factory, owner, address, num_shards, ttl):
+        self.session_factory = session_factory
+        self.owner = owner
+        self.address = address
+        self.num_shards = num_shards
+        self.ttl = ttl
+        self.shards = frozenset()
+        self.expires = 0
+        self.on_acquire = self.on_release = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # Returns if the worker owns the shard of the group or chat
+    def owns(self, tele_id):
+        return get_shard(tele_id, self.num_shards) in self.shards and time.time() < self.expires
+
+    # Renews the leases and returns the shards that are acquired and released, the released shards are no longer
+    # owned but their leases are only given up by release
+    def renew(self, now=None):
+        now = time.time() if now is None else now
+        s = self.session_factory()
+        try:
+            self.add_missing_rows(s, now)
+            num_workers = s.query(ShardWorker).filter(ShardWorker.expires > now, ShardWorker.owner != self.owner). \
+                count() + 1
+            fair_share = -(-self.num_shards // num_workers)
+            expired_shards = [shard for shard, in s.query(ShardLease.shard).filter(ShardLease.expires <= now)]
+
+            # The shards above the fair share are not renewed, so that the workers that have started since can take
+            # them once they are released
+            shards = set()
+            for shard in sorted(self.shards) + sorted(set(expired_shards) - self.shards):
+                if len(shards) < fair_share and self.claim(s, shard, now):
+                    shards.add(shard)
+            s.commit()
+        except Exception as e:
+            s.rollback()
+            logger.exception(e)
+
+            # The leases can no longer be trusted once they have expired
+            if now < self.expires:
+                return frozenset(), frozenset()
+            shards = set()
+        finally:
+            s.close()
+
+        acquired, released = frozenset(shards - self.shards), frozenset(self.shards - shards)
+        self.shards = frozenset(shards)
+        self.expires = now + self.ttl if shards else 0
+
+        if acquired or released:
+            logger.info("Shards acquired: %s, released: %s, owned: %s" %
+                        (sorted(acquired), sorted(released), sorted(self.shards)))
+
+        return acquired, released
+
+    # Takes or extends the lease if it is the worker's or has expired, returns False if another worker has it
+    def claim(self, s, shard, now):
+        return s.query(ShardLease).filter(ShardLease.shard == shard,
+                                          or_(ShardLease.owner == self.owner, ShardLease.expires <= now)). \
+            update({ShardLease.owner: self.owner, ShardLease.address: self.address,
+                    ShardLease.expires: now + self.ttl}, synchronize_session=False) == 1
+
+    # Adds the worker's heartbeat and the leases that do not exist yet
+    def add_missing_rows(self, s, now):
+        values = {ShardWorker.address: self.address, ShardWorker.expires: now + self.ttl}
+        if not s.query(ShardWorker).filter(ShardWorker.owner == self.owner).update(values, synchronize_session=False):
+            s.add(ShardWorker(owner=self.owner, address=self.address, expires=now + self.ttl))
+
+        existing = set(shard for shard, in s.query(ShardLease.shard))
+        missing = [shard for shard in range(self.num_shards) if shard not in existing]
+        if not missing:
+            return
+
+        try:
+            with s.begin_nested():
+                s.add_all([ShardLease(shard=shard, expires=0) for shard in missing])
+        except IntegrityError:
+            # Another worker has added them first
+            pass
+
+    # Gives up the leases of the shards, so that the other workers can take them straight away. The worker is also
+    # removed if it is stopping
+    def release(self, shards, is_stopping=False):
+        s = self.session_factory()
+        try:
+            s.query(ShardLease).filter(ShardLease.shard.in_(shards), ShardLease.owner == self.owner). \
+                update({ShardLease.expires: 0}, synchronize_session=False)
+            if is_stopping:
+                s.query(ShardWorker).filter(ShardWorker.owner == self.owner).delete(synchronize_session=False)
+            s.commit()
+        except Exception as e:
+            s.rollback()
+            logger.exception(e)
+        finally:
+            s.close()
+
+    # Renews the leases every third of their time to live in a background thread. on_acquire and on_release are
+    # called with the shards that are acquired and released, the leases are given up after on_release has returned
+    def start(self, on_acquire, on_release):
+        self.on_acquire, self.on_release = on_acquire, on_release
+
+        def run():
+            while True:
+                acquired, released = self.renew()
+                if released:
+                    self.on_release(released)
+                    self.release(released)
+                if acquired:
+                    self.on_acquire(acquired)
+
+                if self.stop_event.wait(self.ttl / 3):
+                    return
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=run, name="lease-manager", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+        released, self.shards, self.expires = self.shards, frozenset(), 0
+        if released and self.on_release:
+            self.on_release(released)
+        self.release(released, is_stopping=True)
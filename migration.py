@@ -0,0 +1,91 @@
+import pickle
+
+from sqlalchemy import Integer, inspect, text, func, select
+
+from card import stack_to_mask
+from game import Game
+from game_stat import GroupStat, PlayerStat
+from global_counter import GlobalCounter, GAMES, PLAYERS, GROUPS
+from group_setting import GroupSetting
+from language import Language
+from player import Player
+
+# Columns added to tables that are kept between restarts, as (table, column)
+ADDED_COLUMNS = [
+    (GroupSetting.__table__, GroupSetting.__table__.c.ai_players),
+    (Game.__table__, Game.__table__.c.deadline),
+    (Game.__table__, Game.__table__.c.message_id),
+    (Game.__table__, Game.__table__.c.version),
+    (PlayerStat.__table__, PlayerStat.__table__.c.recharge_time)
+]
+
+# Indexes added to tables that are kept between restarts
+ADDED_INDEXES = list(Player.__table__.indexes) + list(PlayerStat.__table__.indexes)
+
+# Pickled stack columns that are now stored as card masks, as (table, column)
+MASK_COLUMNS = [
+    (Game.__table__, Game.__table__.c.curr_cards),
+    (Game.__table__, Game.__table__.c.prev_cards),
+    (Player.__table__, Player.__table__.c.cards)
+]
+
+
+# Adds the columns and indexes that existing tables do not have yet, converts pickled stacks to card masks and seeds
+# the global counters
+def migrate(engine):
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        table_names = inspector.get_table_names()
+
+        for table, column in ADDED_COLUMNS:
+            if column.name not in [existing["name"] for existing in inspector.get_columns(table.name)]:
+                conn.execute(text("ALTER TABLE %s ADD COLUMN %s %s" %
+                                  (table.name, column.name, column.type.compile(engine.dialect))))
+
+        for table, column in MASK_COLUMNS:
+            if table.name not in table_names:
+                continue
+
+            existing_type = next(existing["type"] for existing in inspector.get_columns(table.name)
+                                 if existing["name"] == column.name)
+            if not isinstance(existing_type, Integer):
+                convert_to_mask(conn, engine, table, column)
+
+        for index in ADDED_INDEXES:
+            if index.table.name in table_names:
+                index.create(conn, checkfirst=True)
+
+        if GlobalCounter.__table__.name in table_names:
+            seed_counters(conn)
+
+
+# Replaces a pickled stack column with a card mask column of the same name
+def convert_to_mask(conn, engine, table, column):
+    key = list(table.primary_key.columns)[0].name
+    new_name = column.name + "_mask"
+
+    conn.execute(text("ALTER TABLE %s ADD COLUMN %s %s" %
+                      (table.name, new_name, column.type.impl.compile(engine.dialect))))
+
+    rows = conn.execute(text("SELECT %s, %s FROM %s" % (key, column.name, table.name))).fetchall()
+    for key_value, value in rows:
+        mask = stack_to_mask(pickle.loads(bytes(value))) if value is not None else None
+        conn.execute(text("UPDATE %s SET %s = :mask WHERE %s = :key" % (table.name, new_name, key)),
+                     {"mask": mask, "key": key_value})
+
+    conn.execute(text("ALTER TABLE %s DROP COLUMN %s" % (table.name, column.name)))
+    conn.execute(text("ALTER TABLE %s RENAME COLUMN %s TO %s" % (table.name, new_name, column.name)))
+
+
+# Counts the games, players and groups once when the global counters are first made
+def seed_counters(conn):
+    if conn.execute(select(func.count()).select_from(GlobalCounter.__table__)).scalar():
+        return
+
+    num_games = conn.execute(select(func.coalesce(func.sum(GroupStat.num_games), 0))).scalar()
+    num_players = conn.execute(select(func.count()).where(Language.tele_id > 0)).scalar()
+    num_groups = conn.execute(select(func.count()).where(Language.tele_id < 0)).scalar()
+
+    conn.execute(GlobalCounter.__table__.insert(), [{"name": GAMES, "value": num_games},
+                                                    {"name": PLAYERS, "value": num_players},
+                                                    {"name": GROUPS, "value": num_groups}])
@@ -1,8 +1,7 @@
-from itertools import combinations
-from pydealer import Stack
+from card import SUIT_MASKS, STRAIGHT_VALUES, VALUE_MASK, stack_to_mask, mask_size
 
-from card import get_cards_type
-from card_type import STRAIGHT_FLUSH, FOUR_OF_A_KIND
+# The four bits of the value 2
+TWOS_SHIFT = 48
 
 
 def max_money_lost(money):
@@ -10,32 +9,55 @@ def max_money_lost(money):
 
 
 def get_money_lost(cards, card_money, num_cards_left):
-    money_lost = card_money * cards.size
+    return get_mask_money_lost(stack_to_mask(cards), card_money, num_cards_left)
 
-    if cards.size >= 10:
+
+def get_mask_money_lost(mask, card_money, num_cards_left):
+    size = mask_size(mask)
+    money_lost = card_money * size
+
+    if size >= 10:
         money_lost *= 2
 
-    money_lost *= pow(2, len(cards.find("2")))
+    money_lost *= pow(2, mask_size(mask >> TWOS_SHIFT))
 
-    if cards.size == 13:
+    if size == 13:
         money_lost *= 2
 
     if num_cards_left == 39:
         money_lost *= 2
 
-    if has_good_cards(cards):
+    if has_good_mask(mask):
         money_lost *= 2
 
     return money_lost
 
 
+# Returns the money lost of each hand left at the end of a game, the winner's hand is empty and loses nothing
+def settle_money(masks, card_money):
+    num_cards_left = sum(mask_size(mask) for mask in masks)
+
+    return [get_mask_money_lost(mask, card_money, num_cards_left) for mask in masks]
+
+
 # Checks if cards contain straight flush or flour of a kind
 def has_good_cards(cards):
-    if cards.size > 4:
-        cards_combinations = combinations(cards, 5)
+    return has_good_mask(stack_to_mask(cards))
+
+
+def has_good_mask(mask):
+    if mask_size(mask) < 5:
+        return False
+
+    # Four of a kind, any fifth card completes it
+    if mask & mask >> 1 & mask >> 2 & mask >> 3 & VALUE_MASK:
+        return True
 
-        for card_subset in cards_combinations:
-            if get_cards_type(Stack(cards=card_subset)) in (STRAIGHT_FLUSH, FOUR_OF_A_KIND):
+    # Straight flush
+    for suit, suit_mask in enumerate(SUIT_MASKS):
+        values = (mask & suit_mask) >> suit
+        for straight_values in STRAIGHT_VALUES:
+            if values & straight_values == straight_values:
                 return True
 
     return False
@@ -0,0 +1,92 @@
+from itertools import combinations
+
+from card import VALUES, SUIT_MASKS, STRAIGHT_VALUES, stack_to_mask, mask_to_stack, mask_to_ints, ints_to_mask, \
+    mask_size, is_same_suit, get_mask_type
+from card_type import *
+from rank_table import get_rank_key, get_key_type, is_key_bigger
+
+# Sub-nibbles of each nibble by size, ie the ways to pick cards of one value
+NIBBLE_SUBSETS = [[[subset for subset in range(16) if subset & nibble == subset and bin(subset).count("1") == size]
+                   for size in range(5)] for nibble in range(16)]
+STRAIGHT_VALUE_LISTS = [[value for value in range(len(VALUES)) if straight_values >> (value * 4) & 1]
+                        for straight_values in STRAIGHT_VALUES]
+
+
+# Returns every play of cards that is bigger than prev_cards as stacks, in rank order
+def get_legal_moves(cards, prev_cards):
+    return [mask_to_stack(move) for move in get_legal_mask_moves(stack_to_mask(cards), stack_to_mask(prev_cards))]
+
+
+# Returns every play of mask that is bigger than prev_mask as masks, in rank order
+def get_legal_mask_moves(mask, prev_mask=0):
+    nibbles = [mask >> (value * 4) & 0xF for value in range(len(VALUES))]
+    prev_key = get_rank_key(prev_mask)
+    moves = []
+
+    if prev_mask:
+        sizes = (mask_size(prev_mask),)
+        prev_type = get_key_type(prev_key)
+    else:
+        sizes = (1, 2, 3, 5, 13)
+        prev_type = -1
+
+    for size in sizes:
+        if size in (1, 2, 3):
+            for value, nibble in enumerate(nibbles):
+                for subset in NIBBLE_SUBSETS[nibble][size]:
+                    moves.append(subset << (value * 4))
+        elif size == 5:
+            moves += get_five_cards_moves(mask, nibbles, prev_type)
+        elif size == 13 and get_mask_type(mask) in (DRAGON, SAME_SUIT_DRAGON):
+            moves.append(mask)
+
+    keyed_moves = []
+    for move in moves:
+        key = get_rank_key(move)
+        if is_key_bigger(prev_key, key):
+            keyed_moves.append((key, move))
+    keyed_moves.sort()
+
+    return [move for _, move in keyed_moves]
+
+
+# Returns the five cards plays of mask with a type of at least min_type
+def get_five_cards_moves(mask, nibbles, min_type=-1):
+    moves = []
+
+    if min_type <= STRAIGHT:
+        for values in STRAIGHT_VALUE_LISTS:
+            if all(nibbles[value] for value in values):
+                partial_moves = [0]
+                for value in values:
+                    partial_moves = [move | subset << (value * 4) for move in partial_moves
+                                     for subset in NIBBLE_SUBSETS[nibbles[value]][1]]
+
+                # Straight flushes are found with the flushes
+                moves += [move for move in partial_moves if not is_same_suit(move)]
+
+    if min_type <= STRAIGHT_FLUSH:
+        for suit_mask in SUIT_MASKS:
+            suit_cards = mask_to_ints(mask & suit_mask)
+            if len(suit_cards) >= 5:
+                for card_ints in combinations(suit_cards, 5):
+                    moves.append(ints_to_mask(card_ints))
+
+    if min_type <= FOUR_OF_A_KIND:
+        for value, nibble in enumerate(nibbles):
+            if nibble == 0xF:
+                others = mask & ~(0xF << (value * 4))
+                while others:
+                    low_bit = others & -others
+                    moves.append(0xF << (value * 4) | low_bit)
+                    others ^= low_bit
+
+    if min_type <= FULL_HOUSE:
+        for three_value, three_nibble in enumerate(nibbles):
+            for three_subset in NIBBLE_SUBSETS[three_nibble][3]:
+                for two_value, two_nibble in enumerate(nibbles):
+                    if two_value != three_value:
+                        for two_subset in NIBBLE_SUBSETS[two_nibble][2]:
+                            moves.append(three_subset << (three_value * 4) | two_subset << (two_value * 4))
+
+    return moves
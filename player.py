@@ -1,14 +1,16 @@
-from sqlalchemy import Column, Integer, Text, PickleType, ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, Text, ForeignKey, BigInteger, Index
 
 from base import Base
+from stack_mask import StackMask
 
 
 class Player(Base):
     __tablename__ = "players"
+    __table_args__ = (Index("ix_players_group_tele_id_player_id", "group_tele_id", "player_id"),)
 
     group_tele_id = Column(BigInteger, ForeignKey("games.group_tele_id"))
     player_tele_id = Column(BigInteger, primary_key=True)
     player_name = Column(Text)
     player_id = Column(Integer)
-    cards = Column(PickleType)
+    cards = Column(StackMask)
     num_cards = Column(Integer)
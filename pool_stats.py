@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+
+from collections import defaultdict
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+from unit_of_work import current_handler
+
+logger = logging.getLogger(__name__)
+
+# Checkouts that wait longer than this many seconds for a connection are logged
+slow_checkout_time = 0.1
+
+_lock = threading.Lock()
+
+
+# Checkout stats of a handler, wait times are in seconds
+class CheckoutStats(object):
+    __slots__ = ("num_checkouts", "total_wait", "max_wait", "num_slow", "num_timeouts")
+
+    def __init__(self):
+        self.num_checkouts = self.num_slow = self.num_timeouts = 0
+        self.total_wait = self.max_wait = 0.0
+
+
+# Checkout stats by handler name, checkouts outside of handlers are under None
+checkout_stats = defaultdict(CheckoutStats)
+
+# Number of checkouts that took the last connection of the pool, and the most connections checked out at once
+pool_usage = {"num_saturated": 0, "max_checked_out": 0}
+
+
+# A queue pool that times how long each checkout waits for a connection
+class InstrumentedQueuePool(QueuePool):
+    def connect(self):
+        start_time = time.perf_counter()
+        try:
+            connection = super(InstrumentedQueuePool, self).connect()
+        except TimeoutError:
+            record_checkout(self, time.perf_counter() - start_time, is_timeout=True)
+            raise
+
+        record_checkout(self, time.perf_counter() - start_time)
+
+        return connection
+
+    def capacity(self):
+        return self.size() + max(self._max_overflow, 0)
+
+
+def record_checkout(pool, wait, is_timeout=False):
+    handler = current_handler()
+    checked_out = pool.checkedout()
+
+    with _lock:
+        stats = checkout_stats[handler]
+        stats.num_checkouts += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        pool_usage["max_checked_out"] = max(pool_usage["max_checked_out"], checked_out)
+
+        if checked_out >= pool.capacity():
+            pool_usage["num_saturated"] += 1
+        if wait > slow_checkout_time:
+            stats.num_slow += 1
+        if is_timeout:
+            stats.num_timeouts += 1
+
+    if is_timeout:
+        logger.warning("%s timed out after waiting %.0fms for a database connection (%d/%d checked out)" %
+                       (handler or "Unknown", wait * 1000, checked_out, pool.capacity()))
+    elif wait > slow_checkout_time:
+        logger.warning("%s waited %.0fms for a database connection (%d/%d checked out)" %
+                       (handler or "Unknown", wait * 1000, checked_out, pool.capacity()))
+
+
+# Returns the pool's usage and the checkout stats of each handler as text
+def format_pool_stats(pool):
+    with _lock:
+        lines = ["Pool: %d/%d checked out, at most %d, %d checkouts took the last connection" %
+                 (pool.checkedout(), pool.capacity(), pool_usage["max_checked_out"], pool_usage["num_saturated"])]
+
+        for handler, stats in sorted(checkout_stats.items(), key=lambda item: item[0] or ""):
+            lines.append("%s: %d checkouts, %.1fms average wait, %.1fms max wait, %d slow, %d timeouts" %
+                         (handler or "Unknown", stats.num_checkouts, stats.total_wait / stats.num_checkouts * 1000,
+                          stats.max_wait * 1000, stats.num_slow, stats.num_timeouts))
+
+    return "\n".join(lines)
@@ -0,0 +1,163 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from itertools import combinations, product
+
+from card import VALUES, STRAIGHT_VALUES, ints_to_mask, mask_size, get_mask_type, get_mask_key
+
+# The table is an open addressing hash table of every legal single, pair, three of a kind and five cards hand, stored
+# as a header followed by slots of (mask, rank key). Dragons are 4 ^ 13 hands of the same rank so they are not stored.
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rank_table.bin")
+TABLE_MAGIC = b"BIG2RNK1"
+HEADER = struct.Struct("<8sI")
+SLOT = struct.Struct("<QI")
+SLOT_BITS = 16
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# A rank key is size << 20 | rank << 4 | cards type, where rank is dense within the size and 0 if the cards are
+# invalid, so the ranks of two plays of the same size compare the same way as is_mask_bigger
+RANK_SHIFT = 4
+RANK_BITS = 16
+SIZE_SHIFT = RANK_SHIFT + RANK_BITS
+TYPE_MASK = 0xF
+
+_table = None
+
+
+# Returns every legal single, pair, three of a kind and five cards hand as masks
+def legal_masks():
+    masks = set()
+    suits = range(4)
+
+    for size in (1, 2, 3):
+        for value in range(len(VALUES)):
+            for hand_suits in combinations(suits, size):
+                masks.add(ints_to_mask(value * 4 + suit for suit in hand_suits))
+
+    # Straights and straight flushes
+    for straight_values in STRAIGHT_VALUES:
+        values = [value for value in range(len(VALUES)) if straight_values >> (value * 4) & 1]
+        for hand_suits in product(suits, repeat=5):
+            masks.add(ints_to_mask(value * 4 + suit for value, suit in zip(values, hand_suits)))
+
+    # Flushes
+    for suit in suits:
+        for values in combinations(range(len(VALUES)), 5):
+            masks.add(ints_to_mask(value * 4 + suit for value in values))
+
+    # Full houses and four of a kinds
+    for three_value, extra_value in product(range(len(VALUES)), repeat=2):
+        if three_value == extra_value:
+            continue
+
+        for three_suits, two_suits in product(combinations(suits, 3), combinations(suits, 2)):
+            masks.add(ints_to_mask([three_value * 4 + suit for suit in three_suits] +
+                                   [extra_value * 4 + suit for suit in two_suits]))
+
+        for suit in suits:
+            masks.add(ints_to_mask([three_value * 4 + four_suit for four_suit in suits] + [extra_value * 4 + suit]))
+
+    return masks
+
+
+def hash_slot(mask):
+    return (mask * HASH_MULTIPLIER & 0xFFFFFFFFFFFFFFFF) >> (64 - SLOT_BITS)
+
+
+# Builds the rank table and writes it to path
+def build_rank_table(path=TABLE_PATH):
+    masks_by_size = {}
+    for mask in legal_masks():
+        cards_type = get_mask_type(mask)
+        masks_by_size.setdefault(mask_size(mask), []).append(((cards_type, get_mask_key(mask, cards_type)), mask))
+
+    slots = bytearray(SLOT.size << SLOT_BITS)
+    for size, entries in masks_by_size.items():
+        entries.sort()
+        rank = 0
+        prev_order = None
+
+        for order, mask in entries:
+            if order != prev_order:
+                rank += 1
+                prev_order = order
+
+            slot = hash_slot(mask)
+            while SLOT.unpack_from(slots, slot * SLOT.size)[0]:
+                slot = (slot + 1) & ((1 << SLOT_BITS) - 1)
+
+            SLOT.pack_into(slots, slot * SLOT.size, mask, size << SIZE_SHIFT | rank << RANK_SHIFT | order[0])
+
+    # Writes to a temp file first so that other processes never map a partial table
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "wb") as f:
+        f.write(HEADER.pack(TABLE_MAGIC, SLOT_BITS))
+        f.write(slots)
+    # mkstemp makes the file readable by its owner only, the workers of other users map it too
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+# Memory maps the rank table, building it first if it does not exist
+def load_rank_table(path=TABLE_PATH):
+    global _table
+
+    if not os.path.exists(path):
+        build_rank_table(path)
+
+    with open(path, "rb") as f:
+        table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if HEADER.unpack_from(table) != (TABLE_MAGIC, SLOT_BITS):
+        table.close()
+        build_rank_table(path)
+        return load_rank_table(path)
+
+    _table = table
+
+    return table
+
+
+def get_rank_key(mask):
+    size = mask_size(mask)
+
+    if size == 13:
+        # All dragons have the same rank
+        cards_type = get_mask_type(mask)
+        return size << SIZE_SHIFT | 1 << RANK_SHIFT | cards_type if cards_type != -1 else size << SIZE_SHIFT
+    elif size not in (1, 2, 3, 5):
+        return size << SIZE_SHIFT
+
+    table = _table if _table is not None else load_rank_table()
+    slot = hash_slot(mask)
+
+    while True:
+        slot_mask, key = SLOT.unpack_from(table, HEADER.size + slot * SLOT.size)
+        if slot_mask == mask:
+            return key
+        elif not slot_mask:
+            return size << SIZE_SHIFT
+
+        slot = (slot + 1) & ((1 << SLOT_BITS) - 1)
+
+
+def get_key_type(key):
+    return key & TYPE_MASK or -1
+
+
+# Returns if the cards of curr_key are bigger than the cards of prev_key
+def is_key_bigger(prev_key, curr_key):
+    if not prev_key:
+        return True
+
+    prev_rank, curr_rank = prev_key >> RANK_SHIFT, curr_key >> RANK_SHIFT
+
+    return curr_rank >> RANK_BITS == prev_rank >> RANK_BITS and prev_rank & ((1 << RANK_BITS) - 1) != 0 and \
+        curr_rank > prev_rank
+
+
+if __name__ == "__main__":
+    build_rank_table(sys.argv[1] if len(sys.argv) > 1 else TABLE_PATH)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from sqlalchemy.orm import sessionmaker
+
+from database import make_engine
+from player import Player
+from shard_lease import ShardLease, get_shard
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_KEYS = ("message", "edited_message", "channel_post", "edited_channel_post")
+USER_KEYS = ("callback_query", "inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query")
+
+
+# Returns the chat of an update and if it is a private chat, updates without a chat use the update ID
+def get_update_chat(update):
+    for key in MESSAGE_KEYS:
+        if key in update:
+            chat = update[key]["chat"]
+            return chat["id"], chat.get("type") == "private"
+
+    # Inline buttons go by the chat of their message, as callback_group does in the bot
+    if "message" in update.get("callback_query", {}):
+        chat = update["callback_query"]["message"]["chat"]
+        return chat["id"], chat.get("type") == "private"
+
+    for key in USER_KEYS:
+        if key in update:
+            return update[key]["from"]["id"], True
+
+    return update["update_id"], False
+
+
+# Forwards each update to the worker that owns the shard of its group. Updates from a player in a private chat go to
+# the player's game, as the cards and buttons of the game are handled by the group's worker
+class Router(object):
+    def __init__(self, session_factory, num_shards, url_path, refresh_interval=1):
+        self.session_factory = session_factory
+        self.num_shards = num_shards
+        self.url_path = url_path
+        self.refresh_interval = refresh_interval
+        self.addresses = {}
+        self.refreshed = 0
+        self.lock = threading.Lock()
+        self.num_forwarded = self.num_failed = 0
+
+    # Returns the group or chat whose shard handles the update, with a primary key lookup for private chats
+    def get_route_id(self, update):
+        chat_id, is_private = get_update_chat(update)
+        if not is_private:
+            return chat_id
+
+        s = self.session_factory()
+        try:
+            player = s.query(Player.group_tele_id).filter(Player.player_tele_id == chat_id).first()
+        finally:
+            s.close()
+
+        return player.group_tele_id if player else chat_id
+
+    # Returns the address of the worker of each shard whose lease has not expired, which are read again after
+    # refresh_interval seconds or when refresh is True
+    def get_addresses(self, refresh=False):
+        with self.lock:
+            now = time.time()
+            if refresh or now - self.refreshed >= self.refresh_interval:
+                s = self.session_factory()
+                try:
+                    self.addresses = dict(s.query(ShardLease.shard, ShardLease.address).
+                                          filter(ShardLease.expires > now))
+                finally:
+                    s.close()
+                self.refreshed = now
+
+            return self.addresses
+
+    # Forwards the update and returns the status for Telegram, which sends the update again if it is not 200
+    def forward(self, update, body):
+        shard = get_shard(self.get_route_id(update), self.num_shards)
+
+        for refresh in (False, True):
+            address = self.get_addresses(refresh).get(shard)
+            if not address:
+                continue
+
+            try:
+                urlopen(Request(address + self.url_path, data=body, headers={"Content-Type": "application/json"}),
+                        timeout=10).close()
+                with self.lock:
+                    self.num_forwarded += 1
+
+                return 200
+            except OSError as e:
+                logger.warning("Failed to forward update %s to %s: %s" % (update.get("update_id"), address, e))
+
+        # The shard has no live worker yet, so Telegram sends the update again later
+        with self.lock:
+            self.num_failed += 1
+
+        return 503
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_handler(router):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/" + router.url_path:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                update = json.loads(body.decode("utf-8"))
+                status = router.forward(update, body)
+            except (ValueError, KeyError) as e:
+                logger.warning("Dropped an invalid update: %s" % e)
+                status = 200
+            except Exception as e:
+                # Telegram sends the update again, for example once the database is back
+                logger.exception(e)
+                status = 503
+
+            self.send_response(status)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return WebhookHandler
+
+
+# Sets the bot's webhook to the router
+def set_webhook(telegram_token, url):
+    data = urlencode({"url": url}).encode("utf-8")
+    urlopen("https://api.telegram.org/bot%s/setWebhook" % telegram_token, data=data, timeout=30).close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receives the bot's webhook and forwards each update to the worker "
+                                                 "that owns its group. TELEGRAM_TOKEN, APP_URL and DATABASE_URL are "
+                                                 "read from the environment like the bot")
+    parser.add_argument("-p", "--port", type=int, default=int(os.environ.get("PORT", "5000")),
+                        help="Port to listen on (default: %(default)s)")
+    parser.add_argument("-s", "--shards", type=int, default=int(os.environ.get("NUM_SHARDS", "16")),
+                        help="Number of shards, which must be the same as the workers' (default: %(default)s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="[%(asctime)s] [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %I:%M:%S %p',
+                        level=logging.INFO)
+    telegram_token = os.environ.get("TELEGRAM_TOKEN_BETA", os.environ.get("TELEGRAM_TOKEN"))
+    app_url = os.environ.get("APP_URL")
+    if not telegram_token or not app_url:
+        logger.error("TELEGRAM_TOKEN and APP_URL are required")
+        return 1
+
+    engine = make_engine(os.environ.get("DATABASE_URL"), 4, 0, 30)
+    router = Router(sessionmaker(bind=engine), args.shards, telegram_token)
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), make_handler(router))
+
+    set_webhook(telegram_token, app_url + telegram_token)
+    logger.info("Routing updates to %d shards on port %d" % (args.shards, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info("Forwarded %d updates, %d failed" % (router.num_forwarded, router.num_failed))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+from sqlalchemy import bindparam, case
+
+from ai import is_ai_player
+from card import mask_size
+from game_stat import GroupStat, PlayerStat
+from money import settle_money
+
+
+# Returns the change of money of each player, the winner earns what the others lose and AI players earn nothing
+def get_money_changes(players, won_player, card_money):
+    money_losts = settle_money([player.cards for player in players], card_money)
+    changes = [-money_lost for money_lost in money_losts]
+    changes[won_player] = sum(money_losts)
+
+    return changes
+
+
+# Updates the stats of a finished game with a fixed number of statements and returns the telegram IDs of the players
+# who have no money left
+def settle_stats(s, group_tele_id, players, won_player, money_mode, card_money, init_money):
+    money_changes = get_money_changes(players, won_player, card_money) if money_mode else [0] * len(players)
+    humans = [(player, money_change) for player, money_change in zip(players, money_changes)
+              if not is_ai_player(player.player_tele_id)]
+
+    player_tele_ids = [player.player_tele_id for player, money_change in humans]
+    player_stats = {}
+    if player_tele_ids:
+        player_stats = {row.tele_id: row for row in s.query(
+            PlayerStat.tele_id, PlayerStat.num_games, PlayerStat.num_games_won, PlayerStat.money,
+            PlayerStat.money_earned).filter(PlayerStat.tele_id.in_(player_tele_ids))}
+
+    new_rows, update_rows, broke_tele_ids = [], [], []
+    best_win_rate = best_win_rate_player = most_money_earned = most_money_earned_player = None
+
+    for player, money_change in humans:
+        num_won = 1 if player.player_id == won_player else 0
+        num_cards = 13 - mask_size(player.cards)
+        player_stat = player_stats.get(player.player_tele_id)
+
+        if player_stat:
+            num_games, num_games_won = player_stat.num_games + 1, player_stat.num_games_won + num_won
+            money, money_earned = player_stat.money + money_change, player_stat.money_earned + money_change
+            update_rows.append({"b_tele_id": player.player_tele_id, "b_num_won": num_won, "b_num_cards": num_cards,
+                                "b_money_change": money_change})
+        else:
+            num_games, num_games_won = 1, num_won
+            money, money_earned = init_money + money_change, money_change
+            new_rows.append({"tele_id": player.player_tele_id, "player_name": player.player_name, "num_games": 1,
+                             "num_games_won": num_won, "num_cards": num_cards, "win_rate": num_won * 100.0,
+                             "b_money": money, "money_earned": money_earned})
+
+        if money_change < 0 and money <= 0:
+            broke_tele_ids.append(player.player_tele_id)
+
+        win_rate = num_games_won / num_games * 100
+        if best_win_rate is None or win_rate > best_win_rate:
+            best_win_rate, best_win_rate_player = win_rate, player.player_name
+        if most_money_earned is None or money_earned > most_money_earned:
+            most_money_earned, most_money_earned_player = money_earned, player.player_name
+
+    if new_rows:
+        s.execute(insert_player_stats_statement(), new_rows)
+    if update_rows:
+        s.execute(update_player_stats_statement(), update_rows)
+
+    update_group_stat(s, group_tele_id, best_win_rate, best_win_rate_player, most_money_earned,
+                      most_money_earned_player)
+
+    return broke_tele_ids
+
+
+# Adds the stats of new players, money is clamped at zero by the database
+def insert_player_stats_statement():
+    money = bindparam("b_money")
+
+    return PlayerStat.__table__.insert().values(money=case((money < 0, 0), else_=money))
+
+
+# Adds a game to the stats of each player, money is clamped at zero by the database
+def update_player_stats_statement():
+    table = PlayerStat.__table__
+    num_games_won = table.c.num_games_won + bindparam("b_num_won")
+    money = table.c.money + bindparam("b_money_change")
+
+    return table.update(). \
+        where(table.c.tele_id == bindparam("b_tele_id")). \
+        values(num_games=table.c.num_games + 1,
+               num_games_won=num_games_won,
+               num_cards=table.c.num_cards + bindparam("b_num_cards"),
+               win_rate=num_games_won * 100.0 / (table.c.num_games + 1),
+               money=case((money < 0, 0), else_=money),
+               money_earned=table.c.money_earned + bindparam("b_money_change"))
+
+
+# Adds a game to the group's stats and keeps the best players, inserting the stats if the group has none
+def update_group_stat(s, group_tele_id, best_win_rate, best_win_rate_player, most_money_earned,
+                      most_money_earned_player):
+    table = GroupStat.__table__
+    values = {"num_games": table.c.num_games + 1}
+
+    if best_win_rate is not None:
+        is_better = best_win_rate > table.c.best_win_rate
+        values["best_win_rate_player"] = case((is_better, best_win_rate_player), else_=table.c.best_win_rate_player)
+        values["best_win_rate"] = case((is_better, best_win_rate), else_=table.c.best_win_rate)
+
+        is_richer = most_money_earned > table.c.most_money_earned
+        values["most_money_earned_player"] = case((is_richer, most_money_earned_player),
+                                                  else_=table.c.most_money_earned_player)
+        values["most_money_earned"] = case((is_richer, most_money_earned), else_=table.c.most_money_earned)
+
+    if s.execute(table.update().where(table.c.tele_id == group_tele_id).values(values)).rowcount:
+        return
+
+    group_stat = GroupStat(tele_id=group_tele_id, num_games=1, best_win_rate=0, most_money_earned=0)
+    if best_win_rate is not None and best_win_rate > 0:
+        group_stat.best_win_rate, group_stat.best_win_rate_player = best_win_rate, best_win_rate_player
+    if most_money_earned is not None and most_money_earned > 0:
+        group_stat.most_money_earned, group_stat.most_money_earned_player = most_money_earned, most_money_earned_player
+
+    try:
+        with s.begin_nested():
+            s.add(group_stat)
+    except:
+        # Another game of the group has inserted the stats first
+        s.execute(table.update().where(table.c.tele_id == group_tele_id).values(values))
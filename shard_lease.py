@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Text, Float
+
+from base import Base
+
+
+# The worker that owns a shard of the groups until the lease expires, address is where its updates are forwarded to
+class ShardLease(Base):
+    __tablename__ = "shard_leases"
+
+    shard = Column(Integer, primary_key=True)
+    owner = Column(Text)
+    address = Column(Text)
+    expires = Column(Float)
+
+
+# A running worker, which shares the shards with the other live workers
+class ShardWorker(Base):
+    __tablename__ = "shard_workers"
+
+    owner = Column(Text, primary_key=True)
+    address = Column(Text)
+    expires = Column(Float)
+
+
+# Returns the shard of a group or chat
+def get_shard(tele_id, num_shards):
+    return tele_id % num_shards
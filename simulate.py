@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+from card import FULL_MASK
+from money import settle_money
+from moves import get_legal_mask_moves
+from turn import NUM_PLAYERS, THREE_OF_DIAMONDS, VALID_CARDS, check_cards, next_players_after_use, \
+    next_player_after_pass
+
+card_money = 5
+max_turns = 1000
+
+
+# Chooses a random legal move, or 0 to pass
+def choose_random_move(hand, prev_mask, is_in_control, rng):
+    moves = get_legal_mask_moves(hand, 0 if is_in_control else prev_mask)
+
+    if not is_in_control:
+        moves.append(0)
+
+    return rng.choice(moves)
+
+
+# Plays a full game without Telegram and returns (winner, number of turns, money lost by each player)
+def play_game(rng, choose_move=choose_random_move):
+    deck = list(range(52))
+    rng.shuffle(deck)
+    hands = [sum(1 << card_int for card_int in deck[i * 13:(i + 1) * 13]) for i in range(NUM_PLAYERS)]
+
+    # Player with ♦3 starts first
+    curr_player = biggest_player = next(i for i, hand in enumerate(hands) if hand & THREE_OF_DIAMONDS)
+    prev_mask = 0
+    used_mask = 0
+
+    for num_turns in range(1, max_turns + 1):
+        is_in_control = curr_player == biggest_player
+        move = choose_move(hands[curr_player], prev_mask, is_in_control, rng)
+
+        if move:
+            if check_cards(curr_player, biggest_player, 0 if is_in_control else prev_mask, move) != VALID_CARDS or \
+                    move & ~hands[curr_player]:
+                raise AssertionError("Illegal move %x by player %d against %x" % (move, curr_player, prev_mask))
+
+            hands[curr_player] ^= move
+            used_mask |= move
+
+            if not hands[curr_player]:
+                if used_mask | sum(hands) != FULL_MASK:
+                    raise AssertionError("Cards were lost or duplicated")
+
+                return curr_player, num_turns, settle_money(hands, card_money)
+
+            prev_mask = move
+            curr_player, biggest_player = next_players_after_use(curr_player, move)
+        else:
+            curr_player, is_in_control = next_player_after_pass(curr_player, biggest_player)
+            if is_in_control:
+                prev_mask = 0
+
+    raise AssertionError("Game did not finish in %d turns" % max_turns)
+
+
+# Plays num_games games and returns the totals
+def run_games(args):
+    seed, num_games = args
+    rng = random.Random(seed)
+    wins = [0] * NUM_PLAYERS
+    num_turns = 0
+    money_lost = 0
+
+    for i in range(num_games):
+        winner, game_turns, money_losts = play_game(rng)
+        wins[winner] += 1
+        num_turns += game_turns
+        money_lost += sum(money_losts)
+
+    return wins, num_turns, money_lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays Big Two games without Telegram")
+    parser.add_argument("-g", "--games", type=int, default=10000, help="Number of games (default: %(default)s)")
+    parser.add_argument("-p", "--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="Number of worker processes (default: %(default)s)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed (default: %(default)s)")
+    parser.add_argument("-c", "--chunk", type=int, default=100, help="Games per task (default: %(default)s)")
+    args = parser.parse_args()
+
+    tasks = [(args.seed * 1000003 + i, min(args.chunk, args.games - start))
+             for i, start in enumerate(range(0, args.games, args.chunk))]
+    wins = [0] * NUM_PLAYERS
+    num_turns = 0
+    money_lost = 0
+
+    start_time = time.time()
+    pool = multiprocessing.Pool(args.processes)
+    try:
+        for task_wins, task_turns, task_money_lost in pool.imap_unordered(run_games, tasks):
+            wins = [a + b for a, b in zip(wins, task_wins)]
+            num_turns += task_turns
+            money_lost += task_money_lost
+    finally:
+        pool.close()
+        pool.join()
+    seconds = time.time() - start_time
+
+    print("Games: %d in %.2fs with %d processes" % (args.games, seconds, args.processes))
+    print("Games per second: %.1f" % (args.games / seconds))
+    print("Turns per game: %.1f" % (num_turns / args.games))
+    print("Wins by seat: %s" % ", ".join(str(num_wins) for num_wins in wins))
+    print("Money lost per game: %.1f" % (money_lost / args.games))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
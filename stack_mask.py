@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+from card import stack_to_mask, mask_to_stack
+
+
+# Stores a pydealer stack as a 52-bit card mask instead of a pickle
+class StackMask(TypeDecorator):
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+
+        return stack_to_mask(value)
+
+    # Loaded stacks are sorted by BIG2_RANKS
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        return mask_to_stack(value)
+
+    def coerce_compared_value(self, op, value):
+        return self.impl
@@ -0,0 +1,35 @@
+import random
+import unittest
+
+from ai import choose_ai_move
+from card import ints_to_mask
+from moves import get_legal_mask_moves
+
+num_tests = 100
+
+
+class TestChooseAiMove(unittest.TestCase):
+    def test_legal_move(self):
+        for i in range(num_tests):
+            deck = random.sample(range(52), 26)
+            hand = ints_to_mask(deck[:13])
+            prev_moves = get_legal_mask_moves(ints_to_mask(deck[13:]))
+            prev_mask = random.choice(prev_moves)
+
+            move = choose_ai_move(hand, prev_mask, False, 0.005)
+            self.assertTrue(move == 0 or move in get_legal_mask_moves(hand, prev_mask))
+
+            move = choose_ai_move(hand, prev_mask, True, 0)
+            self.assertIn(move, get_legal_mask_moves(hand))
+
+    def test_uses_all_cards(self):
+        hand = ints_to_mask([8, 9])
+        self.assertEqual(choose_ai_move(hand, ints_to_mask([4, 5]), False, 0.005), hand)
+
+    def test_keeps_pair(self):
+        hand = ints_to_mask([0, 1, 8, 12, 16, 20, 24, 28, 32, 36])
+        self.assertEqual(choose_ai_move(hand, ints_to_mask([2]), False, 0.005), ints_to_mask([8]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import random
+import unittest
+
+import numpy as np
+
+from batch_eval import evaluate, are_bigger
+from card import ints_to_mask, mask_to_ints, get_mask_type, is_mask_bigger
+from moves import get_legal_mask_moves
+
+num_tests = 500
+
+
+def random_hands(size):
+    hands = []
+    for i in range(num_tests):
+        if size in (1, 2, 3, 5) and random.random() < 0.5:
+            moves = [move for move in get_legal_mask_moves(ints_to_mask(random.sample(range(52), 13)))
+                     if bin(move).count("1") == size]
+            if moves:
+                hands.append(random.sample(mask_to_ints(random.choice(moves)), size))
+                continue
+        elif size == 13 and random.random() < 0.5:
+            hands.append([value * 4 + random.randint(0, 3) for value in range(13)])
+            continue
+
+        hands.append(random.sample(range(52), size))
+
+    return np.array(hands, dtype=np.int64).reshape(num_tests, size)
+
+
+class TestBatchEval(unittest.TestCase):
+    def test_types(self):
+        for size in (1, 2, 3, 4, 5, 13):
+            hands = random_hands(size)
+            types, _ = evaluate(hands)
+
+            self.assertEqual(types.tolist(), [get_mask_type(ints_to_mask(hand)) for hand in hands.tolist()])
+
+    def test_bigger(self):
+        for size in (1, 2, 3, 5, 13):
+            prev_hands, curr_hands = random_hands(size), random_hands(size)
+            expected = [is_mask_bigger(ints_to_mask(prev_hand), ints_to_mask(curr_hand))
+                        for prev_hand, curr_hand in zip(prev_hands.tolist(), curr_hands.tolist())]
+
+            self.assertEqual(are_bigger(prev_hands, curr_hands).tolist(), expected)
+
+    def test_empty_prev_cards(self):
+        self.assertTrue(np.all(are_bigger(np.zeros((3, 0), dtype=np.int64), random_hands(5)[:3])))
+
+    def test_repeated_card(self):
+        types, _ = evaluate(np.array([[4, 4]]))
+        self.assertEqual(types.tolist(), [-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
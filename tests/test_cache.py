@@ -0,0 +1,77 @@
+import time
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get(self):
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(1, "en"), "en")
+
+        cache.set(1, "it")
+        self.assertEqual(cache.get(1), "it")
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_evict(self):
+        cache = LRUCache(2)
+        cache.set(1, "en")
+        cache.set(2, "it")
+
+        # The least recently used item is evicted
+        cache.get(1)
+        cache.set(3, "zh-hk")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(1), "en")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(3), "zh-hk")
+
+    def test_invalidate(self):
+        cache = LRUCache(2)
+        cache.set(1, "en")
+        cache.invalidate(1)
+        cache.invalidate(2)
+        self.assertIsNone(cache.get(1))
+
+        cache.set(1, "it")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_invalidate_on_commit(self):
+        engine = create_engine("sqlite://")
+        s = sessionmaker(bind=engine)()
+        cache = LRUCache(2)
+        cache.invalidate(1, s)
+
+        # Another update caches the value before the change is committed
+        cache.set(1, "en")
+        s.commit()
+        self.assertIsNone(cache.get(1))
+        s.close()
+        engine.dispose()
+
+    def test_invalidate_if(self):
+        cache = LRUCache(4)
+        for key in range(4):
+            cache.set(key, "en")
+
+        cache.invalidate_if(lambda key: key % 2 == 0)
+        self.assertEqual([cache.get(key) for key in range(4)], [None, "en", None, "en"])
+
+    def test_ttl(self):
+        cache = LRUCache(2, 0.01)
+        cache.set(1, "en")
+        self.assertEqual(cache.get(1), "en")
+
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import random
+import unittest
+
+from pydealer import Stack, Card
+from pydealer.const import BIG2_RANKS, SUITS, VALUES
+
+from card import stack_to_mask, mask_to_stack, mask_to_ints, ints_to_mask, card_to_int, get_mask_type, \
+    is_mask_bigger
+from card_type import *
+
+num_tests = 100
+
+
+def make_mask(*abbrevs):
+    cards = []
+    for abbrev in abbrevs:
+        value = {"J": "Jack", "Q": "Queen", "K": "King", "A": "Ace"}.get(abbrev[:-1], abbrev[:-1])
+        suit = {"D": "Diamonds", "C": "Clubs", "H": "Hearts", "S": "Spades"}[abbrev[-1]]
+        cards.append(Card(value, suit))
+
+    return stack_to_mask(cards)
+
+
+class TestConverters(unittest.TestCase):
+    def test_card_order(self):
+        cards = Stack(cards=[Card(value, suit) for value in VALUES for suit in SUITS])
+        cards.sort(ranks=BIG2_RANKS)
+        self.assertEqual([card_to_int(card) for card in cards], list(range(52)))
+
+    def test_round_trip(self):
+        deck = [Card(value, suit) for value in VALUES for suit in SUITS]
+
+        for i in range(num_tests):
+            cards = Stack(cards=random.sample(deck, random.randint(0, 13)))
+            mask = stack_to_mask(cards)
+            self.assertEqual(stack_to_mask(mask_to_stack(mask)), mask)
+            self.assertEqual(ints_to_mask(mask_to_ints(mask)), mask)
+
+            cards.sort(ranks=BIG2_RANKS)
+            self.assertEqual([card.abbrev for card in mask_to_stack(mask)], [card.abbrev for card in cards])
+
+
+class TestMaskType(unittest.TestCase):
+    def test_types(self):
+        self.assertEqual(get_mask_type(make_mask("3D")), SINGLE)
+        self.assertEqual(get_mask_type(make_mask("3D", "3S")), PAIR)
+        self.assertEqual(get_mask_type(make_mask("3D", "3S", "3H")), THREE_OF_A_KIND)
+        self.assertEqual(get_mask_type(make_mask("3D", "4D", "5D", "AD", "2D")), STRAIGHT_FLUSH)
+        self.assertEqual(get_mask_type(make_mask("3D", "4D", "5D", "6D", "2D")), STRAIGHT_FLUSH)
+        self.assertEqual(get_mask_type(make_mask("3D", "4C", "5D", "AD", "2D")), STRAIGHT)
+        self.assertEqual(get_mask_type(make_mask("QD", "KC", "AD", "2D", "3D")), -1)
+        self.assertEqual(get_mask_type(make_mask("QD", "KD", "AD", "2D", "3D")), FLUSH)
+        self.assertEqual(get_mask_type(make_mask("7D", "7C", "7H", "7S", "3D")), FOUR_OF_A_KIND)
+        self.assertEqual(get_mask_type(make_mask("7D", "7C", "7H", "3S", "3D")), FULL_HOUSE)
+        self.assertEqual(get_mask_type(0), -1)
+
+
+class TestMaskBigger(unittest.TestCase):
+    def test_pair(self):
+        self.assertTrue(is_mask_bigger(make_mask("5D", "5C"), make_mask("5H", "5S")))
+        self.assertFalse(is_mask_bigger(make_mask("5D", "5C"), make_mask("4H", "4S")))
+
+    def test_straight(self):
+        low_mask = make_mask("10D", "JC", "QD", "KD", "AD")
+        high_mask = make_mask("3D", "4C", "5D", "AD", "2D")
+        self.assertTrue(is_mask_bigger(low_mask, high_mask))
+        self.assertFalse(is_mask_bigger(high_mask, low_mask))
+
+        low_mask = make_mask("3D", "4C", "5D", "6D", "7D")
+        high_mask = make_mask("3C", "4D", "5C", "6C", "7C")
+        self.assertTrue(is_mask_bigger(low_mask, high_mask))
+
+    def test_flush(self):
+        low_mask = make_mask("3C", "5C", "7C", "9C", "JC")
+        self.assertFalse(is_mask_bigger(low_mask, make_mask("4D", "6D", "8D", "10D", "QD")))
+        self.assertTrue(is_mask_bigger(low_mask, make_mask("4C", "6C", "8C", "10C", "QC")))
+
+    def test_antisymmetric(self):
+        deck = list(range(52))
+
+        for i in range(num_tests * 10):
+            size = random.choice((1, 2, 3, 5))
+            prev_mask = ints_to_mask(random.sample(deck, size))
+            curr_mask = ints_to_mask(random.sample(deck, size))
+
+            if prev_mask != curr_mask and is_mask_bigger(prev_mask, curr_mask):
+                self.assertFalse(is_mask_bigger(curr_mask, prev_mask))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import base
+from counter_store import CounterStore
+from game_stat import GroupStat
+from global_counter import GlobalCounter, GAMES, PLAYERS, GROUPS
+from language import Language
+from migration import migrate
+
+
+class TestCounterStore(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        base.Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.store = CounterStore(self.session_factory)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_seed(self):
+        s = self.session_factory()
+        s.add_all([Language(tele_id=1, language="en"), Language(tele_id=2, language="it"),
+                   Language(tele_id=-1, language="en"), GroupStat(tele_id=-1, num_games=3),
+                   GroupStat(tele_id=-2, num_games=4)])
+        s.commit()
+
+        # The counters are only seeded once
+        migrate(self.engine)
+        s.add(Language(tele_id=3, language="en"))
+        s.commit()
+        migrate(self.engine)
+
+        self.assertEqual(self.store.get_counts(s), {GAMES: 7, PLAYERS: 2, GROUPS: 1})
+        s.close()
+
+    def test_add_on_commit(self):
+        s = self.session_factory()
+        self.store.add(s, PLAYERS)
+        self.store.add(s, GAMES, 2)
+        self.assertEqual(self.store.get_counts(s)[PLAYERS], 0)
+        s.commit()
+        self.assertEqual(self.store.get_counts(s), {GAMES: 2, PLAYERS: 1, GROUPS: 0})
+
+        # Rolled back rows are not counted, even if the session commits later
+        self.store.add(s, GROUPS)
+        s.rollback()
+        s.commit()
+        self.assertEqual(self.store.get_counts(s), {GAMES: 2, PLAYERS: 1, GROUPS: 0})
+        s.close()
+
+    def test_flush(self):
+        migrate(self.engine)
+        s = self.session_factory()
+        self.store.add(s, PLAYERS)
+        self.store.add(s, GROUPS)
+        s.commit()
+
+        self.assertEqual(self.store.flush(), 2)
+        self.assertEqual(self.store.flush(), 0)
+        self.assertEqual(dict(s.query(GlobalCounter.name, GlobalCounter.value)), {GAMES: 0, PLAYERS: 1, GROUPS: 1})
+        self.assertEqual(self.store.get_counts(s), {GAMES: 0, PLAYERS: 1, GROUPS: 1})
+
+        # Counters that are not seeded are inserted
+        s.query(GlobalCounter).delete()
+        s.commit()
+        self.store.add(s, GAMES)
+        s.commit()
+        self.store.flush()
+        self.assertEqual(self.store.get_counts(s), {GAMES: 1, PLAYERS: 0, GROUPS: 0})
+        s.close()
+
+    def test_no_scans(self):
+        migrate(self.engine)
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        s = self.session_factory()
+        self.store.get_counts(s)
+        s.close()
+
+        self.assertEqual(len(statements), 1)
+        self.assertIn("global_counters", statements[0])
+        self.assertNotIn("languages", statements[0])
+        self.assertNotIn("group_stats", statements[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy.orm import sessionmaker
+
+import base
+from database import is_sqlite, make_engine
+from game_stat import PlayerStat
+from language import Language
+from migration import migrate
+from unit_of_work import unit_of_work
+
+num_tests = 8
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_engine(self, url):
+        engine = make_engine(url, 20, 0, 5)
+        base.Base.metadata.create_all(engine)
+        migrate(engine)
+
+        return engine
+
+    def test_is_sqlite(self):
+        self.assertTrue(is_sqlite("sqlite://"))
+        self.assertTrue(is_sqlite("sqlite:///big_two.db"))
+        self.assertFalse(is_sqlite("postgresql://user:pw@localhost/big_two"))
+
+    def test_memory(self):
+        self.check_engine(self.make_engine("sqlite://"))
+
+    def test_file(self):
+        self.check_engine(self.make_engine("sqlite:///" + os.path.join(self.temp_dir, "test.db")))
+
+    def check_engine(self, engine):
+        session_factory = sessionmaker(bind=engine)
+
+        # A failed insert in a savepoint keeps the rest of the transaction
+        s = session_factory()
+        s.add(Language(tele_id=1, language="en"))
+        s.flush()
+        try:
+            with s.begin_nested():
+                s.add(Language(tele_id=1, language="it"))
+        except:
+            pass
+        s.add(Language(tele_id=2, language="it"))
+        s.commit()
+        self.assertEqual(s.query(Language).count(), 2)
+        s.close()
+
+        # Handlers running in threads take turns on the database
+        @unit_of_work(session_factory)
+        def handler(bot, update, s):
+            s.add(PlayerStat(tele_id=update, player_name="Player", money=1000))
+
+        threads = [threading.Thread(target=handler, args=(None, tele_id)) for tele_id in range(num_tests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        s = session_factory()
+        self.assertEqual(s.query(PlayerStat).count(), num_tests)
+        s.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
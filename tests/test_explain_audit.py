@@ -0,0 +1,46 @@
+import unittest
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+import base
+from database import make_engine
+from explain_audit import seed, audit, get_scanned_tables
+from migration import migrate
+
+num_tests = 20
+
+
+class TestExplainAudit(unittest.TestCase):
+    def setUp(self):
+        self.engine = make_engine("sqlite://", 5, 0, 30)
+        base.Base.metadata.create_all(self.engine)
+        migrate(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        seed(self.session_factory, num_tests)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_no_scans(self):
+        self.assertEqual(audit(self.engine, self.session_factory), [])
+
+    def test_missing_index(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_players_group_tele_id_player_id"))
+
+        findings = audit(self.engine, self.session_factory)
+        self.assertIn(("flush", {"players"}), [(workload, tables) for workload, _, tables, _ in findings])
+        self.assertIn(("load_game", {"players_1"}), [(workload, tables) for workload, _, tables, _ in findings])
+
+    def test_postgres_plan(self):
+        plan = ["Hash Join  (cost=1.09..2.19 rows=4 width=84)",
+                "  ->  Seq Scan on players  (cost=0.00..1.04 rows=4 width=40)",
+                "  ->  Index Scan using games_pkey on games  (cost=0.15..8.17 rows=1 width=44)"]
+        self.assertEqual(get_scanned_tables("postgresql", plan), {"players"})
+        self.assertEqual(get_scanned_tables("sqlite", ["SCAN games", "SEARCH players USING INDEX ix (x=?)"]),
+                         {"games"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import random
+import unittest
+
+import fuzz
+
+from card import ints_to_mask, mask_to_stack, get_mask_type
+from card_reference import get_cards_type, are_cards_bigger
+from card_type import PAIR, STRAIGHT, FLUSH, STRAIGHT_FLUSH
+
+num_tests = 2000
+
+
+# Returns if the plays are compared by a rule that card.py has changed on purpose: a pair of a smaller value no longer
+# wins on suit, straights and flushes compare values from the biggest card down, a flush of a smaller suit no longer
+# wins on value, and straight flushes of the same or a smaller suit no longer compare the value of the biggest card
+def is_changed_rule(prev_ints, curr_ints, cards_type):
+    if cards_type == PAIR:
+        return max(curr_ints) >> 2 < max(prev_ints) >> 2
+    elif cards_type == STRAIGHT:
+        return is_crossing(prev_ints, curr_ints)
+    elif cards_type == FLUSH:
+        return curr_ints[0] & 3 < prev_ints[0] & 3 or is_crossing(prev_ints, curr_ints)
+
+    return curr_ints[0] & 3 <= prev_ints[0] & 3
+
+
+# Returns if the values of the plays, from the biggest card down, are bigger at one position and smaller at another
+def is_crossing(prev_ints, curr_ints):
+    pairs = list(zip(sorted(card_int >> 2 for card_int in prev_ints), sorted(card_int >> 2 for card_int in curr_ints)))
+
+    return any(curr > prev for prev, curr in pairs) and any(curr < prev for prev, curr in pairs)
+
+
+class TestFuzz(unittest.TestCase):
+    def test_engines_agree(self):
+        num_cases, failures = fuzz.run_cases((sorted(fuzz.ENGINES), random.randrange(1000), num_tests))
+        self.assertEqual(num_cases, num_tests)
+        self.assertEqual(failures, [])
+
+    def test_rule_bug(self):
+        # An engine that has the mask engine's rules but does not compare the suits of pairs of the same value
+        def broken_outcomes(cases):
+            return [(curr_type, False) if curr_type == PAIR and max(prev_ints) >> 2 == max(curr_ints) >> 2 else
+                    (curr_type, is_bigger)
+                    for (prev_ints, curr_ints), (curr_type, is_bigger) in zip(cases, fuzz.mask_outcomes(cases))]
+
+        fuzz.ENGINES["broken"] = (broken_outcomes, lambda outcome: outcome)
+        try:
+            self.assertEqual(fuzz.check_case("broken", ((0, 1), (2, 3))), ((PAIR, True), (PAIR, False)))
+            self.assertIsNone(fuzz.check_case("mask", ((0, 1), (2, 3))))
+        finally:
+            del fuzz.ENGINES["broken"]
+
+    def test_changed_rule_bug(self):
+        # An engine that orders straight flushes by their values before their suits
+        def broken_outcomes(cases):
+            return [(curr_type, sorted(curr_ints) > sorted(prev_ints)) if curr_type == STRAIGHT_FLUSH and
+                    get_mask_type(ints_to_mask(prev_ints)) == STRAIGHT_FLUSH else (curr_type, is_bigger)
+                    for (prev_ints, curr_ints), (curr_type, is_bigger) in zip(cases, fuzz.mask_outcomes(cases))]
+
+        fuzz.ENGINES["broken"] = (broken_outcomes, lambda outcome: outcome)
+        try:
+            case = ((7, 11, 15, 19, 23), (8, 12, 16, 20, 24))
+            self.assertEqual(fuzz.check_case("broken", case), ((STRAIGHT_FLUSH, False), (STRAIGHT_FLUSH, True)))
+            self.assertIsNone(fuzz.check_case("mask", case))
+        finally:
+            del fuzz.ENGINES["broken"]
+
+    def test_new_rule_key(self):
+        # The new ordering agrees with the rules from before the card masks where those rules were not changed
+        rng = random.Random(0)
+        num_compared = 0
+        for i in range(num_tests * 10):
+            prev_ints, curr_ints = fuzz.random_case(rng)
+            prev_cards, curr_cards = mask_to_stack(ints_to_mask(prev_ints)), mask_to_stack(ints_to_mask(curr_ints))
+            prev_type, curr_type = get_cards_type(prev_cards), get_cards_type(curr_cards)
+
+            if prev_type == curr_type and len(prev_ints) == len(curr_ints) and curr_type in fuzz.CHANGED_TYPES and \
+                    not is_changed_rule(prev_ints, curr_ints, curr_type):
+                self.assertEqual(fuzz.new_rule_key(curr_ints, curr_type) > fuzz.new_rule_key(prev_ints, prev_type),
+                                 are_cards_bigger(prev_cards, curr_cards), (prev_ints, curr_ints))
+                num_compared += 1
+
+        self.assertGreater(num_compared, 0)
+
+    def test_random_case(self):
+        rng = random.Random(0)
+        for i in range(num_tests):
+            for card_ints in fuzz.random_case(rng):
+                self.assertEqual(len(set(card_ints)), len(card_ints))
+                self.assertTrue(all(0 <= card_int < 52 for card_int in card_ints))
+
+    def test_shrink(self):
+        # An engine that gets every flush wrong
+        def broken_outcomes(cases):
+            return [(-1, False) if get_mask_type(ints_to_mask(curr_ints)) == FLUSH else outcome
+                    for (prev_ints, curr_ints), outcome in zip(cases, fuzz.mask_outcomes(cases))]
+
+        fuzz.ENGINES["broken"] = (broken_outcomes, lambda outcome: outcome)
+        try:
+            num_cases, failures = fuzz.run_cases((["broken"], 0, num_tests))
+        finally:
+            del fuzz.ENGINES["broken"]
+
+        self.assertEqual(len(failures), fuzz.max_failures)
+        for engine, case, shrunk_case, (expected, actual) in failures:
+            self.assertEqual(engine, "broken")
+            self.assertEqual(shrunk_case, ((), (0, 4, 8, 12, 20)))
+            self.assertEqual(expected, (FLUSH, True))
+            self.assertEqual(actual, (-1, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import threading
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import base
+from card import deal_hands, stack_to_mask
+from game import Game
+from game_state import GameState, PlayerState, GameStore
+from group_setting import GroupSetting
+from player import Player
+
+num_tests = 10
+
+
+class TestGameStore(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        base.Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.store = GameStore(self.session_factory)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def add_game(self, group_tele_id):
+        game = GameState(group_tele_id)
+        self.assertTrue(self.store.add_game(game))
+
+        for i in range(4):
+            self.assertTrue(self.store.add_player(game, PlayerState(group_tele_id, group_tele_id * 10 + i, str(i))))
+
+        return game
+
+    def test_change(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        base.Base.metadata.create_all(engine)
+        self.store = GameStore(sessionmaker(bind=engine))
+        game = self.add_game(1)
+        player = game.players[0]
+        player.cards = 1
+
+        # A flush waits for a move to be made in full
+        with self.store.change(game):
+            game.curr_cards |= 1
+            thread = threading.Thread(target=self.store.flush)
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+            player.cards &= ~1
+
+        thread.join()
+        s = self.store.session_factory()
+        self.assertEqual(stack_to_mask(s.query(Player.cards).filter(Player.player_tele_id == 10).one()[0]), 0)
+        self.assertEqual(stack_to_mask(s.query(Game.curr_cards).one()[0]), 1)
+        s.close()
+        engine.dispose()
+
+    def test_slots(self):
+        game = GameState(1)
+        player = PlayerState(1, 2, "Player")
+        self.assertFalse(hasattr(game, "__dict__"))
+        self.assertFalse(hasattr(player, "__dict__"))
+
+        with self.assertRaises(AttributeError):
+            game.num_players = 4
+
+    def test_add(self):
+        game = self.add_game(1)
+        self.assertFalse(self.store.add_game(GameState(1)))
+        self.assertIs(self.store.get_game(1), game)
+        self.assertEqual([player.player_id for player in game.players], [0, 1, 2, 3])
+        self.assertIs(self.store.get_player(12), game.players[2])
+
+        # The game is full and players can only be in one game
+        self.assertFalse(self.store.add_player(game, PlayerState(1, 99, "Player")))
+        other_game = GameState(2)
+        self.store.add_game(other_game)
+        self.assertFalse(self.store.add_player(other_game, PlayerState(2, 10, "Player")))
+
+    def test_flush(self):
+        for group_tele_id in range(1, num_tests + 1):
+            game = self.add_game(group_tele_id)
+            for player, cards in zip(game.players, deal_hands()):
+                player.cards = stack_to_mask(cards)
+
+            game.curr_player = game.biggest_player = 2
+            game.prev_cards = game.players[0].cards & -game.players[0].cards
+            self.store.save(game)
+
+        self.assertEqual(self.store.flush(), num_tests)
+        self.assertEqual(self.store.flush(), 0)
+
+        s = self.session_factory()
+        for group_tele_id in range(1, num_tests + 1):
+            game = self.store.get_game(group_tele_id)
+            game_row = s.query(Game).filter(Game.group_tele_id == group_tele_id).one()
+            self.assertEqual(game_row.curr_player, 2)
+            self.assertEqual(stack_to_mask(game_row.prev_cards), game.prev_cards)
+
+            for player in game.players:
+                player_row = s.query(Player).filter(Player.player_tele_id == player.player_tele_id).one()
+                self.assertEqual(player_row.player_id, player.player_id)
+                self.assertEqual(stack_to_mask(player_row.cards), player.cards)
+        s.close()
+
+        # Only the changed games are written
+        game = self.store.get_game(1)
+        game.game_round = 5
+        self.store.save(game)
+        self.store.delete_game(2)
+        self.assertIsNone(self.store.get_player(20))
+        self.assertEqual(self.store.flush(), 2)
+
+        s = self.session_factory()
+        self.assertEqual(s.query(Game.game_round).filter(Game.group_tele_id == 1).one()[0], 5)
+        self.assertIsNone(s.query(Game).filter(Game.group_tele_id == 2).first())
+        self.assertEqual(s.query(Player).filter(Player.group_tele_id == 2).count(), 0)
+        self.assertEqual(s.query(Player).count(), (num_tests - 1) * 4)
+        s.close()
+
+    def test_conflict(self):
+        self.add_game(1)
+        self.add_game(2)
+        self.assertEqual(self.store.flush(), 2)
+        self.assertEqual(self.store.get_game(1).version, 1)
+
+        # Another process loads the games and changes them first
+        other_store = GameStore(self.session_factory)
+        s = self.session_factory()
+        other_store.load_all(s)
+        s.close()
+        other_game = other_store.get_game(1)
+        other_game.curr_player = 3
+        other_store.save(other_game)
+        other_store.delete_game(2)
+        other_store.add_game(GameState(3, curr_player=1))
+        self.assertEqual(other_store.flush(), 3)
+
+        game = self.store.get_game(1)
+        game.curr_player = 1
+        self.store.save(game)
+        self.store.add_game(GameState(3, curr_player=2))
+
+        # Deleting a game that is already deleted is not a conflict
+        self.store.delete_game(2)
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.store.num_conflicts, 2)
+
+        # The changed games are dropped and loaded again
+        self.assertIsNone(self.store.get_game(1))
+        self.assertIsNone(self.store.get_player(10))
+        s = self.session_factory()
+        self.assertEqual(self.store.load(s, 1).curr_player, 3)
+        self.assertEqual(self.store.load(s, 3).curr_player, 1)
+        self.assertEqual(s.query(Game.version).filter(Game.group_tele_id == 1).one()[0], 2)
+        s.close()
+
+        game = self.store.get_game(1)
+        game.curr_player = 0
+        self.store.save(game)
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(game.version, 3)
+
+    def test_unload(self):
+        for group_tele_id in range(1, 5):
+            self.add_game(group_tele_id)
+        self.store.flush()
+        game = self.store.get_game(2)
+        game.game_round = 3
+        self.store.save(game)
+
+        # The games are written before they are forgotten
+        self.assertEqual(sorted(self.store.unload(lambda group_tele_id: group_tele_id % 2 == 0)), [2, 4])
+        self.assertIsNone(self.store.get_game(2))
+        self.assertIsNone(self.store.get_player(40))
+        self.assertIsNotNone(self.store.get_game(1))
+
+        s = self.session_factory()
+        self.assertEqual(self.store.load(s, 2).game_round, 3)
+        s.close()
+
+    def test_start_stop(self):
+        self.add_game(1)
+        self.store.start(60)
+        self.store.stop()
+
+        s = self.session_factory()
+        self.assertEqual(s.query(Player).count(), 4)
+        s.close()
+
+    def test_load_all(self):
+        for group_tele_id in range(1, num_tests + 1):
+            game = self.add_game(group_tele_id)
+            for player, cards in zip(game.players, deal_hands()):
+                player.cards = stack_to_mask(cards)
+
+            game.curr_player = group_tele_id % 4
+            game.deadline, game.message_id = 1000.5 + group_tele_id, group_tele_id * 100
+
+        s = self.session_factory()
+        s.add(GroupSetting(tele_id=1, join_timer=60, pass_timer=30, money_mode=False))
+        s.commit()
+        s.close()
+        self.store.stop()
+
+        # A restarted bot loads all the games with one query
+        num_queries = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: num_queries.append(1))
+        store = GameStore(self.session_factory)
+        s = self.session_factory()
+        games = store.load_all(s)
+        s.close()
+        self.assertEqual(len(num_queries), 1)
+
+        self.assertEqual(sorted(game.group_tele_id for game in games), list(range(1, num_tests + 1)))
+        for group_tele_id in range(1, num_tests + 1):
+            game, loaded_game = self.store.get_game(group_tele_id), store.get_game(group_tele_id)
+            self.assertEqual(loaded_game.to_row(), game.to_row())
+            self.assertEqual([player.to_row() for player in loaded_game.players],
+                             [player.to_row() for player in game.players])
+            self.assertIs(store.get_player(group_tele_id * 10 + 3), loaded_game.players[3])
+
+        self.assertEqual((store.get_game(1).deadline, store.get_game(1).message_id), (1001.5, 100))
+        self.assertEqual((store.get_game(1).pass_timer, store.get_game(2).pass_timer), (30, None))
+
+        # Games that are already in memory or deleted are not loaded again
+        store.delete_game(1)
+        s = self.session_factory()
+        self.assertEqual(store.load_all(s), [])
+        s.close()
+        self.assertIsNone(store.get_game(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
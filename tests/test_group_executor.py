@@ -0,0 +1,107 @@
+import threading
+import time
+import unittest
+
+from group_executor import GroupExecutor, run_in_group
+
+
+class TestGroupExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = GroupExecutor(4)
+        self.executor.start()
+
+    def tearDown(self):
+        self.executor.stop()
+
+    def test_order(self):
+        results = {1: [], 2: []}
+
+        def task(key, i):
+            time.sleep(0.001)
+            results[key].append(i)
+
+        for i in range(20):
+            self.executor.submit(1, task, 1, i)
+            self.executor.submit(2, task, 2, i)
+
+        self.executor.stop()
+        self.assertEqual(results, {1: list(range(20)), 2: list(range(20))})
+        self.assertEqual(self.executor.num_tasks, 40)
+
+    def test_parallel(self):
+        # Each group waits for the other one, which only works if the groups run at the same time
+        barrier = threading.Barrier(2, timeout=5)
+        passed = []
+
+        def task():
+            barrier.wait()
+            passed.append(True)
+
+        self.executor.submit(1, task)
+        self.executor.submit(2, task)
+        self.executor.stop()
+        self.assertEqual(passed, [True, True])
+
+    def test_depths(self):
+        event = threading.Event()
+        self.executor.submit(1, event.wait)
+        self.executor.submit(1, event.wait)
+        self.executor.submit(2, event.wait)
+
+        self.assertEqual(self.executor.get_depths(), {1: 2, 2: 1})
+        self.assertEqual(self.executor.max_depth, 2)
+        self.assertIn("3 tasks in 2 groups", self.executor.format_depths())
+
+        event.set()
+        self.executor.stop()
+        self.assertEqual(self.executor.get_depths(), {})
+
+    def test_exception(self):
+        results = []
+
+        def fail():
+            raise ValueError("failed")
+
+        with self.assertLogs("group_executor", level="ERROR"):
+            self.executor.submit(1, fail)
+            self.executor.submit(1, results.append, 1)
+            self.executor.stop()
+
+        self.assertEqual(results, [1])
+
+    def test_accept(self):
+        results, rejected = [], []
+        executor = GroupExecutor(1, accept=lambda key: key > 0,
+                                 on_reject=lambda key, func, args, kwargs: rejected.append((key, args)))
+        executor.start()
+        executor.submit(1, results.append, 1)
+        executor.submit(-1, results.append, -1)
+        executor.stop()
+
+        self.assertEqual(results, [1])
+        self.assertEqual(rejected, [(-1, (-1,))])
+        self.assertEqual((executor.num_tasks, executor.num_dropped), (1, 1))
+
+    def test_run_in_group(self):
+        results = []
+
+        @run_in_group(self.executor, lambda key, i: key)
+        def outer(key, i):
+            results.append(("outer", threading.current_thread().name))
+            inner(key, i)
+            results.append(("outer done", i))
+
+        # Runs straight away when it is called by a task of the same group
+        @run_in_group(self.executor, lambda key, i: key)
+        def inner(key, i):
+            results.append(("inner", i))
+
+        outer(1, 5)
+        self.executor.stop()
+
+        self.assertTrue(results[0][1].startswith("group-worker-"))
+        self.assertEqual(results[1:], [("inner", 5), ("outer done", 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
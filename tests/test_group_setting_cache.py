@@ -0,0 +1,97 @@
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import base
+from group_setting import GroupSetting
+from group_setting_cache import GroupSettingCache, Settings
+
+
+class TestGroupSettingCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        base.Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.cache = GroupSettingCache(10)
+        self.num_queries = 0
+        event.listen(self.engine, "before_cursor_execute", self.count_query)
+
+        s = self.session_factory()
+        s.add(GroupSetting(tele_id=1, join_timer=60, pass_timer=45, money_mode=False, ai_players=True))
+        s.commit()
+        s.close()
+        self.num_queries = 0
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def count_query(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            self.num_queries += 1
+
+    def test_read_through(self):
+        s = self.session_factory()
+        for i in range(3):
+            self.assertEqual(self.cache.get(s, 1), Settings(60, 45, False, True))
+        s.close()
+
+        self.assertEqual(self.num_queries, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_missing_group(self):
+        # Groups without settings are not cached, so that the settings are read once they are made
+        s = self.session_factory()
+        self.assertIsNone(self.cache.get(s, 2))
+        s.add(GroupSetting(tele_id=2, join_timer=30, pass_timer=20, money_mode=True))
+        s.commit()
+        self.assertEqual(self.cache.get(s, 2), Settings(30, 20, True, False))
+        s.close()
+
+    def test_invalidate(self):
+        s = self.session_factory()
+        self.cache.get(s, 1)
+        s.query(GroupSetting).filter(GroupSetting.tele_id == 1).first().pass_timer = 90
+        s.commit()
+
+        # Still cached until invalidated
+        self.assertEqual(self.cache.get(s, 1).pass_timer, 45)
+        self.cache.invalidate(1)
+        self.assertEqual(self.cache.get(s, 1).pass_timer, 90)
+        s.close()
+
+    def test_invalidate_if(self):
+        s = self.session_factory()
+        self.cache.get(s, 1)
+        s.query(GroupSetting).filter(GroupSetting.tele_id == 1).first().join_timer = 30
+        s.commit()
+
+        self.cache.invalidate_if(lambda group_tele_id: group_tele_id == 2)
+        self.assertEqual(self.cache.get(s, 1).join_timer, 60)
+        self.cache.invalidate_if(lambda group_tele_id: group_tele_id == 1)
+        self.assertEqual(self.cache.get(s, 1).join_timer, 30)
+        s.close()
+
+    def test_invalidate_on_commit(self):
+        s = self.session_factory()
+        s.query(GroupSetting).filter(GroupSetting.tele_id == 1).first().join_timer = 120
+        self.cache.invalidate(1, s)
+
+        # Another update caches the settings before the change is committed
+        other_s = self.session_factory()
+        self.assertEqual(self.cache.get(other_s, 1).join_timer, 60)
+        other_s.close()
+
+        s.commit()
+        self.assertEqual(self.cache.get(s, 1).join_timer, 120)
+
+        # The commit listener only runs once
+        self.cache.get(s, 1)
+        s.commit()
+        self.assertEqual(self.cache.hits, 1)
+        s.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
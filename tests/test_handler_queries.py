@@ -0,0 +1,46 @@
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import base
+from game_stat import PlayerStat
+from handler_queries import get_player_money, recharge_player_money, get_recharge_time, set_recharge_time, \
+    get_recharge_times, get_group_setting
+
+
+class TestHandlerQueries(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        base.Base.metadata.create_all(self.engine)
+        self.s = sessionmaker(bind=self.engine)()
+        self.s.add(PlayerStat(tele_id=10, num_games=0, num_games_won=0, num_cards=0, win_rate=0, money=0,
+                              money_earned=0))
+        self.s.commit()
+
+    def tearDown(self):
+        self.s.close()
+        self.engine.dispose()
+
+    def test_recharge(self):
+        set_recharge_time(self.s, [10, 11], 100.0)
+        self.assertEqual(get_recharge_time(self.s, 10), 100.0)
+        self.assertEqual(get_recharge_times(self.s), [(10, 100.0)])
+
+        # The money is recharged once
+        self.assertTrue(recharge_player_money(self.s, 10, 1000))
+        self.assertFalse(recharge_player_money(self.s, 10, 1000))
+        self.s.commit()
+
+        self.assertEqual(get_player_money(self.s, 10), 1000)
+        self.assertIsNone(get_recharge_time(self.s, 10))
+        self.assertEqual(get_recharge_times(self.s), [])
+
+    def test_missing(self):
+        self.assertFalse(recharge_player_money(self.s, 11, 1000))
+        self.assertIsNone(get_player_money(self.s, 11))
+        self.assertIsNone(get_recharge_time(self.s, 11))
+        self.assertIsNone(get_group_setting(self.s, -1))
+
+if __name__ == '__main__':
+    unittest.main()
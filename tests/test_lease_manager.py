@@ -0,0 +1,82 @@
+import time
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import base
+from lease_manager import LeaseManager
+from shard_lease import ShardLease, get_shard
+
+num_shards = 4
+ttl = 30
+
+
+class TestLeaseManager(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        base.Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def make_manager(self, owner):
+        return LeaseManager(self.session_factory, owner, "http://%s/" % owner, num_shards, ttl)
+
+    def get_owners(self):
+        s = self.session_factory()
+        owners = {shard: owner for shard, owner in s.query(ShardLease.shard, ShardLease.owner)}
+        s.close()
+
+        return owners
+
+    def test_get_shard(self):
+        self.assertEqual([get_shard(tele_id, num_shards) for tele_id in (0, 5, -1, -1001234567)], [0, 1, 3, 1])
+
+    def test_acquire(self):
+        manager = self.make_manager("a")
+        now = time.time()
+        self.assertEqual(manager.renew(now), (frozenset(range(num_shards)), frozenset()))
+        self.assertTrue(manager.owns(-5))
+
+        # The leases are renewed without changes
+        self.assertEqual(manager.renew(now + 10), (frozenset(), frozenset()))
+        self.assertEqual(self.get_owners(), {shard: "a" for shard in range(num_shards)})
+
+    def test_rebalance(self):
+        manager, other_manager = self.make_manager("a"), self.make_manager("b")
+        now = time.time()
+        manager.renew(now)
+
+        # The second worker waits for the first one to give up its extra shards
+        self.assertEqual(other_manager.renew(now + 1), (frozenset(), frozenset()))
+        acquired, released = manager.renew(now + 2)
+        self.assertEqual((acquired, released), (frozenset(), frozenset([2, 3])))
+        self.assertFalse(manager.owns(2))
+
+        manager.release(released)
+        self.assertEqual(other_manager.renew(now + 3), (frozenset([2, 3]), frozenset()))
+        self.assertEqual(self.get_owners(), {0: "a", 1: "a", 2: "b", 3: "b"})
+
+    def test_expire(self):
+        manager, other_manager = self.make_manager("a"), self.make_manager("b")
+        now = time.time()
+        manager.renew(now)
+        other_manager.renew(now)
+
+        # The shards of a worker that stops renewing move to the other one once the leases expire
+        self.assertEqual(other_manager.renew(now + ttl + 1), (frozenset(range(num_shards)), frozenset()))
+        self.assertEqual(manager.renew(now + ttl + 2), (frozenset(), frozenset(range(num_shards))))
+        self.assertEqual(self.get_owners(), {shard: "b" for shard in range(num_shards)})
+
+        released = []
+        other_manager.on_release = released.append
+        other_manager.stop()
+        self.assertEqual(released, [frozenset(range(num_shards))])
+        self.assertEqual(manager.renew(now + ttl + 3)[0], frozenset(range(num_shards)))
+
+
+if __name__ == '__main__':
+    unittest.main()
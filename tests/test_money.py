@@ -2,7 +2,8 @@ import unittest
 
 from pydealer import Stack, Card
 
-from money import get_money_lost
+from card import stack_to_mask
+from money import get_money_lost, settle_money
 
 
 class TestGetMoneyLost(unittest.TestCase):
@@ -59,5 +60,17 @@ class TestGetMoneyLost(unittest.TestCase):
         self.assertEqual(get_money_lost(cards, 5, 20), 60)
 
 
+class TestSettleMoney(unittest.TestCase):
+    def test_settle(self):
+        hands = [Stack(), Stack(cards=[Card("2", "Diamonds")]),
+                 Stack(cards=[Card("3", "Diamonds"), Card("3", "Clubs"), Card("3", "Hearts"), Card("3", "Spades"),
+                              Card("4", "Diamonds")]),
+                 Stack(cards=[Card("3", "Diamonds"), Card("4", "Clubs")])]
+        money_losts = settle_money([stack_to_mask(cards) for cards in hands], 5)
+
+        self.assertEqual(money_losts, [get_money_lost(cards, 5, 8) for cards in hands])
+        self.assertEqual(money_losts, [0, 10, 50, 10])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,61 @@
+import random
+import unittest
+
+from itertools import combinations
+
+from pydealer import Stack, Card
+
+from card import ints_to_mask, mask_to_ints, is_mask_bigger
+from moves import get_legal_moves, get_legal_mask_moves
+from rank_table import get_rank_key
+
+num_tests = 50
+
+
+# Returns the legal moves by checking every subset of the cards
+def brute_force_moves(mask, prev_mask):
+    moves = []
+    for size in (1, 2, 3, 5, 13):
+        for card_ints in combinations(mask_to_ints(mask), size):
+            move = ints_to_mask(card_ints)
+            if get_rank_key(move) & 0xF and is_mask_bigger(prev_mask, move):
+                moves.append(move)
+
+    return moves
+
+
+class TestLegalMoves(unittest.TestCase):
+    def test_no_prev_cards(self):
+        for i in range(num_tests):
+            mask = ints_to_mask(random.sample(range(52), random.randint(1, 13)))
+            moves = get_legal_mask_moves(mask)
+
+            self.assertEqual(sorted(moves), sorted(brute_force_moves(mask, 0)))
+            self.assertEqual(moves, sorted(moves, key=get_rank_key))
+
+    def test_prev_cards(self):
+        for i in range(num_tests):
+            deck = random.sample(range(52), 26)
+            mask = ints_to_mask(deck[:13])
+            prev_moves = get_legal_mask_moves(ints_to_mask(deck[13:]))
+
+            if prev_moves:
+                prev_mask = random.choice(prev_moves)
+                self.assertEqual(sorted(get_legal_mask_moves(mask, prev_mask)),
+                                 sorted(brute_force_moves(mask, prev_mask)))
+
+    def test_dragon(self):
+        mask = ints_to_mask([value * 4 + random.randint(0, 3) for value in range(13)])
+        self.assertIn(mask, get_legal_mask_moves(mask))
+        self.assertNotIn(mask, get_legal_mask_moves(mask, ints_to_mask(range(0, 52, 4))))
+
+    def test_stacks(self):
+        cards = Stack(cards=[Card("3", "Diamonds"), Card("3", "Spades"), Card("5", "Hearts")])
+        prev_cards = Stack(cards=[Card("4", "Diamonds")])
+        moves = get_legal_moves(cards, prev_cards)
+
+        self.assertEqual([[card.abbrev for card in move] for move in moves], [["5H"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.orm import sessionmaker
+
+import pool_stats
+from pool_stats import InstrumentedQueuePool, checkout_stats, pool_usage, format_pool_stats
+from unit_of_work import unit_of_work
+
+
+class TestPoolStats(unittest.TestCase):
+    def setUp(self):
+        # A file database with a pool of one connection, so that a second checkout times out
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_engine("sqlite:///" + os.path.join(self.temp_dir, "test.db"),
+                                    poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+        self.session_factory = sessionmaker(bind=self.engine)
+        checkout_stats.clear()
+        pool_usage.update(num_saturated=0, max_checked_out=0)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir)
+
+    def test_checkouts(self):
+        @unit_of_work(self.session_factory)
+        def handler(bot, update, s):
+            s.execute(text("SELECT 1"))
+
+        handler(None, None)
+        handler(None, None)
+
+        stats = checkout_stats["handler"]
+        self.assertEqual((stats.num_checkouts, stats.num_slow, stats.num_timeouts), (2, 0, 0))
+        self.assertGreaterEqual(stats.max_wait, 0)
+        self.assertEqual(pool_usage, {"num_saturated": 2, "max_checked_out": 1})
+
+    def test_timeout(self):
+        @unit_of_work(self.session_factory)
+        def waiting_handler(bot, update, s):
+            s.execute(text("SELECT 1"))
+
+        connection = self.engine.connect()
+        try:
+            with self.assertLogs(pool_stats.logger, "WARNING") as logs:
+                with self.assertRaises(TimeoutError):
+                    waiting_handler(None, None)
+        finally:
+            connection.close()
+
+        self.assertIn("waiting_handler timed out", logs.output[0])
+        self.assertEqual(checkout_stats["waiting_handler"].num_timeouts, 1)
+
+        # Checkouts outside of handlers are counted too
+        self.assertEqual(checkout_stats[None].num_checkouts, 1)
+
+    def test_slow_checkout(self):
+        @unit_of_work(self.session_factory)
+        def slow_handler(bot, update, s):
+            s.execute(text("SELECT 1"))
+
+        slow_checkout_time = pool_stats.slow_checkout_time
+        pool_stats.slow_checkout_time = -1
+        try:
+            with self.assertLogs(pool_stats.logger, "WARNING") as logs:
+                slow_handler(None, None)
+        finally:
+            pool_stats.slow_checkout_time = slow_checkout_time
+
+        self.assertIn("slow_handler waited", logs.output[0])
+        self.assertEqual(checkout_stats["slow_handler"].num_slow, 1)
+        self.assertIn("slow_handler: 1 checkouts", format_pool_stats(self.engine.pool))
+        self.assertIn("Pool: 0/1 checked out, at most 1", format_pool_stats(self.engine.pool))
+
+
+if __name__ == '__main__':
+    unittest.main()
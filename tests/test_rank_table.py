@@ -0,0 +1,69 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from card import ints_to_mask, get_mask_type, is_mask_bigger
+from card_type import *
+from rank_table import build_rank_table, load_rank_table, legal_masks, get_rank_key, get_key_type, is_key_bigger
+
+num_tests = 1000
+
+
+class TestRankTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        path = os.path.join(cls.temp_dir, "rank_table.bin")
+        build_rank_table(path)
+        load_rank_table(path)
+        cls.legal_masks = list(legal_masks())
+        cls.masks_by_size = {}
+        for mask in cls.legal_masks:
+            cls.masks_by_size.setdefault(bin(mask).count("1"), []).append(mask)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def random_mask(self, size=None):
+        if size is None:
+            size = random.choice((1, 2, 3, 4, 5, 13))
+
+        if size in (1, 2, 3, 5) and random.random() < 0.5:
+            return random.choice(self.masks_by_size[size])
+
+        return ints_to_mask(random.sample(range(52), size))
+
+    def test_mode(self):
+        # Readable by the workers of other users
+        self.assertEqual(os.stat(os.path.join(self.temp_dir, "rank_table.bin")).st_mode & 0o777, 0o644)
+
+    def test_legal_masks(self):
+        self.assertEqual(len(self.legal_masks), 20918)
+        self.assertTrue(all(get_mask_type(mask) != -1 for mask in self.legal_masks))
+
+    def test_key_type(self):
+        for i in range(num_tests):
+            mask = self.random_mask()
+            self.assertEqual(get_key_type(get_rank_key(mask)), get_mask_type(mask))
+
+    def test_dragon(self):
+        mask = ints_to_mask(range(0, 52, 4))
+        self.assertEqual(get_key_type(get_rank_key(mask)), SAME_SUIT_DRAGON)
+        self.assertFalse(is_key_bigger(get_rank_key(ints_to_mask(range(1, 52, 4))), get_rank_key(mask)))
+
+    def test_key_bigger(self):
+        for i in range(num_tests):
+            prev_mask = self.random_mask()
+            curr_mask = self.random_mask(bin(prev_mask).count("1"))
+
+            self.assertEqual(is_key_bigger(get_rank_key(prev_mask), get_rank_key(curr_mask)),
+                             is_mask_bigger(prev_mask, curr_mask))
+
+        self.assertTrue(is_key_bigger(get_rank_key(0), get_rank_key(ints_to_mask([0]))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+import unittest
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import base
+from game import Game
+from player import Player
+from router import Router, get_update_chat
+from shard_lease import ShardLease
+
+num_shards = 2
+
+
+class TestRouter(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        base.Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.router = Router(self.session_factory, num_shards, "token", refresh_interval=0)
+
+        s = self.session_factory()
+        s.add(Game(group_tele_id=-4))
+        s.add(Player(group_tele_id=-4, player_tele_id=7, player_name="Player"))
+        s.commit()
+        s.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_get_update_chat(self):
+        self.assertEqual(get_update_chat({"update_id": 1, "message": {"chat": {"id": -4, "type": "group"}}}),
+                         (-4, False))
+        self.assertEqual(get_update_chat({"update_id": 1, "message": {"chat": {"id": 7, "type": "private"}}}),
+                         (7, True))
+        self.assertEqual(get_update_chat({"update_id": 1, "callback_query": {"from": {"id": 7}}}), (7, True))
+        self.assertEqual(get_update_chat({"update_id": 1, "callback_query": {
+            "from": {"id": 7}, "message": {"chat": {"id": -55, "type": "group"}}}}), (-55, False))
+        self.assertEqual(get_update_chat({"update_id": 9, "poll": {}}), (9, False))
+
+    def test_get_route_id(self):
+        # A player in a game goes to the game's group
+        self.assertEqual(self.router.get_route_id({"update_id": 1, "callback_query": {"from": {"id": 7}}}), -4)
+        self.assertEqual(self.router.get_route_id({"update_id": 1, "callback_query": {"from": {"id": 8}}}), 8)
+        self.assertEqual(self.router.get_route_id({"update_id": 1, "message": {"chat": {"id": -5}}}), -5)
+
+        # A button on a group's message goes to that group, even if the player is in another game
+        self.assertEqual(self.router.get_route_id({"update_id": 1, "callback_query": {
+            "from": {"id": 7}, "message": {"chat": {"id": -55, "type": "group"}}}}), -55)
+        self.assertEqual(self.router.get_route_id({"update_id": 1, "callback_query": {
+            "from": {"id": 7}, "message": {"chat": {"id": 7, "type": "private"}}}}), -4)
+
+    def test_forward(self):
+        received = []
+
+        class WorkerHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])).decode())))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), WorkerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        update = {"update_id": 1, "callback_query": {"from": {"id": 7}}}
+        body = json.dumps(update).encode()
+        try:
+            # The shard has no live worker
+            self.assertEqual(self.router.forward(update, body), 503)
+
+            s = self.session_factory()
+            s.add(ShardLease(shard=0, owner="a", address="http://127.0.0.1:%d/" % server.server_port,
+                             expires=time.time() + 30))
+            s.add(ShardLease(shard=1, owner="b", address="http://127.0.0.1:1/", expires=time.time() + 30))
+            s.commit()
+            s.close()
+
+            self.assertEqual(self.router.forward(update, body), 200)
+            self.assertEqual(received, [("/token", update)])
+            self.assertEqual(self.router.forward({"update_id": 2, "message": {"chat": {"id": -5}}}, body), 503)
+            self.assertEqual((self.router.num_forwarded, self.router.num_failed), (1, 2))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
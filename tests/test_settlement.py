@@ -0,0 +1,134 @@
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import base
+from ai import ai_player_tele_id
+from card import ints_to_mask
+from game_stat import GroupStat, PlayerStat
+from game_state import PlayerState
+from money import settle_money
+from settlement import settle_stats
+
+
+card_money = 5
+init_money = 1000
+
+
+class TestSettlement(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        base.Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.num_statements = 0
+        event.listen(self.engine, "before_cursor_execute", self.count_statement)
+
+        s = self.session_factory()
+        for tele_id, money in ((1, 1000), (2, 10), (3, 500)):
+            s.add(PlayerStat(tele_id=tele_id, player_name=str(tele_id), num_games=1, num_games_won=1, num_cards=13,
+                             win_rate=100, money=money, money_earned=0))
+        s.commit()
+        s.close()
+
+        # Player 1 wins, the others have cards left
+        self.players = [PlayerState(-1, 1, "1", 0, 0), PlayerState(-1, 2, "2", 1, ints_to_mask([0, 1, 2])),
+                        PlayerState(-1, 3, "3", 2, ints_to_mask([4])),
+                        PlayerState(-1, ai_player_tele_id(-1, 3), "AI 1", 3, ints_to_mask([8, 9]))]
+        self.money_losts = settle_money([player.cards for player in self.players], card_money)
+        self.num_statements = 0
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+            self.num_statements += 1
+
+    def settle(self, players, money_mode=True):
+        s = self.session_factory()
+        broke_tele_ids = settle_stats(s, -1, players, 0, money_mode, card_money, init_money)
+        s.commit()
+        s.close()
+
+        return broke_tele_ids
+
+    def get_stats(self):
+        s = self.session_factory()
+        stats = {player_stat.tele_id: player_stat for player_stat in s.query(PlayerStat)}
+        group_stat = s.query(GroupStat).first()
+        s.close()
+
+        return stats, group_stat
+
+    def test_money(self):
+        self.assertEqual(self.settle(self.players), [2])
+        stats, group_stat = self.get_stats()
+
+        # The winner earns the money lost by the AI player too
+        self.assertEqual(stats[1].money, 1000 + sum(self.money_losts))
+        self.assertEqual(stats[1].money_earned, sum(self.money_losts))
+
+        # Money is clamped at zero, but the money earned is not
+        self.assertEqual(stats[2].money, 0)
+        self.assertEqual(stats[2].money_earned, -self.money_losts[1])
+        self.assertEqual(stats[3].money, 500 - self.money_losts[2])
+        self.assertEqual(group_stat.most_money_earned_player, "1")
+        self.assertEqual(group_stat.most_money_earned, sum(self.money_losts))
+
+    def test_stats(self):
+        self.settle(self.players, money_mode=False)
+        stats, group_stat = self.get_stats()
+
+        self.assertEqual([(stats[i].num_games, stats[i].num_games_won, stats[i].num_cards) for i in (1, 2, 3)],
+                         [(2, 2, 26), (2, 1, 23), (2, 1, 25)])
+        self.assertEqual([stats[i].win_rate for i in (1, 2, 3)], [100, 50, 50])
+        self.assertEqual([stats[i].money for i in (1, 2, 3)], [1000, 10, 500])
+        self.assertEqual(group_stat.num_games, 1)
+        self.assertEqual((group_stat.best_win_rate_player, group_stat.best_win_rate), ("1", 100))
+
+        # The group's stats are updated by the next game, and only a better player replaces the best player
+        self.settle([PlayerState(-1, 2, "2", 0, 0), PlayerState(-1, 1, "1", 1, ints_to_mask([0]))], money_mode=False)
+        stats, group_stat = self.get_stats()
+        self.assertEqual(stats[2].win_rate, 200 / 3)
+        self.assertEqual(group_stat.num_games, 2)
+        self.assertEqual((group_stat.best_win_rate_player, group_stat.best_win_rate), ("1", 100))
+
+    def test_new_players(self):
+        players = [PlayerState(-1, 4, "4", 0, 0), PlayerState(-1, 5, "5", 1, ints_to_mask([0]))]
+        self.settle(players)
+        stats, group_stat = self.get_stats()
+
+        self.assertEqual((stats[4].num_games, stats[4].num_games_won, stats[4].money), (1, 1, init_money + card_money))
+        self.assertEqual((stats[5].num_cards, stats[5].win_rate, stats[5].money), (12, 0, init_money - card_money))
+
+        # The money of a new player is clamped at zero too
+        s = self.session_factory()
+        settle_stats(s, -1, [PlayerState(-1, 6, "6", 0, 0), PlayerState(-1, 7, "7", 1, ints_to_mask(range(13)))], 0,
+                     True, card_money, 10)
+        s.commit()
+        self.assertEqual(s.query(PlayerStat.money).filter(PlayerStat.tele_id == 7).scalar(), 0)
+        s.close()
+
+    def test_ai_players(self):
+        players = [PlayerState(-1, ai_player_tele_id(-1, i), "AI", i, ints_to_mask([i]) if i else 0)
+                   for i in range(4)]
+        self.assertEqual(self.settle(players), [])
+        stats, group_stat = self.get_stats()
+
+        self.assertEqual(len(stats), 3)
+        self.assertEqual((group_stat.num_games, group_stat.best_win_rate), (1, 0))
+
+    def test_num_statements(self):
+        # Selecting and updating the players, then updating or else inserting the group's stats
+        self.settle(self.players)
+        self.assertEqual(self.num_statements, 4)
+
+        # Once the group has stats, only the players are selected and updated along with the group
+        self.num_statements = 0
+        self.settle(self.players)
+        self.assertEqual(self.num_statements, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
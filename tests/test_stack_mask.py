@@ -0,0 +1,88 @@
+import random
+import unittest
+
+from pydealer import Stack
+from sqlalchemy import create_engine, inspect, MetaData, Table, Column, BigInteger, Integer, Text, PickleType
+from sqlalchemy.orm import sessionmaker
+
+import base
+from card import deal_hands, stack_to_mask, mask_to_stack
+from game import Game
+from migration import migrate
+from player import Player
+
+num_tests = 20
+
+
+class TestStackMask(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        base.Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_round_trip(self):
+        for i in range(num_tests):
+            hands = deal_hands()
+            self.session.add(Game(group_tele_id=i, curr_cards=Stack(), prev_cards=hands[1]))
+            self.session.add(Player(group_tele_id=i, player_tele_id=i, player_id=0, cards=hands[0]))
+            self.session.commit()
+            self.session.expire_all()
+
+            game = self.session.query(Game).filter(Game.group_tele_id == i).one()
+            player = self.session.query(Player).filter(Player.player_tele_id == i).one()
+            self.assertEqual(game.curr_cards.size, 0)
+            self.assertEqual(stack_to_mask(game.prev_cards), stack_to_mask(hands[1]))
+            self.assertEqual(stack_to_mask(player.cards), stack_to_mask(hands[0]))
+            self.assertEqual(player.cards, hands[0])
+
+    def test_none(self):
+        self.session.add(Game(group_tele_id=1))
+        self.session.commit()
+        self.session.expire_all()
+        self.assertIsNone(self.session.query(Game).one().curr_cards)
+
+
+class TestMigrateStackMask(unittest.TestCase):
+    def test_migrate(self):
+        engine = create_engine("sqlite://")
+        metadata = MetaData()
+        games = Table("games", metadata, Column("group_tele_id", BigInteger, primary_key=True),
+                      Column("game_round", Integer), Column("curr_player", Integer), Column("biggest_player", Integer),
+                      Column("count_pass", Integer), Column("curr_cards", PickleType), Column("prev_cards", PickleType))
+        players = Table("players", metadata, Column("group_tele_id", BigInteger),
+                        Column("player_tele_id", BigInteger, primary_key=True), Column("player_name", Text),
+                        Column("player_id", Integer), Column("cards", PickleType), Column("num_cards", Integer))
+        metadata.create_all(engine)
+
+        hands = deal_hands()
+        curr_cards = mask_to_stack(stack_to_mask(hands[0]) & random.getrandbits(52))
+        with engine.begin() as conn:
+            conn.execute(games.insert(), [{"group_tele_id": 1, "curr_cards": curr_cards, "prev_cards": None}])
+            conn.execute(players.insert(), [{"group_tele_id": 1, "player_tele_id": i, "player_id": i, "cards": hand}
+                                            for i, hand in enumerate(hands)])
+
+        base.Base.metadata.create_all(engine, checkfirst=True)
+        migrate(engine)
+        migrate(engine)
+
+        column_types = {column["name"]: column["type"] for column in inspect(engine).get_columns("players")}
+        self.assertIsInstance(column_types["cards"], Integer)
+
+        session = sessionmaker(bind=engine)()
+        game = session.query(Game).one()
+        self.assertEqual(stack_to_mask(game.curr_cards), stack_to_mask(curr_cards))
+        self.assertIsNone(game.prev_cards)
+
+        for player in session.query(Player):
+            self.assertEqual(stack_to_mask(player.cards), stack_to_mask(hands[player.player_id]))
+
+        session.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
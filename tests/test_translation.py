@@ -0,0 +1,73 @@
+import gettext
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import translation
+from translation import DOMAIN, load_catalogs, get_catalog
+
+
+# Returns a compiled catalog with the messages
+def make_mo(messages):
+    keys = sorted(messages)
+    ids = b"".join(key.encode() + b"\0" for key in keys)
+    strs = b"".join(messages[key].encode() + b"\0" for key in keys)
+
+    # The header is followed by the tables of the original and translated strings and then the strings
+    ids_start = 7 * 4 + 16 * len(keys)
+    strs_start = ids_start + len(ids)
+    ids_table, strs_table = [], []
+    id_offset = str_offset = 0
+    for key in keys:
+        key_bytes, str_bytes = key.encode(), messages[key].encode()
+        ids_table += [len(key_bytes), ids_start + id_offset]
+        strs_table += [len(str_bytes), strs_start + str_offset]
+        id_offset += len(key_bytes) + 1
+        str_offset += len(str_bytes) + 1
+
+    header = struct.pack("Iiiiiii", 0x950412de, 0, len(keys), 7 * 4, 7 * 4 + 8 * len(keys), 0, 0)
+
+    return header + struct.pack("%di" % len(ids_table), *ids_table) + \
+        struct.pack("%di" % len(strs_table), *strs_table) + ids + strs
+
+
+class TestTranslation(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        for language, text in (("en", "Done"), ("it", "Fatto")):
+            path = os.path.join(self.temp_dir, language, "LC_MESSAGES")
+            os.makedirs(path)
+            with open(os.path.join(path, DOMAIN + ".mo"), "wb") as f:
+                f.write(make_mo({"Done": text}))
+
+        # A language that is not compiled and a file that is not a language
+        os.makedirs(os.path.join(self.temp_dir, "zh-hk", "LC_MESSAGES"))
+        open(os.path.join(self.temp_dir, DOMAIN + ".pot"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        translation.catalogs.clear()
+
+    def test_load_catalogs(self):
+        catalogs = load_catalogs(self.temp_dir)
+        self.assertEqual(sorted(catalogs), ["en", "it"])
+        self.assertEqual(catalogs["it"].gettext("Done"), "Fatto")
+
+    def test_get_catalog(self):
+        load_catalogs(self.temp_dir)
+        self.assertEqual(get_catalog("it").gettext("Done"), "Fatto")
+        self.assertIs(get_catalog("it"), get_catalog("it"))
+
+        # Languages without a catalog use the default language
+        self.assertIs(get_catalog("zh-hk"), get_catalog("en"))
+
+    def test_no_catalogs(self):
+        translation.catalogs.clear()
+        self.assertIsInstance(get_catalog("en"), gettext.NullTranslations)
+        self.assertEqual(get_catalog("en").gettext("Done"), "Done")
+
+
+if __name__ == '__main__':
+    unittest.main()
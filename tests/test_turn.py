@@ -0,0 +1,42 @@
+import random
+import unittest
+
+from card import ints_to_mask
+from simulate import play_game
+from turn import VALID_CARDS, INVALID_CARDS, SMALLER_CARDS, TWO_OF_SPADES, check_cards, next_players_after_use, \
+    next_player_after_pass
+
+
+class TestCheckCards(unittest.TestCase):
+    def test_in_control(self):
+        self.assertEqual(check_cards(1, 1, ints_to_mask([20]), ints_to_mask([0, 1])), VALID_CARDS)
+        self.assertEqual(check_cards(1, 1, 0, ints_to_mask([0, 4])), INVALID_CARDS)
+
+    def test_not_in_control(self):
+        self.assertEqual(check_cards(2, 1, ints_to_mask([20]), ints_to_mask([21])), VALID_CARDS)
+        self.assertEqual(check_cards(2, 1, ints_to_mask([20]), ints_to_mask([19])), SMALLER_CARDS)
+        self.assertEqual(check_cards(2, 1, ints_to_mask([20]), ints_to_mask([24, 25])), INVALID_CARDS)
+
+
+class TestNextPlayers(unittest.TestCase):
+    def test_after_use(self):
+        self.assertEqual(next_players_after_use(3, ints_to_mask([20])), (0, 3))
+        self.assertEqual(next_players_after_use(3, TWO_OF_SPADES), (3, 3))
+
+    def test_after_pass(self):
+        self.assertEqual(next_player_after_pass(1, 3), (2, False))
+        self.assertEqual(next_player_after_pass(2, 3), (3, True))
+
+
+class TestSimulate(unittest.TestCase):
+    def test_play_game(self):
+        rng = random.Random(0)
+
+        for i in range(20):
+            winner, num_turns, money_losts = play_game(rng)
+            self.assertEqual(money_losts[winner], 0)
+            self.assertTrue(all(money_lost > 0 for player, money_lost in enumerate(money_losts) if player != winner))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import gettext
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import base
+from card import ints_to_mask
+from game_state import GameState, PlayerState, GameStore, load_game
+from group_setting import GroupSetting
+from turn_message import get_turn_message, get_game_message
+
+
+# Most queries that rendering a turn can make, when the game is not in memory
+query_budget = 1
+
+
+class TestTurnMessage(unittest.TestCase):
+    def setUp(self):
+        self._ = gettext.NullTranslations().gettext
+        self.engine = create_engine("sqlite://")
+        base.Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.num_queries = 0
+        event.listen(self.engine, "before_cursor_execute", self.count_query)
+
+        # A game in its second round, written to the database by another store
+        store = GameStore(self.session_factory)
+        game = GameState(1, game_round=2, curr_player=2, biggest_player=0, prev_cards=ints_to_mask([0, 1]))
+        store.add_game(game)
+        for i in range(4):
+            player = PlayerState(1, 10 + i, "Player%d" % i, cards=ints_to_mask([i + 4]), num_cards=13 - i)
+            store.add_player(game, player)
+        store.flush()
+
+        s = self.session_factory()
+        s.add(GroupSetting(tele_id=1, join_timer=60, pass_timer=45, money_mode=False))
+        s.commit()
+        s.close()
+
+        self.num_queries = 0
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def count_query(self, conn, cursor, statement, parameters, context, executemany):
+        self.num_queries += 1
+
+    def test_load_game(self):
+        s = self.session_factory()
+        game = load_game(s, 1)
+        s.close()
+
+        self.assertEqual(self.num_queries, 1)
+        self.assertEqual((game.game_round, game.curr_player, game.biggest_player), (2, 2, 0))
+        self.assertEqual(game.prev_cards, ints_to_mask([0, 1]))
+        self.assertEqual(game.pass_timer, 45)
+        self.assertEqual([player.player_id for player in game.players], [0, 1, 2, 3])
+        self.assertEqual([player.num_cards for player in game.players], [13, 12, 11, 10])
+        self.assertEqual(game.players[3].cards, ints_to_mask([7]))
+
+    def test_load_missing_game(self):
+        s = self.session_factory()
+        self.assertIsNone(load_game(s, 2))
+        self.assertIsNone(GameStore(self.session_factory).load(s, 2))
+        s.close()
+
+    def test_query_budget(self):
+        store = GameStore(self.session_factory)
+        s = self.session_factory()
+        text = get_turn_message(store.load(s, 1), self._)
+        self.assertLessEqual(self.num_queries, query_budget)
+
+        # The game is in memory after the first load
+        self.num_queries = 0
+        self.assertEqual(get_turn_message(store.load(s, 1), self._), text)
+        self.assertEqual(get_game_message(store.load(s, 1), self._), get_game_message(store.get_game(1), self._))
+        self.assertEqual(self.num_queries, 0)
+        self.assertIs(store.get_player(11), store.get_game(1).players[1])
+        s.close()
+
+    def test_deleted_game(self):
+        store = GameStore(self.session_factory)
+        s = self.session_factory()
+        store.load(s, 1)
+        store.delete_game(1)
+
+        # The game is still in the database until the next flush
+        self.assertIsNone(store.load(s, 1))
+        s.close()
+
+    def test_turn_message(self):
+        s = self.session_factory()
+        text = get_turn_message(load_game(s, 1), self._)
+        s.close()
+
+        self.assertIn("Player1 decided to PASS", text)
+        self.assertIn("Player2's Turn", text)
+        self.assertIn("3. Player3 has 10 cards", text)
+        self.assertIn("Player0 used:", text)
+        self.assertEqual(text.count(" 3\n"), 2)
+
+    def test_translator(self):
+        s = self.session_factory()
+        game = load_game(s, 1)
+        s.close()
+
+        # Each message is translated by its own translator
+        messages = {"%s's Turn\n": "Turno di %s\n"}
+        texts = [get_turn_message(game, translator) for translator in (self._, lambda text: messages.get(text, text))]
+        self.assertIn("Player2's Turn", texts[0])
+        self.assertNotIn("Turno di", texts[0])
+        self.assertIn("Turno di Player2", texts[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
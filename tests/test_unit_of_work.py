@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import base
+import unit_of_work
+from game_stat import PlayerStat
+from language import Language
+from unit_of_work import unit_of_work as uow, count_checkouts, checkout_counts
+
+num_tests = 5
+
+
+class TestUnitOfWork(unittest.TestCase):
+    def setUp(self):
+        # A file database so that connections are checked out from a pool
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_engine("sqlite:///" + os.path.join(self.temp_dir, "test.db"))
+        base.Base.metadata.create_all(self.engine)
+        count_checkouts(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        checkout_counts.clear()
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir)
+
+    def test_one_checkout(self):
+        @uow(self.session_factory)
+        def inner(bot, update, s, tele_id):
+            s.add(PlayerStat(tele_id=tele_id, player_name="Player", money=1000))
+
+        @uow(self.session_factory)
+        def handler(bot, update, s, job_queue=None):
+            for i in range(3):
+                s.query(Language).filter(Language.tele_id == update * 10 + i).first()
+                s.add(Language(tele_id=update * 10 + i, language="en"))
+                s.flush()
+
+            inner(bot, update, update)
+
+            return job_queue
+
+        for i in range(num_tests):
+            self.assertEqual(handler(None, i, job_queue="queue"), "queue")
+            self.assertIsNone(unit_of_work._local.session)
+
+        self.assertEqual(checkout_counts["handler"], {1: num_tests})
+        self.assertNotIn("inner", checkout_counts)
+
+        s = self.session_factory()
+        self.assertEqual(s.query(Language).count(), num_tests * 3)
+        self.assertEqual(s.query(PlayerStat).count(), num_tests)
+        s.close()
+
+    def test_rollback(self):
+        @uow(self.session_factory)
+        def handler(bot, job, s):
+            s.add(Language(tele_id=1, language="en"))
+            s.flush()
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            handler(None, None)
+
+        self.assertEqual(checkout_counts["handler"], {1: 1})
+        self.assertIsNone(unit_of_work._local.session)
+
+        s = self.session_factory()
+        self.assertEqual(s.query(Language).count(), 0)
+        s.close()
+
+    def test_no_queries(self):
+        @uow(self.session_factory)
+        def handler(bot, update, s):
+            pass
+
+        handler(None, None)
+        self.assertEqual(checkout_counts["handler"], {0: 1})
+        self.assertIn("handler: 1 calls with 0 checkouts", unit_of_work.format_checkout_counts())
+
+
+if __name__ == '__main__':
+    unittest.main()
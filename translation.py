@@ -0,0 +1,34 @@
+import gettext
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DOMAIN = "big_two_text"
+DEFAULT_LANGUAGE = "en"
+
+catalogs = {}
+
+
+# Loads the compiled catalog of each language in localedir, languages that are not compiled are skipped
+def load_catalogs(localedir="locale"):
+    catalogs.clear()
+    for language in sorted(os.listdir(localedir)):
+        if not os.path.isdir(os.path.join(localedir, language)):
+            continue
+
+        try:
+            catalogs[language] = gettext.translation(DOMAIN, localedir=localedir, languages=[language])
+        except IOError:
+            logger.warning("No compiled catalog for %s" % language)
+
+    return catalogs
+
+
+# Returns the catalog of the language, falling back to the default language and then to no translation
+def get_catalog(language):
+    catalog = catalogs.get(language, catalogs.get(DEFAULT_LANGUAGE))
+    if catalog is None:
+        catalog = gettext.NullTranslations()
+
+    return catalog
@@ -0,0 +1,42 @@
+from card import CARD_INTS, mask_size
+from rank_table import get_rank_key, get_key_type, is_key_bigger
+
+NUM_PLAYERS = 4
+THREE_OF_DIAMONDS = 1 << CARD_INTS[("3", "Diamonds")]
+TWO_OF_SPADES = 1 << CARD_INTS[("2", "Spades")]
+
+# Results of checking the selected cards
+VALID_CARDS = 0
+INVALID_CARDS = 1
+SMALLER_CARDS = 2
+
+
+# Checks if the current player can use the selected cards
+def check_cards(curr_player, biggest_player, prev_mask, curr_mask):
+    is_in_control = curr_player == biggest_player
+    curr_key = get_rank_key(curr_mask)
+
+    if get_key_type(curr_key) == -1 or \
+            (not is_in_control and prev_mask and mask_size(prev_mask) != mask_size(curr_mask)):
+        return INVALID_CARDS
+
+    if not is_in_control and not is_key_bigger(get_rank_key(prev_mask), curr_key):
+        return SMALLER_CARDS
+
+    return VALID_CARDS
+
+
+# Returns the next current player and biggest player after the current player used cards
+def next_players_after_use(curr_player, curr_mask):
+    # All players are passed after ♠ 2 is used
+    if curr_mask == TWO_OF_SPADES:
+        return curr_player, curr_player
+
+    return (curr_player + 1) % NUM_PLAYERS, curr_player
+
+
+# Returns the next current player after a pass, and if the previous cards are cleared as that player is in control
+def next_player_after_pass(curr_player, biggest_player):
+    curr_player = (curr_player + 1) % NUM_PLAYERS
+
+    return curr_player, curr_player == biggest_player
@@ -0,0 +1,47 @@
+from card import suit_unicode, mask_to_stack
+
+
+# Returns the message that is sent to the group at the start of a turn, translated with _
+def get_turn_message(game, _):
+    text = ""
+
+    if game.game_round > 1 and game.curr_player != (game.biggest_player + 1) % 4:
+        prev_player_name = game.players[(game.curr_player - 1) % 4].player_name
+
+        text += "--------------------------------------\n"
+        text += _("%s decided to PASS\n") % prev_player_name
+
+    text += "--------------------------------------\n"
+    text += _("%s's Turn\n") % game.get_curr_player().player_name
+    text += "--------------------------------------\n"
+
+    text += get_game_message(game, _)
+
+    return text
+
+
+# Returns a string a message that contains info of the game, translated with _
+def get_game_message(game, _):
+    text = ""
+
+    # Displays the number of cards that each player has
+    for player in game.players:
+        text += _("%s has %d cards\n") % ("%d. %s" % (player.player_id, player.player_name), player.num_cards)
+    text += "--------------------------------------\n"
+
+    # Checks if player is in control
+    if game.game_round > 1 and game.curr_player == game.biggest_player:
+        text += _("%s is in control now\n") % game.get_curr_player().player_name
+        text += "--------------------------------------\n"
+    elif game.game_round > 1:
+        text += _("%s used:\n") % game.players[game.biggest_player].player_name
+
+        for card in mask_to_stack(game.prev_cards):
+            text += suit_unicode(card.suit)
+            text += " "
+            text += str(card.value)
+            text += "\n"
+
+        text += "--------------------------------------\n"
+
+    return text
@@ -0,0 +1,71 @@
+import threading
+
+from collections import Counter, defaultdict
+from functools import wraps
+
+from sqlalchemy import event
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# Number of calls of each handler by the number of connections that the call checked out
+checkout_counts = defaultdict(Counter)
+
+
+# Counts the connections checked out from the engine's pool by each thread
+def count_checkouts(engine):
+    event.listen(engine, "checkout", on_checkout)
+
+
+def on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _local.num_checkouts = getattr(_local, "num_checkouts", 0) + 1
+
+
+# Runs a handler or job with one session, which is passed after the bot and the update or job and committed once at
+# the end. Handlers that are called by another handler use the session of the outer call
+def unit_of_work(session_factory):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(bot, update, *args, **kwargs):
+            s = getattr(_local, "session", None)
+            if s is not None:
+                return func(bot, update, s, *args, **kwargs)
+
+            s = _local.session = session_factory()
+            _local.handler = func.__name__
+            _local.num_checkouts = 0
+
+            try:
+                result = func(bot, update, s, *args, **kwargs)
+                s.commit()
+
+                return result
+            except:
+                s.rollback()
+                raise
+            finally:
+                s.close()
+                _local.session = _local.handler = None
+
+                with _lock:
+                    checkout_counts[func.__name__][_local.num_checkouts] += 1
+
+        return wrapper
+
+    return decorator
+
+
+# Returns the name of the handler that the thread is running, or None outside of handlers
+def current_handler():
+    return getattr(_local, "handler", None)
+
+
+# Returns the checkout counts as text, one handler per line
+def format_checkout_counts():
+    with _lock:
+        lines = []
+        for name, counts in sorted(checkout_counts.items()):
+            lines.append("%s: %s" % (name, ", ".join("%d calls with %d checkouts" % (num_calls, num_checkouts)
+                                                     for num_checkouts, num_calls in sorted(counts.items()))))
+
+    return "\n".join(lines)